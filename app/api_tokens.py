@@ -0,0 +1,183 @@
+# app/api_tokens.py
+"""
+Long-lived, scoped API tokens for scripted clients.
+
+A token is minted after a verified wallet login (POST /api/tokens) and sent as
+`Authorization: Bearer <token>` instead of a cookie session. It carries its own
+claims (user id, wallet address, scopes, token id, expiry), authenticated with
+an HMAC under a key derived from SECRET_KEY:
+
+    w3t.<base64url JSON claims>.<base64url HMAC-SHA256>
+
+Checking a token needs no database access; only revocation does, and that is
+answered from a deny list of revoked, unexpired token ids that each process
+reloads at most every API_TOKEN_REVOCATION_CACHE_TTL seconds. A revocation is
+therefore effective at once in the process that handled it and within that
+interval everywhere else.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime
+from flask import request
+from app import metrics, db_utils
+
+# Set up logger
+logger = logging.getLogger('w3tasq.api_tokens')
+
+TOKEN_PREFIX = "w3t"
+SCOPES = ('tasks:read', 'tasks:write')
+ENVIRON_KEY = 'w3tasq.api_token_claims'
+
+
+class InvalidTokenError(Exception):
+    """The token is malformed, forged, expired or revoked."""
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class RevocationList:
+    """
+    Per-process cache of revoked token ids.
+
+    Args:
+        loader: Callable returning the ids of revoked, unexpired tokens.
+        ttl: Seconds between reloads.
+    """
+
+    def __init__(self, loader, ttl=30):
+        self.loader = loader
+        self.ttl = ttl
+        self._revoked = frozenset()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.ttl:
+            return
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.ttl:
+                return
+            self._revoked = frozenset(self.loader())
+            self._loaded_at = now
+            metrics.inc('api_token_denylist_reloads')
+
+    def __contains__(self, jti):
+        metrics.inc('api_token_denylist_lookups')
+        self._refresh()
+        return jti in self._revoked
+
+    def add(self, jti):
+        """Deny `jti` in this process right away, without waiting for a reload."""
+        with self._lock:
+            self._revoked = self._revoked | {jti}
+
+
+class TokenIssuer:
+    """
+    Mints and verifies API tokens.
+
+    Args:
+        secret_key: Application SECRET_KEY; a dedicated key is derived from it.
+        revoked: RevocationList (or any container of revoked token ids).
+    """
+
+    def __init__(self, secret_key, revoked):
+        secret = secret_key.encode() if isinstance(secret_key, str) else secret_key
+        # Separate key so that a token MAC can never be confused with a challenge MAC
+        self._key = hmac.new(secret, b'w3tasq-api-tokens', hashlib.sha256).digest()
+        self.revoked = revoked
+
+    def _mac(self, payload):
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, user_id, address, scopes, ttl):
+        """
+        Create a token.
+        Args:
+            ttl: timedelta of validity.
+        Returns:
+            tuple: (token string, claims dict)
+        """
+        expires_at = datetime.utcnow() + ttl
+        claims = {
+            'sub': user_id,
+            'addr': address,
+            'scp': list(scopes),
+            'jti': secrets.token_hex(16),
+            'exp': int((expires_at - datetime(1970, 1, 1)).total_seconds()),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        return f"{TOKEN_PREFIX}.{payload}.{self._mac(payload)}", claims
+
+    def verify(self, token):
+        """
+        Return the claims of a valid token.
+        Raises:
+            InvalidTokenError: malformed, bad MAC, expired or revoked.
+        """
+        parts = token.split('.') if isinstance(token, str) else []
+        if len(parts) != 3 or parts[0] != TOKEN_PREFIX:
+            raise InvalidTokenError("Malformed API token")
+        payload, mac = parts[1], parts[2]
+        if not hmac.compare_digest(self._mac(payload), mac):
+            raise InvalidTokenError("Invalid API token")
+        # The payload is authentic from here on
+        claims = json.loads(_b64decode(payload))
+        if claims['exp'] <= time.time():
+            raise InvalidTokenError("API token has expired")
+        if claims['jti'] in self.revoked:
+            raise InvalidTokenError("API token has been revoked")
+        return claims
+
+
+# Shared token issuer, configured by init_api_tokens()
+issuer = None
+
+
+def init_api_tokens(app):
+    """Create the token issuer and its deny list from app configuration"""
+    global issuer
+    revoked = RevocationList(db_utils.get_revoked_api_token_ids,
+                             ttl=app.config.get('API_TOKEN_REVOCATION_CACHE_TTL', 30))
+    issuer = TokenIssuer(app.config['SECRET_KEY'], revoked)
+    logger.debug("API tokens initialized")
+
+
+def request_claims():
+    """
+    Claims of the Bearer token sent with the current request, verified once per request.
+    Returns:
+        dict or None: None if the request has no Bearer token.
+    Raises:
+        InvalidTokenError: a Bearer token was sent but is not valid.
+    """
+    # Kept in the WSGI environ rather than flask.g: g lives as long as the
+    # app context, which may span several requests
+    if ENVIRON_KEY not in request.environ:
+        header = request.headers.get('Authorization', '')
+        scheme, _, token = header.partition(' ')
+        claims, error = None, None
+        if scheme.lower() == 'bearer' and token.strip():
+            try:
+                claims = issuer.verify(token.strip())
+            except (InvalidTokenError, ValueError, KeyError, TypeError) as e:
+                error = e if isinstance(e, InvalidTokenError) else InvalidTokenError("Invalid API token")
+        request.environ[ENVIRON_KEY] = (claims, error)
+    claims, error = request.environ[ENVIRON_KEY]
+    if error is not None:
+        raise error
+    return claims
@@ -1,7 +1,9 @@
+import contextvars
 import logging
-from logging.handlers import RotatingFileHandler
-from flask import Flask, render_template, session, redirect, url_for, request, jsonify
-from app import utils, db_utils
+import click
+from flask import Flask, render_template, session, redirect, url_for, request, jsonify, Response
+from datetime import datetime, timedelta, timezone
+from app import utils, db_utils, signature_service, challenges, challenge_store, rate_limit, api_tokens, jobs, timing, query_log, metrics_export, logging_setup, profiling, seeding
 from app.models import db
 from app.config import config_map, FLASK_ENV
 from app.template_filters import shorten_wallet_address
@@ -15,42 +17,45 @@ def create_app(config_name='default'):
     # Load configuration
     app.config.from_object(config_map[config_name])
 
-    # Configure logger
+    # Client addresses behind the reverse proxy (X-Forwarded-For), for rate limits and logs
+    rate_limit.init_proxy_fix(app)
+
+    # Configure logging (file/console output drained by a background thread)
+    logging_setup.init_logging(app)
     root_logger = logging.getLogger('w3tasq')
-    root_logger.setLevel(app.config['LOG_LEVEL'])
-    
-    # Remove existing handlers to avoid duplicates
-    root_logger.handlers.clear()
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        app.config['LOG_FORMAT'],
-        datefmt=app.config.get('LOG_DATEFMT')
-    )
-    
-    # Add console handler for development
-    if not app.config.get('LOG_TO_FILE', False):
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        root_logger.addHandler(console_handler)
-    else:
-        # Ensure logs directory exists
-        if not utils.is_log_dir():
-            utils.make_log_dir()
-        # Add file handler with rotation for testing/production
-        file_handler = RotatingFileHandler(
-            app.config['LOG_FILE'],
-            maxBytes=app.config.get('LOG_MAX_BYTES', 1 * 1024 * 1024),
-            backupCount=app.config.get('LOG_BACKUP_COUNT', 3)
-        )
-        file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+    logging_setup.init_request_ids(app)
+
+    # Opt-in cProfile capture (admin header or sampling), around everything below
+    profiling.init_profiling(app)
     
     # Initialize Redis
     utils.init_redis(app)
+
+    # Initialize the challenge store (Redis, in-memory or SQLite)
+    challenge_store.init_challenge_store(app, utils.redis_client)
+
+    # Select the login challenge mode (Redis-stored or stateless HMAC)
+    challenges.init_challenges(app)
+
+    # Initialize signature verification (inline or worker pool)
+    signature_service.init_signature_service(app)
+
+    # API tokens for scripted clients (HMAC-signed, cached revocation list)
+    api_tokens.init_api_tokens(app)
+
+    # Per-request latency breakdown (access log, Server-Timing); registered
+    # before the rate limiter so its Redis calls are included
+    timing.init_timing(app)
+
+    # SQL query counts, slow-query log and N+1 detection
+    query_log.init_query_log(app)
+
+    # Per-endpoint rate limits, checked before any request handler runs
+    rate_limit.init_rate_limit(app, utils.redis_client)
+    app.before_request(rate_limit.check_request)
     
     # Log application start
-    root_logger.info(f"Starting w3tasq in {config_name} mode")
+    root_logger.info("Starting w3tasq in %s mode", config_name)
     # app_logger.debug(f"db_path: {app.config.get('SQLALCHEMY_DATABASE_URI')}")
 
     # Register custom filters
@@ -62,10 +67,107 @@ def create_app(config_name='default'):
     # Initialize extensions
     db.init_app(app)
     
-    # Create tables
+    # Create tables and add columns missing from older databases
     with app.app_context():
         db.create_all()
+        db_utils.ensure_schema()
+
+    @app.cli.command('create-indexes')
+    def create_indexes_command():
+        """Build the indexes missing from an existing database (blocks writes meanwhile)."""
+        created = db_utils.create_missing_indexes()
+        click.echo(f"Created indexes: {', '.join(created)}" if created else "All indexes exist")
+
+    # Per-route request metrics and the Prometheus /metrics endpoint
+    metrics_export.init_metrics_export(app)
+
+    # Background jobs (started per worker by gunicorn.conf.py or by `flask run-jobs`)
+    jobs.init_jobs(app)
+
+    # Synthetic data for capacity planning (`flask seed`)
+    seeding.init_seeding(app)
     
+    def _authenticate(scope):
+        """
+        Identify the user of an API request: Bearer API token or cookie session.
+        Returns:
+            tuple: (user_id, user_address, None) or (None, None, error response)
+        """
+        try:
+            claims = api_tokens.request_claims()
+        except api_tokens.InvalidTokenError as e:
+            return None, None, (jsonify({'error': str(e)}), 401)
+        if claims is not None:
+            if scope not in claims['scp']:
+                return None, None, (jsonify({'error': f"API token lacks the '{scope}' scope"}), 403)
+            return claims['sub'], claims['addr'], None
+        if not session.get('authenticated') or not session.get('user_id'):
+            return None, None, (jsonify({'error': 'Authentication required'}), 401)
+        return session['user_id'], session.get('user_address', 'unknown'), None
+
+    def _stream_tasks_page(user_id, user_address, cursor_id, limit):
+        """
+        GET /api/tasks response for large pages, streamed batch by batch.
+        The same JSON as the buffered response, but only TASKS_STREAM_BATCH
+        tasks are held at a time, so the memory a request needs does not grow
+        with the page size.
+
+        Every batch is its own short keyset query (get_user_tasks_cursor after
+        the last task sent) in its own app context: its session, and with it
+        the SQLite read transaction, ends before the batch is sent, however
+        slowly the client reads. Writers are never blocked by a download.
+
+        The first batch is fetched here, so an early failure still gets a 500.
+        A failure in a later batch is re-raised: the server drops the
+        connection, and the client sees an incomplete response, not a
+        complete-looking 200. The request's context (request id, timing) is
+        carried into the batches.
+        """
+        batch_size = app.config.get('TASKS_STREAM_BATCH', 100)
+        context = contextvars.copy_context()
+
+        def fetch(after_id, remaining):
+            # One batch: (JSON of its tasks without brackets, task count, last task id, has_more)
+            tasks, _, has_more = db_utils.get_user_tasks_cursor(user_id, after_id, min(batch_size, remaining))
+            with timing.phase('serialize'):
+                tasks_json = app.json.dumps([task.to_dict() for task in tasks], separators=(',', ':'))[1:-1]
+            return tasks_json, len(tasks), tasks[-1].id if tasks else None, has_more
+
+        def fetch_detached(after_id, remaining):
+            # Session removed, transaction ended, when the app context is popped
+            with app.app_context():
+                return fetch(after_id, remaining)
+
+        tasks_json, count, last_id, has_more = fetch(cursor_id, limit)
+
+        def generate():
+            nonlocal tasks_json, count, last_id, has_more
+            yield '{"tasks":[' + tasks_json
+            try:
+                while has_more and count < limit:
+                    tasks_json, fetched, last_id, has_more = context.run(fetch_detached, last_id, limit - count)
+                    count += fetched
+                    if fetched:
+                        yield ',' + tasks_json
+            except Exception as e:
+                context.run(app_logger.error, "Error while streaming tasks, aborting the response: %s", e)
+                raise
+            pagination_info = {
+                'has_more': has_more,
+                'next_cursor': last_id if has_more else None,
+                'limit': limit
+            }
+            yield '],"pagination":' + app.json.dumps(pagination_info, separators=(',', ':')) + '}\n'
+            context.run(app_logger.info, "Streamed %s tasks for user %s", count,
+                        shorten_wallet_address(user_address), extra={'event': 'tasks_retrieved'})
+
+        return Response(generate(), mimetype='application/json')
+
+    stream_threshold = app.config.get('TASKS_STREAM_THRESHOLD')
+    if stream_threshold is not None and stream_threshold > app.config.get('TASKS_PER_PAGE_MAX', stream_threshold):
+        app_logger.warning("TASKS_STREAM_THRESHOLD %s is above TASKS_PER_PAGE_MAX %s: no page is streamed",
+                           stream_threshold, app.config.get('TASKS_PER_PAGE_MAX'))
+
     @app.route('/')
     def index():
         app_logger.debug("Processing index route")
@@ -84,7 +186,7 @@ def create_app(config_name='default'):
     
     @app.route('/api/auth/logout', methods=['POST'])
     def logout():
-        app_logger.info(f"User {shorten_wallet_address(session.get('user_address', 'unknown'))} logged out")
+        app_logger.info("User %s logged out", shorten_wallet_address(session.get('user_address', 'unknown')))
         """Clear authentication session"""
         session.clear()
         return jsonify({'success': True, 'message': 'Logged out successfully'})
@@ -104,17 +206,21 @@ def create_app(config_name='default'):
             # Generate challenge message using existing utils function
             message = utils.generate_challenge_message(address)
             
-            app_logger.info(f"Generated challenge for address {shorten_wallet_address(address)}")
+            app_logger.info("Generated challenge for address %s", shorten_wallet_address(address),
+                            extra={'event': 'challenge_generated'})
             return jsonify({
                 'success': True,
                 'message': message
             })
             
         except ValueError as e:
-            app_logger.error(f"ValueError in challenge request: {str(e)}")
+            app_logger.error("ValueError in challenge request: %s", e)
             return jsonify({'error': str(e)}), 400
+        except challenge_store.ChallengeStoreUnavailableError as e:
+            app_logger.warning("Challenge store unavailable: %s", e)
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
         except Exception as e:
-            app_logger.error(f"Unexpected error in challenge request: {str(e)}")
+            app_logger.error("Unexpected error in challenge request: %s", e)
             return jsonify({'error': 'Internal server error'}), 500
     
     @app.route('/api/auth/verify', methods=['POST'])
@@ -131,14 +237,16 @@ def create_app(config_name='default'):
                 return jsonify({'error': 'Address and signature are required'}), 400
             
             # Verify signature using existing utils function
-            is_valid, message = utils.verify_signature(address, signature)
+            # (the challenge message is only needed in 'hmac' challenge mode)
+            is_valid, message = utils.verify_signature(address, signature, data.get('message'))
             
             if not is_valid:
-                app_logger.warning(f"Signature verification failed for address {shorten_wallet_address(address)}: {message}")
+                app_logger.warning("Signature verification failed for address %s: %s", shorten_wallet_address(address), message)
                 return jsonify({'error': message}), 401
             user_db, was_created = db_utils.get_or_create_user(address)
 
-            app_logger.info(f"Signature verified for address {shorten_wallet_address(address)}, user {'created' if was_created else 'exists'}")
+            app_logger.info("Signature verified for address %s, user %s", shorten_wallet_address(address), 'created' if was_created else 'exists',
+                            extra={'event': 'signature_verified'})
 
             # Store user in session
             session['user_address'] = address
@@ -150,9 +258,15 @@ def create_app(config_name='default'):
                 'address': address,
                 'message': message
             })
+
+        except utils.RETRYABLE_VERIFICATION_ERRORS as e:
+            # Verification pool is saturated or the challenge store is down;
+            # the client should request a new challenge and retry
+            app_logger.warning("Signature verification unavailable: %s", e)
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
                 
         except Exception as e:
-            app_logger.error(f"Unexpected error in signature verification: {str(e)}")
+            app_logger.error("Unexpected error in signature verification: %s", e)
             return jsonify({'error': 'Internal server error'}), 500
     
     @app.route('/api/tasks', methods=['POST'])
@@ -160,12 +274,12 @@ def create_app(config_name='default'):
         """Create a new task for authenticated user"""
         app_logger.debug("Processing task creation")
         try:
-            # Check authentication
-            if not session.get('authenticated') or not session.get('user_id'):
+            # Check authentication (session or API token)
+            user_id, user_address, auth_error = _authenticate('tasks:write')
+            if auth_error:
                 app_logger.warning("Unauthorized task creation attempt")
-                return jsonify({'error': 'Authentication required'}), 401
-            
-            user_id = session['user_id']
+                return auth_error
+
             data = request.get_json()
             
             # Validate required fields
@@ -173,22 +287,35 @@ def create_app(config_name='default'):
                 app_logger.error("Title is required for task creation")
                 return jsonify({'error': 'Title is required'}), 400
             
+            # Optional deadline as ISO 8601 (timezone-aware values are converted to UTC)
+            deadline = None
+            if data.get('deadline'):
+                try:
+                    deadline = datetime.fromisoformat(str(data['deadline']).replace('Z', '+00:00'))
+                except ValueError:
+                    app_logger.error("Invalid deadline: %s", data['deadline'])
+                    return jsonify({'error': 'Deadline must be an ISO 8601 date and time'}), 400
+                if deadline.tzinfo is not None:
+                    deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
+
             # Create task
             task = db_utils.create_task(
                 user_id=user_id,
                 title=data['title'],
                 description=data.get('description', ''),
                 priority=data.get('priority', 3),  # Default LOW
-                status=data.get('status', 0)       # Default ACTIVE
+                status=data.get('status', 0),      # Default ACTIVE
+                deadline=deadline
             )
-            app_logger.info(f"Task '{data['title']}' added by user {shorten_wallet_address(session.get('user_address', 'unknown'))}")
+            app_logger.info("Task '%s' added by user %s", data['title'], shorten_wallet_address(user_address),
+                            extra={'event': 'task_created'})
             return jsonify({
                 'success': True,
                 'task': task.to_dict()
             }), 201
 
         except Exception as e:
-            app_logger.error(f"Unexpected error in task creation: {str(e)}")
+            app_logger.error("Unexpected error in task creation: %s", e)
             db.session.rollback()
             return jsonify({'error': 'Internal server error'}), 500
     
@@ -197,21 +324,18 @@ def create_app(config_name='default'):
         """Get tasks for the authenticated user with cursor-based pagination."""
         app_logger.debug("Processing task retrieval")
         try:
-            # Check authentication
-            if not session.get('authenticated') or not session.get('user_id'):
+            # Check authentication (session or API token)
+            user_id, user_address, auth_error = _authenticate('tasks:read')
+            if auth_error:
                 app_logger.warning("Unauthorized task retrieval attempt")
-                return jsonify({'error': 'Authentication required'}), 401
-            
-            user_id = session['user_id']
+                return auth_error
+
 
             # --- Cursor-based Pagination ---
             try:
                 # Get cursor from URL
                 cursor_str = request.args.get('cursor', None)
                 
-                # Get limit from config
-                limit = app.config.get('TASKS_PER_PAGE', 12)
-                
                 # Convert cursor to number if it exists
                 cursor_id = None
                 if cursor_str:
@@ -220,22 +344,42 @@ def create_app(config_name='default'):
             except (ValueError, TypeError):
                 app_logger.debug("Invalid cursor, resetting to None")
                 cursor_id = None
-                limit = app.config.get('TASKS_PER_PAGE', 12)
+
+            # Page size: the client may ask for larger pages (fast scrolling),
+            # bounded by TASKS_PER_PAGE_MIN / TASKS_PER_PAGE_MAX
+            limit = app.config.get('TASKS_PER_PAGE', 12)
+            limit_str = request.args.get('limit', None)
+            if limit_str:
+                try:
+                    limit = int(limit_str)
+                except (ValueError, TypeError):
+                    app_logger.debug("Invalid limit, using default page size")
+                limit = max(app.config.get('TASKS_PER_PAGE_MIN', 1),
+                            min(limit, app.config.get('TASKS_PER_PAGE_MAX', limit)))
             
+            # Large pages are streamed instead of building the task list, the
+            # list of dicts and the JSON string in memory at once
+            stream_threshold = app.config.get('TASKS_STREAM_THRESHOLD')
+            if stream_threshold is not None and limit >= stream_threshold:
+                return _stream_tasks_page(user_id, user_address, cursor_id, limit)
+
             # Get tasks and pagination info
             tasks, next_cursor_id, has_more = db_utils.get_user_tasks_cursor(
                 user_id, cursor_id, limit
             )
 
-            app_logger.info(f"Retrieved {len(tasks)} tasks for user {shorten_wallet_address(session.get('user_address', 'unknown'))}")
+            app_logger.info("Retrieved %s tasks for user %s", len(tasks), shorten_wallet_address(user_address),
+                            extra={'event': 'tasks_retrieved'})
             
             # Prepare data for response
-            tasks_data = [task.to_dict() for task in tasks]
+            with timing.phase('serialize'):
+                tasks_data = [task.to_dict() for task in tasks]
             
             # Create simplified pagination info
             pagination_info = {
                 'has_more': has_more,
-                'next_cursor': next_cursor_id if has_more else None
+                'next_cursor': next_cursor_id if has_more else None,
+                'limit': limit
             }
             
             return jsonify({
@@ -244,7 +388,7 @@ def create_app(config_name='default'):
             })
             
         except Exception as e:
-            app_logger.error(f"Unexpected error in task retrieval: {str(e)}")
+            app_logger.error("Unexpected error in task retrieval: %s", e)
             return jsonify({'error': 'Internal server error'}), 500
     
     @app.route('/api/tasks/<int:task_id>', methods=['PATCH'])
@@ -254,14 +398,14 @@ def create_app(config_name='default'):
         PATCH /api/tasks/<task_id>
         Expects JSON: {"status": 0|1|2}
         """
-        app_logger.debug(f"Processing status update for task {task_id}")
+        app_logger.debug("Processing status update for task %s", task_id)
         try:
-            # 1. Check authentication
-            if not session.get('authenticated') or not session.get('user_id'):
+            # 1. Check authentication (session or API token)
+            user_id, user_address, auth_error = _authenticate('tasks:write')
+            if auth_error:
                 app_logger.warning("Unauthorized task status update attempt")
-                return jsonify({'error': 'Authentication required'}), 401
+                return auth_error
 
-            user_id = session['user_id']
             data = request.get_json()
 
             # 2. Validate incoming data presence and structure
@@ -285,7 +429,7 @@ def create_app(config_name='default'):
             if authorized_result is False:
                 # User is not authorized (task not found or belongs to another user)
                 # Returning 404 aligns with common REST practices for this scenario.
-                app_logger.warning(f"Unauthorized task update attempt: {auth_message}")
+                app_logger.warning("Unauthorized task update attempt: %s", auth_message)
                 return jsonify({'error': auth_message}), 404
 
             # If authorized_result is not False, it's the Task instance
@@ -298,11 +442,12 @@ def create_app(config_name='default'):
             if not success:
                 # 5a. Return error response if update failed (validation or DB error)
                 # The utility function should have handled session rollback on error
-                app_logger.error(f"Task status update failed: {update_message}")
+                app_logger.error("Task status update failed: %s", update_message)
                 return jsonify({'error': update_message}), 400 # Use 400 for client errors like validation
             # 5a. Return success response with updated task data
             # The task_instance should be updated by update_task_status_internal
-            app_logger.info(f"Task {task_id} status updated to {new_status} by user {shorten_wallet_address(session.get('user_address', 'unknown'))}")                        
+            app_logger.info("Task %s status updated to %s by user %s", task_id, new_status, shorten_wallet_address(user_address),
+                            extra={'event': 'task_status_updated'})
             return jsonify({
                 'success': True,
                 'message': update_message, # Message from the utility function
@@ -313,10 +458,170 @@ def create_app(config_name='default'):
             # 6. Handle unexpected errors
             # Log the error for debugging in production (consider using app.logger)
             # print(f"Unexpected error in update_task_status: {e}") # For debugging
-            app_logger.error(f"Unexpected error in task status update: {str(e)}")
+            app_logger.error("Unexpected error in task status update: %s", e)
             db.session.rollback() # Ensure session is clean on unexpected error
             return jsonify({'error': 'Internal server error'}), 500
+
+    @app.route('/api/tasks', methods=['PATCH'])
+    def update_tasks_status_batch():
+        """
+        Update the status of several tasks of the authenticated user at once.
+        PATCH /api/tasks
+        Expects JSON: {"updates": [{"id": <task_id>, "status": 0|1|2}, ...]}
+        Items are validated one by one; the response carries a result per task
+        so the client can roll back only the items that failed.
+        """
+        app_logger.debug("Processing batch status update")
+        try:
+            # Check authentication (session or API token)
+            user_id, user_address, auth_error = _authenticate('tasks:write')
+            if auth_error:
+                app_logger.warning("Unauthorized batch status update attempt")
+                return auth_error
+
+            data = request.get_json(silent=True)
+
+            if not data or not isinstance(data.get('updates'), list) or not data['updates']:
+                app_logger.error("Batch update requires a non-empty 'updates' list")
+                return jsonify({'error': "Request body must contain a non-empty 'updates' list"}), 400
+
+            updates = data['updates']
+            max_batch = app.config.get('TASKS_BATCH_MAX', 50)
+            if len(updates) > max_batch:
+                app_logger.error("Batch update too large: %s items", len(updates))
+                return jsonify({'error': f'Too many updates in one batch (max {max_batch})'}), 400
+
+            for item in updates:
+                # type() rather than isinstance(): JSON true/false are bools, and bool subclasses int
+                if not isinstance(item, dict) or type(item.get('id')) is not int or type(item.get('status')) is not int:
+                    app_logger.error("Malformed batch update item: %s", item)
+                    return jsonify({'error': "Each update must look like {\"id\": <int>, \"status\": <int>}"}), 400
+
+            results = db_utils.update_tasks_status_batch(user_id, updates)
+
+            results_data = []
+            for task_id, task, message in results:
+                if task is None:
+                    results_data.append({'id': task_id, 'success': False, 'error': message})
+                else:
+                    results_data.append({'id': task_id, 'success': True, 'task': task.to_dict()})
+
+            updated = sum(1 for item in results_data if item['success'])
+            app_logger.info("Batch update: %s/%s tasks updated by user %s", updated, len(results_data), shorten_wallet_address(user_address),
+                            extra={'event': 'tasks_batch_updated'})
+            return jsonify({
+                'success': updated == len(results_data),
+                'results': results_data
+            }), 200
+
+        except Exception as e:
+            app_logger.error("Unexpected error in batch status update: %s", e)
+            db.session.rollback()
+            return jsonify({'error': 'Internal server error'}), 500
     
+    @app.route('/api/tokens', methods=['POST'])
+    def create_api_token():
+        """
+        Mint an API token for the wallet logged in with this session.
+        POST /api/tokens
+        Expects JSON (all fields optional): {"name": str, "scopes": [...], "ttl_days": int}
+        The token itself is only returned in this response.
+        """
+        app_logger.debug("Processing API token creation")
+        try:
+            # Tokens are minted only after a verified wallet login, not with another token
+            if not session.get('authenticated') or not session.get('user_id'):
+                app_logger.warning("Unauthorized API token creation attempt")
+                return jsonify({'error': 'Authentication required'}), 401
+
+            data = request.get_json(silent=True) or {}
+            scopes = data.get('scopes', list(api_tokens.SCOPES))
+            if not isinstance(scopes, list) or not scopes or any(scope not in api_tokens.SCOPES for scope in scopes):
+                app_logger.error("Invalid API token scopes: %s", scopes)
+                return jsonify({'error': f'Scopes must be a non-empty list of {list(api_tokens.SCOPES)}'}), 400
+
+            ttl_days = data.get('ttl_days', app.config.get('API_TOKEN_TTL_DAYS', 90))
+            max_ttl_days = app.config.get('API_TOKEN_MAX_TTL_DAYS', 365)
+            if not isinstance(ttl_days, int) or not 1 <= ttl_days <= max_ttl_days:
+                app_logger.error("Invalid API token ttl_days: %s", ttl_days)
+                return jsonify({'error': f'ttl_days must be an integer between 1 and {max_ttl_days}'}), 400
+
+            name = str(data.get('name', ''))[:80]
+            user_id = session['user_id']
+            user_address = session.get('user_address', 'unknown')
+            token, claims = api_tokens.issuer.issue(user_id, user_address, scopes, timedelta(days=ttl_days))
+            record = db_utils.create_api_token_record(
+                user_id=user_id,
+                jti=claims['jti'],
+                scopes=scopes,
+                expires_at=datetime.utcfromtimestamp(claims['exp']),
+                name=name
+            )
+            app_logger.info("API token %s created by user %s", record.jti, shorten_wallet_address(user_address))
+            return jsonify({
+                'success': True,
+                'token': token,
+                'token_info': record.to_dict()
+            }), 201
+
+        except Exception as e:
+            app_logger.error("Unexpected error in API token creation: %s", e)
+            db.session.rollback()
+            return jsonify({'error': 'Internal server error'}), 500
+
+    @app.route('/api/tokens', methods=['GET'])
+    def get_api_tokens():
+        """List the API tokens of the wallet logged in with this session (without the secrets)."""
+        app_logger.debug("Processing API token listing")
+        try:
+            if not session.get('authenticated') or not session.get('user_id'):
+                app_logger.warning("Unauthorized API token listing attempt")
+                return jsonify({'error': 'Authentication required'}), 401
+
+            records = db_utils.get_user_api_tokens(session['user_id'])
+            return jsonify({'tokens': [record.to_dict() for record in records]})
+
+        except Exception as e:
+            app_logger.error("Unexpected error in API token listing: %s", e)
+            return jsonify({'error': 'Internal server error'}), 500
+
+    @app.route('/api/tokens/<token_id>', methods=['DELETE'])
+    def revoke_api_token(token_id):
+        """
+        Revoke an API token of the user.
+        DELETE /api/tokens/<token_id>
+        Allowed with the session, or with any valid token of the same user
+        (a script can revoke its own token).
+        """
+        app_logger.debug("Processing API token revocation for %s", token_id)
+        try:
+            try:
+                claims = api_tokens.request_claims()
+            except api_tokens.InvalidTokenError as e:
+                return jsonify({'error': str(e)}), 401
+            if claims is not None:
+                user_id, user_address = claims['sub'], claims['addr']
+            elif session.get('authenticated') and session.get('user_id'):
+                user_id, user_address = session['user_id'], session.get('user_address', 'unknown')
+            else:
+                app_logger.warning("Unauthorized API token revocation attempt")
+                return jsonify({'error': 'Authentication required'}), 401
+
+            record, message = db_utils.revoke_api_token(user_id, token_id)
+            if record is None:
+                app_logger.warning("API token revocation failed: %s", message)
+                return jsonify({'error': message}), 404 if message == "API token not found" else 500
+
+            # Effective at once in this worker, within the cache TTL in the others
+            api_tokens.issuer.revoked.add(record.jti)
+            app_logger.info("API token %s revoked by user %s", record.jti, shorten_wallet_address(user_address))
+            return jsonify({'success': True, 'message': message, 'token_info': record.to_dict()})
+
+        except Exception as e:
+            app_logger.error("Unexpected error in API token revocation: %s", e)
+            db.session.rollback()
+            return jsonify({'error': 'Internal server error'}), 500
+
     return app
 
 # app = create_app(config_name=FLASK_ENV)
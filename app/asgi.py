@@ -0,0 +1,404 @@
+# app/asgi.py
+"""
+ASGI serving mode.
+
+    uvicorn app.main_asgi:app            (or gunicorn -k uvicorn.workers.UvicornWorker)
+
+The wallet auth endpoints, which mostly wait on Redis, run as async handlers:
+challenge storage and consumption go through redis.asyncio, so a waiting
+request holds no OS thread. Blocking work (signature recovery, SQLite, the
+sync rate limiter) runs in a bounded thread pool; when the pool and its queue
+are full, requests get 503 immediately instead of queueing without limit.
+
+Every other route is served by the regular Flask app through a WSGI bridge
+running in the same bounded pool, so behavior (sessions, API tokens, errors)
+is the same as under gunicorn. Sessions created by the async login handler are
+regular Flask session cookies.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from flask import session, jsonify
+from app import utils, db_utils, challenges, challenge_store, signature_service, rate_limit, metrics
+from app.app import create_app
+from app.template_filters import shorten_wallet_address
+
+# Set up logger
+logger = logging.getLogger('w3tasq.asgi')
+
+JSON_HEADERS = [(b'content-type', b'application/json')]
+_DONE = object()
+
+
+class ExecutorBusyError(Exception):
+    """All worker threads and queue slots of the bounded executor are taken."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking work with a hard limit on admitted calls.
+
+    Args:
+        workers: Number of threads.
+        max_queue: Calls allowed to wait for a free thread.
+    """
+
+    def __init__(self, workers=8, max_queue=64):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='w3tasq-asgi')
+        # Only touched from the event loop thread, so no lock is needed
+        self._pending = 0
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` in the pool and return its result.
+        Raises:
+            ExecutorBusyError: the pool and its queue are full.
+        """
+        if self._pending >= self.workers + self.max_queue:
+            metrics.inc('asgi_rejected_busy')
+            raise ExecutorBusyError("Server is busy, please retry")
+        self._pending += 1
+        try:
+            return await self.run_admitted(fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def run_admitted(self, fn, *args):
+        """Run follow-up work of an already admitted request, without the admission check."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _json_body(status, payload, headers=None):
+    return status, JSON_HEADERS + (headers or []), json.dumps(payload).encode()
+
+
+def _parse_json(body):
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class ASGIApp:
+    """
+    ASGI application serving `flask_app`, with async wallet auth handlers.
+
+    Args:
+        flask_app: Application from create_app().
+        async_store: Async challenge store; by default a redis.asyncio store
+                     when CHALLENGE_STORE is 'redis', else the configured
+                     (sync) store is used through the executor.
+    """
+
+    def __init__(self, flask_app, async_store=None):
+        self.flask_app = flask_app
+        self.executor = BoundedExecutor(
+            workers=flask_app.config.get('ASGI_EXECUTOR_WORKERS', 8),
+            max_queue=flask_app.config.get('ASGI_EXECUTOR_MAX_QUEUE', 64)
+        )
+        self.async_store = async_store
+        self._redis = None
+        self._routes = {
+            ('POST', '/api/auth/challenge'): self.get_challenge,
+            ('POST', '/api/auth/verify'): self.verify_signature,
+        }
+
+    # --- Plumbing ---
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await self._read_body(receive)
+        handler = self._routes.get((scope['method'], scope['path']))
+        try:
+            if handler is None:
+                await self._call_wsgi(scope, body, send)
+                return
+            status, headers, content = await handler(scope, body)
+        except ExecutorBusyError as e:
+            status, headers, content = _json_body(503, {'error': str(e)}, [(b'retry-after', b'1')])
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def aclose(self):
+        """Close the async Redis client and the executor."""
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+        self.executor.shutdown()
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    def _environ(self, scope, body):
+        """PEP 3333 environ for an ASGI HTTP scope."""
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        client = scope.get('client')
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0] if client else '',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+                continue
+            if name == 'CONTENT_LENGTH':
+                continue
+            key = f'HTTP_{name}'
+            if key in environ:
+                value = f"{environ[key]}{'; ' if name == 'COOKIE' else ','}{value}"
+            environ[key] = value
+        return environ
+
+    async def _call_wsgi(self, scope, body, send):
+        """Serve the request with the Flask app, streaming its response body chunk by chunk."""
+        environ = self._environ(scope, body)
+
+        def start():
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started['status'] = int(status.split(' ', 1)[0])
+                started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+                return lambda data: None
+
+            iterable = self.flask_app(environ, start_response)
+            return started, iterable
+
+        started, iterable = await self.executor.run(start)
+        iterator = iter(iterable)
+        try:
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            while True:
+                chunk = await self.executor.run_admitted(next, iterator, _DONE)
+                if chunk is _DONE:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(iterable, 'close'):
+                await self.executor.run_admitted(iterable.close)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    # --- Challenge storage ---
+
+    def _get_async_store(self):
+        # Created on first use, inside the running event loop
+        if self.async_store is None and self.flask_app.config.get('CHALLENGE_STORE') == 'redis':
+            import redis.asyncio as aioredis
+            config = self.flask_app.config
+            self._redis = aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool(
+                host=config['REDIS_HOST'],
+                port=config['REDIS_PORT'],
+                password=config['REDIS_PASSWORD'],
+                max_connections=config.get('REDIS_MAX_CONNECTIONS', 10),
+                timeout=config.get('REDIS_POOL_TIMEOUT', 2),
+                socket_timeout=config.get('REDIS_SOCKET_TIMEOUT', 2),
+                socket_connect_timeout=config.get('REDIS_SOCKET_CONNECT_TIMEOUT', 2),
+                health_check_interval=config.get('REDIS_HEALTH_CHECK_INTERVAL', 30),
+                decode_responses=True
+            ))
+            sync_store = challenge_store.store
+            # Same breaker and fallback as the sync store
+            self.async_store = challenge_store.AsyncBreakerChallengeStore(
+                challenge_store.AsyncRedisChallengeStore(self._redis),
+                sync_store.breaker,
+                sync_store.fallback
+            )
+        return self.async_store
+
+    async def _store_challenge(self, normalized_address, challenge_data):
+        store = self._get_async_store()
+        if store is None:
+            await self.executor.run(utils.store_challenge, normalized_address, challenge_data)
+        else:
+            await store.put(normalized_address, challenge_data, challenges.ttl)
+
+    async def _consume_challenge(self, normalized_address):
+        store = self._get_async_store()
+        if store is None:
+            return await self.executor.run(utils.consume_challenge, normalized_address)
+        return await store.consume(normalized_address)
+
+    async def _claim_nonce(self, nonce):
+        store = self._get_async_store()
+        if store is None:
+            return await self.executor.run(challenges.challenger.consume, nonce)
+        return await store.claim(challenges.challenger.nonce_key(nonce), challenges.challenger.ttl)
+
+    # --- Handlers (same contract as the Flask routes in app/app.py) ---
+
+    async def _rate_limited(self, endpoint, scope, data):
+        """429 response if the request is over its limit, else None."""
+        limiter = rate_limit.limiter
+        if limiter is None or endpoint not in limiter.limits:
+            return None
+        client = scope.get('client')
+        # Same client address as request.remote_addr behind the WSGI ProxyFix
+        forwarded_for = ','.join(value.decode('latin-1') for name, value in scope.get('headers', [])
+                                 if name.lower() == b'x-forwarded-for')
+        ip = rate_limit.client_ip(client[0] if client else None, forwarded_for,
+                                  self.flask_app.config.get('PROXY_FIX_X_FOR', 0))
+        retry_after = await self.executor.run(
+            limiter.check, endpoint, ip, rate_limit.wallet_identity((data or {}).get('address'))
+        )
+        if retry_after <= 0:
+            return None
+        metrics.inc('rate_limited')
+        logger.warning("Rate limited %s, retry in %.1fs", endpoint, retry_after)
+        return _json_body(429, {'error': 'Too many requests, please retry later'},
+                          [(b'retry-after', str(max(1, math.ceil(retry_after))).encode())])
+
+    async def get_challenge(self, scope, body):
+        logger.debug("Processing challenge request")
+        data = _parse_json(body)
+        limited = await self._rate_limited('get_challenge', scope, data)
+        if limited:
+            return limited
+        try:
+            address = (data or {}).get('address')
+            if not address:
+                logger.error("Address is required for challenge")
+                return _json_body(400, {'error': 'Address is required'})
+
+            normalized_address, message, challenge_data = utils.new_challenge(address)
+            if challenge_data is not None:
+                await self._store_challenge(normalized_address, challenge_data)
+
+            logger.info("Generated challenge for address %s", shorten_wallet_address(address), extra={'event': 'challenge_generated'})
+            return _json_body(200, {'success': True, 'message': message})
+
+        except ValueError as e:
+            logger.error("ValueError in challenge request: %s", e)
+            return _json_body(400, {'error': str(e)})
+        except challenge_store.ChallengeStoreUnavailableError as e:
+            logger.warning("Challenge store unavailable: %s", e)
+            return _json_body(503, {'error': str(e)}, [(b'retry-after', b'5')])
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error("Unexpected error in challenge request: %s", e)
+            return _json_body(500, {'error': 'Internal server error'})
+
+    async def _check_signature(self, address, signature, message):
+        """Async version of utils.verify_signature(): (is_valid, message)."""
+        from eth_utils import to_checksum_address
+        try:
+            normalized_address = to_checksum_address(address)
+            stored_challenge = None
+            if challenges.mode != 'hmac':
+                stored_challenge = await self._consume_challenge(normalized_address)
+            signed_message, nonce, error = utils.check_challenge(normalized_address, message, stored_challenge)
+            if error:
+                return False, error
+
+            recovered_address = await self.executor.run(signature_service.recover, signed_message, signature)
+            is_valid, result = utils.check_recovered_address(normalized_address, recovered_address)
+            if is_valid and nonce is not None:
+                return utils.check_nonce_claim(normalized_address, await self._claim_nonce(nonce), result)
+            return is_valid, result
+
+        except utils.RETRYABLE_VERIFICATION_ERRORS + (ExecutorBusyError,):
+            raise
+        except Exception as e:
+            return utils.verification_error(address, e)
+
+    def _login(self, scope, body, address, message):
+        """Create the user if needed and answer with a Flask session cookie (runs in the executor)."""
+        with self.flask_app.request_context(self._environ(scope, body)):
+            user_db, was_created = db_utils.get_or_create_user(address)
+            logger.info("Signature verified for address %s, user %s", shorten_wallet_address(address), 'created' if was_created else 'exists', extra={'event': 'signature_verified'})
+            session['user_address'] = address
+            session['user_id'] = user_db.id
+            session['authenticated'] = True
+            response = self.flask_app.process_response(jsonify({
+                'success': True,
+                'address': address,
+                'message': message
+            }))
+            headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+            return response.status_code, headers, response.get_data()
+
+    async def verify_signature(self, scope, body):
+        logger.debug("Processing signature verification")
+        data = _parse_json(body)
+        limited = await self._rate_limited('verify_signature', scope, data)
+        if limited:
+            return limited
+        try:
+            address = (data or {}).get('address')
+            signature = (data or {}).get('signature')
+            if not address or not signature:
+                logger.error("Address and signature are required for verification")
+                return _json_body(400, {'error': 'Address and signature are required'})
+
+            is_valid, message = await self._check_signature(address, signature, data.get('message'))
+            if not is_valid:
+                logger.warning("Signature verification failed for address %s: %s", shorten_wallet_address(address), message)
+                return _json_body(401, {'error': message})
+
+            return await self.executor.run(self._login, scope, body, address, message)
+
+        except utils.RETRYABLE_VERIFICATION_ERRORS as e:
+            logger.warning("Signature verification unavailable: %s", e)
+            return _json_body(503, {'error': str(e)}, [(b'retry-after', b'1')])
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error("Unexpected error in signature verification: %s", e)
+            return _json_body(500, {'error': 'Internal server error'})
+
+
+def create_asgi_app(config_name='default'):
+    """Factory function to create the ASGI application"""
+    return ASGIApp(create_app(config_name=config_name))
@@ -0,0 +1,421 @@
+# app/challenge_store.py
+"""
+Storage backends for login challenges ('redis' challenge mode).
+
+A challenge store keeps one pending challenge per wallet address for a short
+TTL and hands it out exactly once. It also records the nonces of used
+'hmac' mode challenges (claim), so they are rejected by every worker until
+they expire. Backends:
+  - RedisChallengeStore: shared by all workers and hosts (default).
+  - MemoryChallengeStore: in-process, for tests and single-worker setups.
+  - SQLiteChallengeStore: a small SQLite table shared by the gunicorn
+    workers of one host, no Redis needed.
+The backend is selected with CHALLENGE_STORE in app/config.py.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from app import metrics
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# Set up logger
+logger = logging.getLogger('w3tasq.challenge_store')
+
+KEY_PREFIX = "w3tasq_challenge:"
+
+
+class ChallengeStoreUnavailableError(Exception):
+    """The challenge store can not be reached and there is no fallback."""
+
+
+class ChallengeStore(ABC):
+    """Interface of a challenge store."""
+
+    @abstractmethod
+    def put(self, address, challenge_data, ttl):
+        """Store `challenge_data` (dict of str) for `address`, replacing any previous one."""
+
+    @abstractmethod
+    def consume(self, address):
+        """
+        Atomically fetch and delete the challenge of `address`.
+        Returns:
+            dict: The stored challenge fields, empty if there is none (or it expired).
+        """
+
+    @abstractmethod
+    def claim(self, key, ttl):
+        """
+        Atomically record `key` as used for `ttl` seconds.
+        Returns:
+            bool: True if the key was not recorded yet, False if it was (or can not be recorded).
+        """
+
+
+class RedisChallengeStore(ChallengeStore):
+    """Challenges as Redis hashes with a TTL."""
+
+    # Fetch-and-consume of a challenge in one atomic step: two concurrent
+    # verifications of the same challenge can not both see it.
+    CONSUME_LUA = """
+local challenge = redis.call('HGETALL', KEYS[1])
+if #challenge > 0 then
+    redis.call('DEL', KEYS[1])
+end
+return challenge
+"""
+
+    def __init__(self, client):
+        self.client = client
+        # Registered scripts are sent with EVALSHA and loaded on first use
+        self._consume_script = client.register_script(self.CONSUME_LUA)
+
+    def put(self, address, challenge_data, ttl):
+        # HSET and EXPIRE in one round trip (MULTI/EXEC pipeline)
+        redis_key = f"{KEY_PREFIX}{address}"
+        with metrics.timed('redis_store_challenge'):
+            pipe = self.client.pipeline(transaction=True)
+            pipe.hset(redis_key, mapping=challenge_data)
+            pipe.expire(redis_key, ttl)
+            pipe.execute()
+
+    def consume(self, address):
+        redis_key = f"{KEY_PREFIX}{address}"
+        with metrics.timed('redis_consume_challenge'):
+            flat = self._consume_script(keys=[redis_key])
+        # HGETALL inside Lua returns a flat [field, value, field, value, ...] list
+        return dict(zip(flat[::2], flat[1::2]))
+
+    def claim(self, key, ttl):
+        with metrics.timed('redis_claim_nonce'):
+            return bool(self.client.set(f"{KEY_PREFIX}{key}", 1, nx=True, ex=ttl))
+
+
+class MemoryChallengeStore(ChallengeStore):
+    """
+    In-process challenge store with TTL expiry and a size bound.
+
+    Entries are kept in insertion order; since every challenge gets the same
+    TTL this is also expiry order, so expired entries are dropped from the
+    front on each write. When the store is full the oldest challenge is evicted.
+    Claimed keys are kept the same way, but never evicted: a full store
+    rejects new claims instead of forgetting used nonces.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # address -> (expires_at, challenge_data)
+        self._claimed = OrderedDict()  # key -> (expires_at, None)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _purge(entries, now):
+        while entries:
+            key, (expires_at, _) = next(iter(entries.items()))
+            if expires_at > now:
+                break
+            del entries[key]
+
+    def _purge_expired(self, now):
+        self._purge(self._entries, now)
+
+    def put(self, address, challenge_data, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            self._entries.pop(address, None)
+            self._entries[address] = (now + ttl, dict(challenge_data))
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug("Challenge store full, evicted challenge for %s", evicted)
+
+    def consume(self, address):
+        with self._lock:
+            entry = self._entries.pop(address, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return {}
+        return entry[1]
+
+    def claim(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._purge(self._claimed, now)
+            entry = self._claimed.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            if len(self._claimed) >= self.max_size:
+                logger.warning("Challenge store full, rejecting claim")
+                return False
+            self._claimed[key] = (now + ttl, None)
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteChallengeStore(ChallengeStore):
+    """
+    Challenge store in a small SQLite database, shared by the workers of one host.
+
+    Kept in its own file (not the tasks database) so that challenge writes never
+    wait for the tasks write lock. Each thread of each process opens its own
+    connection; consume() and claim() run as one IMMEDIATE transaction each
+    so they are atomic across workers.
+    """
+
+    PRUNE_EVERY = 100  # Writes between expiry/size cleanups
+
+    def __init__(self, path, max_size=10000):
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS challenges ("
+            " address TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_challenges_expires_at ON challenges (expires_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS claims ("
+            " key TEXT PRIMARY KEY,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_claims_expires_at ON claims (expires_at)")
+
+    def _connection(self):
+        # Connections must not be shared across threads or across fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _prune(self, conn, now):
+        conn.execute("DELETE FROM challenges WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM claims WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM challenges").fetchone()
+        if count > self.max_size:
+            conn.execute(
+                "DELETE FROM challenges WHERE address IN "
+                "(SELECT address FROM challenges ORDER BY expires_at LIMIT ?)",
+                (count - self.max_size,)
+            )
+
+    def put(self, address, challenge_data, ttl):
+        now = time.time()  # Wall clock: the table is shared between processes
+        conn = self._connection()
+        with metrics.timed('sqlite_store_challenge'):
+            conn.execute(
+                "INSERT OR REPLACE INTO challenges (address, data, expires_at) VALUES (?, ?, ?)",
+                (address, json.dumps(challenge_data), now + ttl)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(conn, now)
+
+    def consume(self, address):
+        conn = self._connection()
+        with metrics.timed('sqlite_consume_challenge'):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT data, expires_at FROM challenges WHERE address = ?", (address,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM challenges WHERE address = ?", (address,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None or row[1] <= time.time():
+            return {}
+        return json.loads(row[0])
+
+    def claim(self, key, ttl):
+        now = time.time()
+        conn = self._connection()
+        with metrics.timed('sqlite_claim_nonce'):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # An expired claim of the same key no longer counts
+                conn.execute("DELETE FROM claims WHERE key = ? AND expires_at <= ?", (key, now))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO claims (key, expires_at) VALUES (?, ?)", (key, now + ttl)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(conn, now)
+        return cursor.rowcount == 1
+
+
+class _BreakerFallback:
+    """
+    Circuit breaker and fallback decisions of BreakerChallengeStore, shared
+    with AsyncBreakerChallengeStore so both entry points handle failures alike.
+    """
+
+    def __init__(self, primary, breaker, fallback=None):
+        self.primary = primary
+        self.breaker = breaker
+        self.fallback = fallback
+
+    def _primary_failed(self, operation, error):
+        """Handle a failed primary call (or one skipped by the open breaker): fall back or raise."""
+        if not isinstance(error, CircuitOpenError):
+            logger.error("Challenge store %s failed: %s", operation, error)
+        if self.fallback is None:
+            raise ChallengeStoreUnavailableError("Challenge store is unavailable, please retry") from error
+        metrics.inc('challenge_store_fallback')
+
+    def _consume_fallback(self, challenge, address):
+        # A challenge issued during an outage lives in the fallback store
+        if not challenge and self.fallback is not None:
+            challenge = self.fallback.consume(address)
+        return challenge
+
+
+class BreakerChallengeStore(_BreakerFallback, ChallengeStore):
+    """
+    Wraps a remote store (Redis) with a circuit breaker and an optional local fallback.
+
+    While the primary store fails or the breaker is open, challenges are written
+    to and read from the fallback store, so logins keep working (for 'memory'
+    fallback: as long as challenge and verify reach the same worker). Without a
+    fallback, calls fail fast with ChallengeStoreUnavailableError instead of
+    blocking a worker on socket timeouts.
+    """
+
+    def put(self, address, challenge_data, ttl):
+        try:
+            self.breaker.call(self.primary.put, address, challenge_data, ttl)
+            return
+        except Exception as e:
+            self._primary_failed('put', e)
+        self.fallback.put(address, challenge_data, ttl)
+
+    def consume(self, address):
+        try:
+            challenge = self.breaker.call(self.primary.consume, address)
+        except Exception as e:
+            self._primary_failed('consume', e)
+            challenge = {}
+        return self._consume_fallback(challenge, address)
+
+    def claim(self, key, ttl):
+        try:
+            return self.breaker.call(self.primary.claim, key, ttl)
+        except Exception as e:
+            self._primary_failed('claim', e)
+        return self.fallback.claim(key, ttl)
+
+
+class AsyncRedisChallengeStore:
+    """RedisChallengeStore on a redis.asyncio client, for the ASGI entry point."""
+
+    def __init__(self, client):
+        self.client = client
+        self._consume_script = client.register_script(RedisChallengeStore.CONSUME_LUA)
+
+    async def put(self, address, challenge_data, ttl):
+        redis_key = f"{KEY_PREFIX}{address}"
+        with metrics.timed('redis_store_challenge'):
+            pipe = self.client.pipeline(transaction=True)
+            pipe.hset(redis_key, mapping=challenge_data)
+            pipe.expire(redis_key, ttl)
+            await pipe.execute()
+
+    async def consume(self, address):
+        redis_key = f"{KEY_PREFIX}{address}"
+        with metrics.timed('redis_consume_challenge'):
+            flat = await self._consume_script(keys=[redis_key])
+        return dict(zip(flat[::2], flat[1::2]))
+
+    async def claim(self, key, ttl):
+        with metrics.timed('redis_claim_nonce'):
+            return bool(await self.client.set(f"{KEY_PREFIX}{key}", 1, nx=True, ex=ttl))
+
+
+class AsyncBreakerChallengeStore(_BreakerFallback):
+    """
+    Async counterpart of BreakerChallengeStore.
+    Shares the breaker and the (in-process) fallback store of the sync wrapper,
+    so both entry points see the same Redis health.
+    """
+
+    async def put(self, address, challenge_data, ttl):
+        try:
+            await self.breaker.call_async(self.primary.put, address, challenge_data, ttl)
+            return
+        except Exception as e:
+            self._primary_failed('put', e)
+        self.fallback.put(address, challenge_data, ttl)
+
+    async def consume(self, address):
+        try:
+            challenge = await self.breaker.call_async(self.primary.consume, address)
+        except Exception as e:
+            self._primary_failed('consume', e)
+            challenge = {}
+        return self._consume_fallback(challenge, address)
+
+    async def claim(self, key, ttl):
+        try:
+            return await self.breaker.call_async(self.primary.claim, key, ttl)
+        except Exception as e:
+            self._primary_failed('claim', e)
+        return self.fallback.claim(key, ttl)
+
+
+# Active challenge store, configured by init_challenge_store()
+store = None
+
+
+def init_challenge_store(app, redis_client=None):
+    """Create the challenge store selected by CHALLENGE_STORE in the app configuration"""
+    global store
+    backend = app.config.get('CHALLENGE_STORE', 'redis')
+    max_size = app.config.get('CHALLENGE_STORE_MAX_SIZE', 10000)
+    if backend == 'redis':
+        store = RedisChallengeStore(redis_client)
+        # Fail fast (or fall back to a local store) while Redis is unhealthy
+        fallback_backend = app.config.get('CHALLENGE_STORE_FALLBACK')
+        fallback = None
+        if fallback_backend == 'memory':
+            fallback = MemoryChallengeStore(max_size=max_size)
+        elif fallback_backend == 'sqlite':
+            fallback = SQLiteChallengeStore(app.config['CHALLENGE_STORE_PATH'], max_size=max_size)
+        elif fallback_backend is not None:
+            raise ValueError(f"Invalid CHALLENGE_STORE_FALLBACK: {fallback_backend}")
+        breaker = CircuitBreaker(
+            'challenge_store',
+            failure_threshold=app.config.get('CHALLENGE_STORE_BREAKER_THRESHOLD', 5),
+            reset_timeout=app.config.get('CHALLENGE_STORE_BREAKER_RESET', 30)
+        )
+        store = BreakerChallengeStore(store, breaker, fallback)
+    elif backend == 'memory':
+        store = MemoryChallengeStore(max_size=max_size)
+    elif backend == 'sqlite':
+        store = SQLiteChallengeStore(app.config['CHALLENGE_STORE_PATH'], max_size=max_size)
+    else:
+        raise ValueError(f"Invalid CHALLENGE_STORE: {backend}")
+    logger.debug("Challenge store initialized: %s", backend)
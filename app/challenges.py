@@ -0,0 +1,124 @@
+# app/challenges.py
+"""
+Stateless HMAC-signed login challenges.
+
+In 'hmac' challenge mode the server keeps no per-challenge state: the nonce,
+the wallet address and the expiry are written into the message itself and
+authenticated with an HMAC under SECRET_KEY. On verification the client sends
+the message back, the server recomputes the HMAC, checks address and expiry,
+and recovers the signer. Only a verified signature consumes the nonce: it is
+claimed in the challenge store (shared by all workers) until the challenge
+expires, so the message can not be replayed on any worker, and a garbage
+signature can not burn someone else's challenge.
+/api/auth/challenge therefore needs no storage write at all.
+
+CHALLENGE_TTL is the lifetime of challenges in both modes.
+"""
+
+import hashlib
+import hmac
+import logging
+import secrets
+from datetime import datetime, timedelta
+from app import challenge_store
+
+# Set up logger
+logger = logging.getLogger('w3tasq.challenges')
+
+MESSAGE_PREFIX = "Sign this message to authenticate:"
+TOKEN_PREFIX = "Token: "
+NONCE_KEY_PREFIX = "nonce:"  # Claimed nonces in the challenge store
+
+
+class HmacChallenger:
+    """
+    Issues and checks challenges authenticated by an HMAC under `secret_key`.
+
+    Message layout (the Token line is the HMAC-SHA256 of everything above it):
+        Sign this message to authenticate: <nonce> at <issued_at>
+        Address: <checksum address>
+        Expires: <expires_at>
+        Token: <hex digest>
+    """
+
+    def __init__(self, secret_key, ttl=300, store=None):
+        self._key = secret_key.encode() if isinstance(secret_key, str) else secret_key
+        self.ttl = ttl
+        self._store = store  # None: the application's challenge store
+
+    @property
+    def store(self):
+        return self._store if self._store is not None else challenge_store.store
+
+    def _mac(self, body):
+        return hmac.new(self._key, body.encode(), hashlib.sha256).hexdigest()
+
+    def issue(self, normalized_address):
+        """Return a new signed challenge message for a checksum address."""
+        nonce = secrets.token_hex(16)
+        issued_at = datetime.utcnow()
+        expires_at = issued_at + timedelta(seconds=self.ttl)
+        body = (
+            f"{MESSAGE_PREFIX} {nonce} at {issued_at.isoformat()}\n"
+            f"Address: {normalized_address}\n"
+            f"Expires: {expires_at.isoformat()}"
+        )
+        return f"{body}\n{TOKEN_PREFIX}{self._mac(body)}"
+
+    def check(self, normalized_address, message):
+        """
+        Check a challenge message returned by the client (HMAC, address, expiry).
+        Nothing is consumed: call consume() once the signature is verified.
+        Returns:
+            tuple: (nonce or None, error message or None)
+        """
+        if not message or '\n' + TOKEN_PREFIX not in message:
+            return None, "Invalid challenge message"
+
+        body, token = message.rsplit('\n' + TOKEN_PREFIX, 1)
+        if not hmac.compare_digest(self._mac(body), token.strip()):
+            return None, "Invalid challenge message"
+
+        # The body is authentic from here on, so the fixed layout can be trusted
+        lines = body.split('\n')
+        nonce = lines[0][len(MESSAGE_PREFIX):].split(' at ', 1)[0].strip()
+        address = lines[1][len("Address: "):]
+        expires_at = datetime.fromisoformat(lines[2][len("Expires: "):])
+
+        if address != normalized_address:
+            return None, "Challenge was issued for another address"
+        if datetime.utcnow() > expires_at:
+            return None, "Challenge has expired"
+        return nonce, None
+
+    @staticmethod
+    def nonce_key(nonce):
+        """Challenge store key under which a used nonce is claimed."""
+        return NONCE_KEY_PREFIX + nonce
+
+    def consume(self, nonce):
+        """
+        Claim a nonce of a verified challenge for the challenge lifetime.
+        Returns:
+            bool: True on the first use, False if the challenge was used before.
+        """
+        return self.store.claim(self.nonce_key(nonce), self.ttl)
+
+
+# Challenge mode, lifetime and HMAC challenger, configured by init_challenges()
+mode = 'redis'
+ttl = 300
+challenger = None
+
+
+def init_challenges(app):
+    """Select the challenge mode ('redis' or 'hmac') from app configuration"""
+    global mode, ttl, challenger
+    mode = app.config.get('CHALLENGE_MODE', 'redis')
+    ttl = app.config.get('CHALLENGE_TTL', 300)
+    if mode not in ('redis', 'hmac'):
+        raise ValueError(f"Invalid CHALLENGE_MODE: {mode}")
+    challenger = None
+    if mode == 'hmac':
+        challenger = HmacChallenger(app.config['SECRET_KEY'], ttl=ttl)
+    logger.debug("Challenges initialized in %s mode", mode)
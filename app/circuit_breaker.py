@@ -0,0 +1,131 @@
+# app/circuit_breaker.py
+"""
+Circuit breaker for calls to external services (Redis).
+
+closed    -> calls go through; `failure_threshold` consecutive failures open it.
+open      -> calls fail fast for `reset_timeout` seconds, without touching the service.
+half_open -> one trial call is let through; success closes the breaker,
+             failure opens it again for another `reset_timeout`.
+The state is exported as the gauge `<name>_breaker_state`
+(0 = closed, 1 = half open, 2 = open).
+"""
+
+import logging
+import threading
+import time
+from app import metrics
+
+# Set up logger
+logger = logging.getLogger('w3tasq.circuit_breaker')
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe consecutive-failure circuit breaker.
+
+    Args:
+        name: Used for log messages and metric names.
+        failure_threshold: Consecutive failures that open the breaker.
+        reset_timeout: Seconds to stay open before allowing a trial call.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._export()
+
+    def _export(self):
+        metrics.set_gauge(f"{self.name}_breaker_state", STATE_VALUES[self._state])
+
+    def _set_state(self, state):
+        if state != self._state:
+            logger.warning("Circuit breaker '%s' %s -> %s", self.name, self._state, state)
+            self._state = state
+            if state == OPEN:
+                metrics.inc(f"{self.name}_breaker_opened")
+            self._export()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """
+        Return True if a call may be attempted now.
+        In half-open state only one caller at a time gets True.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+            # Half open: let a single trial call through
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call `fn` through the breaker.
+        Raises:
+            CircuitOpenError: the breaker is open, `fn` was not called.
+        """
+        if not self.allow():
+            metrics.inc(f"{self.name}_breaker_rejected")
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, fn, *args, **kwargs):
+        """Like call(), for a coroutine function `fn`."""
+        if not self.allow():
+            metrics.inc(f"{self.name}_breaker_rejected")
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
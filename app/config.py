@@ -1,20 +1,155 @@
+import os
+import threading
 from app import utils
 
 FLASK_ENV = utils.get_env()
 
+_UNSET = object()
+
+class _Lazy:
+    """
+    Config value resolved on first access and cached for the process.
+    Lookups such as get_secret_key() read private_data and log; with this
+    descriptor they run when create_app() loads the config, not while
+    app.config is being imported.
+    """
+
+    def __init__(self, resolve):
+        self._resolve = resolve
+        self._value = _UNSET
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner):
+        if self._value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    self._value = self._resolve()
+        return self._value
+
+def _sqlite_uri():
+    return f"sqlite:///{utils.get_database_path()}"
+
+
 class Config:
     """Base configuration class."""
-    SECRET_KEY = utils.get_secret_key()
+    SECRET_KEY = _Lazy(utils.get_secret_key)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     TASKS_PER_PAGE = 12
+    # Bounds for the page size a client may request with ?limit=
+    TASKS_PER_PAGE_MIN = 5
+    TASKS_PER_PAGE_MAX = 60
+    TASKS_BATCH_MAX = 50  # Max status changes accepted by one PATCH /api/tasks
+    # Pages of at least this many tasks are streamed to the client, read from the
+    # database TASKS_STREAM_BATCH rows at a time, with memory bounded by the batch.
+    # None: off. Set it together with a TASKS_PER_PAGE_MAX that allows such pages
+    TASKS_STREAM_THRESHOLD = None
+    TASKS_STREAM_BATCH = 100
     # Base logging settings
     LOG_LEVEL = 'INFO'
     LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
     LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+    LOG_QUEUE = True  # Hand records to a background thread instead of writing them in the request
+    LOG_JSON = False  # One JSON object per record (with request id and extra fields) instead of LOG_FORMAT
+    # Sampling of DEBUG/INFO records by event name ({event: fraction kept}),
+    # decided per request; warnings and errors are always kept
+    LOG_SAMPLE_RATES = {}
+    LOG_SAMPLE_DEFAULT = 1.0  # Fraction kept of informational records without a listed event
     # Redis settings
-    REDIS_HOST = utils.get_redis_host()
-    REDIS_PORT = utils.get_redis_port()
-    REDIS_PASSWORD = utils.get_redis_pwd()
+    REDIS_HOST = _Lazy(utils.get_redis_host)
+    REDIS_PORT = _Lazy(utils.get_redis_port)
+    REDIS_PASSWORD = _Lazy(utils.get_redis_pwd)
+    REDIS_MAX_CONNECTIONS = 10  # Per worker process
+    # Short timeouts: a stalled Redis must not hold a worker for long
+    REDIS_POOL_TIMEOUT = 0.5  # Seconds to wait for a free pooled connection
+    REDIS_SOCKET_TIMEOUT = 0.5
+    REDIS_SOCKET_CONNECT_TIMEOUT = 0.5
+    REDIS_HEALTH_CHECK_INTERVAL = 30  # PING idle connections before reuse
+    # Login challenges: 'redis' (stored in Redis) or 'hmac' (stateless, signed with SECRET_KEY)
+    CHALLENGE_MODE = 'redis'
+    CHALLENGE_TTL = 300  # Seconds a challenge is valid, both modes
+    # Challenge storage ('redis' mode challenges, used 'hmac' mode nonces): 'redis',
+    # 'memory' (one process) or 'sqlite' (shared by the workers of one host, see CHALLENGE_STORE_PATH)
+    CHALLENGE_STORE = 'redis'
+    CHALLENGE_STORE_MAX_SIZE = 10000  # Pending challenges kept by 'memory'/'sqlite'
+    # Circuit breaker around the Redis challenge store and local fallback
+    # ('memory', 'sqlite' or None to fail fast with 503 while Redis is down)
+    CHALLENGE_STORE_BREAKER_THRESHOLD = 5  # Consecutive failures that open the breaker
+    CHALLENGE_STORE_BREAKER_RESET = 30  # Seconds before a trial call
+    CHALLENGE_STORE_FALLBACK = 'memory'
+    CHALLENGE_STORE_PATH = _Lazy(lambda: utils.join_path(os.path.dirname(utils.get_database_path()), 'challenges.db'))
+    # Reverse proxies in front of the app that append to X-Forwarded-For; the
+    # client address (rate limit 'ip' rules, logs) is taken from that header.
+    # 0: use the peer address. Never trust more hops than there are proxies:
+    # the client can send any X-Forwarded-For values itself
+    PROXY_FIX_X_FOR = 0
+    # Sliding-window rate limits per endpoint, keyed by client IP and wallet:
+    # {endpoint: {'ip': (max requests, window seconds), 'wallet': (...)}}
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_STORAGE = 'redis'  # 'redis' or 'memory' (one process)
+    RATE_LIMIT_BREAKER_THRESHOLD = 5  # Redis failures before checks are skipped (fail open)
+    RATE_LIMIT_BREAKER_RESET = 30
+    RATE_LIMITS = {
+        'get_challenge': {'ip': (30, 60), 'wallet': (10, 60)},
+        'verify_signature': {'ip': (30, 60), 'wallet': (10, 60)},
+        'create_task': {'ip': (120, 60), 'wallet': (60, 60)},
+        'update_task_status': {'ip': (300, 60), 'wallet': (120, 60)},
+        'update_tasks_status_batch': {'ip': (120, 60), 'wallet': (60, 60)},
+        'create_api_token': {'ip': (10, 60), 'wallet': (5, 60)},
+    }
+    # API tokens for scripted clients (Authorization: Bearer ...)
+    API_TOKEN_TTL_DAYS = 90  # Default validity of a new token
+    API_TOKEN_MAX_TTL_DAYS = 365
+    API_TOKEN_REVOCATION_CACHE_TTL = 30  # Seconds a worker may use a stale deny list
+    # gunicorn (see gunicorn.conf.py; GUNICORN_* environment variables override these).
+    # Worker class 'sync', 'gthread' or 'gevent'; None for workers/threads = derive from CPUs
+    GUNICORN_WORKER_CLASS = 'gthread'
+    GUNICORN_WORKERS = None
+    GUNICORN_THREADS = None
+    GUNICORN_TIMEOUT = 30
+    GUNICORN_MAX_REQUESTS = 1000  # Recycle a worker after this many requests...
+    GUNICORN_MAX_REQUESTS_JITTER = 100  # ...plus up to this many, so workers do not restart together
+    # Per-request latency breakdown (app/timing.py): db, redis, signature and
+    # serialize phases in the access log; also as a Server-Timing header
+    # outside production, where it would expose internals to clients
+    REQUEST_TIMING_ENABLED = True
+    SERVER_TIMING_HEADER = True
+    # SQL instrumentation (app/query_log.py): statements slower than this are
+    # logged with their parameter shapes (None disables), and a statement run
+    # this many times in one request is reported as a possible N+1
+    SQL_SLOW_QUERY_MS = 100
+    SQL_NPLUSONE_THRESHOLD = 5
+    # Prometheus /metrics (app/metrics_export.py). METRICS_DIR is shared by the
+    # gunicorn workers to aggregate their metrics; None reports one process only
+    METRICS_DIR = None
+    METRICS_FLUSH_INTERVAL = 5  # Seconds between snapshots written by each worker
+    METRICS_TOKEN = _Lazy(utils.get_metrics_token)  # None: localhost only
+    METRICS_REQUIRE_TOKEN = False  # True: no token, no /metrics (the peer address is not trusted)
+    # Per-request profiling (app/profiling.py): requests with the header
+    # `X-Profile: <PROFILE_TOKEN>`, and this fraction of all requests, are run
+    # under cProfile; reports go to PROFILE_DIR, the newest PROFILE_MAX_FILES kept
+    PROFILE_TOKEN = _Lazy(utils.get_profile_token)
+    PROFILE_SAMPLE_RATE = 0.0
+    PROFILE_DIR = utils.join_path(utils.get_source_dir(), 'logs', 'profiles')
+    PROFILE_MAX_FILES = 50
+    # Background jobs (app/jobs.py). JOBS_ENABLED runs the scheduler inside each
+    # gunicorn worker; a leader lock ('redis' or 'sqlite') lets one process run each job
+    JOBS_ENABLED = False
+    JOBS_LOCK = 'redis'
+    JOBS_LOCK_PATH = _Lazy(lambda: utils.join_path(os.path.dirname(utils.get_database_path()), 'jobs.db'))
+    JOBS_ARCHIVE_AFTER_DAYS = 7  # Archive tasks completed longer ago than this
+    JOBS_ARCHIVE_INTERVAL = 3600  # Seconds between runs
+    JOBS_OVERDUE_INTERVAL = 300
+    JOBS_CHUNK_SIZE = 200  # Rows per transaction
+    JOBS_CHUNK_PAUSE = 0.05  # Seconds between chunks, so request writes get the lock
+    # ASGI mode (app.main_asgi:app): thread pool for blocking work (SQLite,
+    # signature recovery, Flask routes); requests beyond the queue get 503
+    ASGI_EXECUTOR_WORKERS = 8
+    ASGI_EXECUTOR_MAX_QUEUE = 64
+    # Signature recovery: 'inline' (request thread), 'thread' or 'process' pool
+    SIGNATURE_VERIFY_MODE = 'inline'
+    SIGNATURE_VERIFY_WORKERS = 2
+    SIGNATURE_VERIFY_MAX_QUEUE = 16  # Requests allowed to wait for a free worker
+    SIGNATURE_VERIFY_TIMEOUT = 2.0  # Seconds
 
     @staticmethod
     def init_app(app):
@@ -24,7 +159,7 @@ class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
     # Use database file path from utils for development
-    SQLALCHEMY_DATABASE_URI = f"sqlite:///{utils.get_database_path()}"
+    SQLALCHEMY_DATABASE_URI = _Lazy(_sqlite_uri)
     # Logging settings for development
     LOG_LEVEL = 'DEBUG'
     LOG_FORMAT = '%(levelname)s: %(message)s'  # Simple format for console
@@ -40,23 +175,43 @@ class TestingConfig(Config):
     # Use in-memory database for tests
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     TASKS_PER_PAGE = 5 # Smaller for faster tests
+    TASKS_PER_PAGE_MIN = 2
+    TASKS_PER_PAGE_MAX = 20
     # Logging settings for testing
     LOG_LEVEL = 'ERROR'  # Minimal logs to avoid cluttering test output
     LOG_TO_FILE = True
     LOG_FILE = utils.join_path(utils.get_source_dir(), 'logs', 'tests.log')
     LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+    # No Redis needed to run the tests
+    CHALLENGE_STORE = 'memory'
+    RATE_LIMIT_STORAGE = 'memory'
+    RATE_LIMITS = {}  # Tests install their own limits where needed
+    JOBS_LOCK = 'sqlite'
+    PROFILE_TOKEN = 'test-profile-token'
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     # In production, explicitly set URI or get from environment
-    SQLALCHEMY_DATABASE_URI = f"sqlite:///{utils.get_database_path()}"
+    SQLALCHEMY_DATABASE_URI = _Lazy(_sqlite_uri)
     # Logging settings for production
     LOG_LEVEL = 'INFO'
     LOG_TO_FILE = True
     LOG_FILE = utils.join_path(utils.get_source_dir(), 'logs', 'w3tasq.log')
     LOG_MAX_BYTES = 1 * 1024 * 1024  # 1 MB per log file
     LOG_BACKUP_COUNT = 3  # Keep 3 backup files
+    LOG_JSON = True
+    # Per-request lines of the hot endpoints; one in ten is enough for dashboards
+    LOG_SAMPLE_RATES = {'access': 0.1, 'tasks_retrieved': 0.1, 'challenge_generated': 0.25}
+    # Keep CPU-bound signature recovery off the request workers
+    SIGNATURE_VERIFY_MODE = 'process'
+    JOBS_ENABLED = True
+    SERVER_TIMING_HEADER = False
+    METRICS_DIR = '/tmp/w3tasq-metrics'
+    # Requests reach the container from the Docker gateway, never from localhost
+    METRICS_REQUIRE_TOKEN = True
+    # Served behind the host's reverse proxy (docker-compose.yml publishes 127.0.0.1:5000)
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', '1'))
 
 config_map = {
     'development': DevelopmentConfig,
@@ -1,6 +1,9 @@
 import logging
-from app.models import db, User, Task
-from sqlalchemy import or_, and_
+import time
+from datetime import datetime, timedelta
+from app.models import db, User, Task, ApiToken
+from sqlalchemy import or_, and_, inspect, select, update, text, literal
+from sqlalchemy.exc import OperationalError
 
 # Set up logger
 logger = logging.getLogger('w3tasq.db_utils')
@@ -40,10 +43,10 @@ def get_user_by_id(user_id):
     except Exception as e:
         # In case of any unexpected database error
         # Logging the error might be useful in production.
-        logger.error(f"get_user_by_id: {e}")
+        logger.error("get_user_by_id: %s", e)
         return None, "Error retrieving user"
 
-def create_task(user_id, title, description=None, priority=3, status=0):
+def create_task(user_id, title, description=None, priority=3, status=0, deadline=None):
     """
     Create a new task for a user.
     Args:
@@ -52,6 +55,7 @@ def create_task(user_id, title, description=None, priority=3, status=0):
         description: Task description (optional)
         priority: Task priority (1=HIGH, 2=MEDIUM, 3=LOW, default=LOW)
         status: Task status (0=ACTIVE, 1=COMPLETED, 2=ARCHIVED, default=ACTIVE)
+        deadline: Deadline datetime (optional)
     Returns:
         Task instance
     """
@@ -61,7 +65,8 @@ def create_task(user_id, title, description=None, priority=3, status=0):
         title=title,
         description=description,
         priority=priority,
-        status=status
+        status=status,
+        deadline=deadline
     )
     
     # Add to database
@@ -100,6 +105,25 @@ def get_user_tasks_cursor(user_id, cursor_id=None, limit=12):
                - ID of the last task in the result set (to use as next cursor)
                - boolean indicating if there are more tasks available
     """
+    query = _user_tasks_page_query(user_id, cursor_id)
+
+    # Get one extra record to determine if there are more records
+    tasks = query.limit(limit + 1).all()
+
+    has_more = len(tasks) > limit
+    if has_more:
+        # Remove the extra record
+        tasks_to_return = tasks[:-1]
+        # Cursor for the next page is the ID of the last returned record
+        next_cursor = tasks_to_return[-1].id if tasks_to_return else None
+    else:
+        tasks_to_return = tasks
+        next_cursor = None  # No more records
+
+    return tasks_to_return, next_cursor, has_more
+
+def _user_tasks_page_query(user_id, cursor_id):
+    """Active tasks of a user after cursor_id, in page order (priority ASC, id DESC)."""
     query = Task.query.filter_by(user_id=user_id, status=0)
 
     # If cursor is provided, filter tasks that come after the cursor task
@@ -120,22 +144,7 @@ def get_user_tasks_cursor(user_id, cursor_id=None, limit=12):
 
     # Sort by priority (1, 2, 3) ascending, then by ID descending
     # This gives priority sorting, and within each priority - from new to old
-    query = query.order_by(Task.priority.asc(), Task.id.desc())
-
-    # Get one extra record to determine if there are more records
-    tasks = query.limit(limit + 1).all()
-
-    has_more = len(tasks) > limit
-    if has_more:
-        # Remove the extra record
-        tasks_to_return = tasks[:-1]
-        # Cursor for the next page is the ID of the last returned record
-        next_cursor = tasks_to_return[-1].id if tasks_to_return else None
-    else:
-        tasks_to_return = tasks
-        next_cursor = None  # No more records
-
-    return tasks_to_return, next_cursor, has_more
+    return query.order_by(Task.priority.asc(), Task.id.desc())
 
 # --- NEW FUNCTION: Retrieve a task by its ID ---
 def get_task_by_id(task_id):
@@ -216,6 +225,13 @@ def complete_task_plus(user_id):
     db.session.commit()
     return True, f'updated'
 
+def _increment_completed_tasks(user_id, count=1):
+    """Add `count` to a user's completed_tasks with one UPDATE (committed by the caller)."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(completed_tasks=User.completed_tasks + count)
+        .execution_options(synchronize_session=False)
+    )
+
 # --- NEW FUNCTION: Update the status of a task ---
 def update_task_status_internal(task_instance, new_status):
     """
@@ -251,8 +267,8 @@ def update_task_status_internal(task_instance, new_status):
         # Update the status field
         old_status = task_instance.status
         if old_status == 0 and new_status == 1:
-            task_instance.user.completed_tasks += 1
-            # complete_task_plus(task_instance.user.id)
+            # Increment in SQL: no lazy load of task_instance.user, no lost updates
+            _increment_completed_tasks(task_instance.user_id)
         task_instance.status = new_status
         # SQLAlchemy will automatically update the updated_at field on commit,
         # if it has default=datetime.utcnow or server_default.
@@ -272,6 +288,226 @@ def update_task_status_internal(task_instance, new_status):
     except Exception as e:
         _err_msg = "Error updating task status"
         # 5. Rollback on error and return failure
-        logger.error(f"{_err_msg}: {e}")
+        logger.error("%s: %s", _err_msg, e)
+        db.session.rollback()
+        return False, _err_msg
+
+# --- NEW FUNCTION: Update the status of several tasks in one transaction ---
+def update_tasks_status_batch(user_id, updates):
+    """
+    Apply several status changes for one user in a single transaction.
+    Each update is validated on its own, so one bad item does not sink the
+    whole batch; valid items are committed together with one commit.
+
+    Args:
+        user_id (int): The ID of the user making the request.
+        updates (list): List of dicts like {"id": <task_id>, "status": 0|1|2}.
+                        If the same task appears several times, the last entry wins.
+
+    Returns:
+        list: One (task_id, Task instance or None, message) tuple per distinct task,
+              in the order the tasks first appeared in `updates`.
+              - (task_id, Task, "Task status updated successfully") on success.
+              - (task_id, None, <error message>) if the item was rejected.
+    """
+    VALID_STATUSES = {0, 1, 2} # ACTIVE, COMPLETED, ARCHIVED
+
+    # Coalesce repeated updates for the same task, keeping the last status
+    wanted = {}
+    for item in updates:
+        wanted[item['id']] = item['status']
+
+    try:
+        # Load every requested task owned by the user with a single query
+        tasks = Task.query.filter(Task.id.in_(list(wanted)), Task.user_id == user_id).all()
+        tasks_by_id = {task.id: task for task in tasks}
+
+        completed = 0
+        results = []
+        for task_id, new_status in wanted.items():
+            task = tasks_by_id.get(task_id)
+            if task is None:
+                results.append((task_id, None, "Access denied. Task not found"))
+                continue
+            if new_status not in VALID_STATUSES:
+                results.append((task_id, None, f"Invalid status value. Must be one of {VALID_STATUSES}. Got {new_status}."))
+                continue
+            if task.status == 0 and new_status == 1:
+                completed += 1
+            task.status = new_status
+            results.append((task_id, task, "Task status updated successfully"))
+
+        if completed:
+            _increment_completed_tasks(user_id, completed)
+        db.session.commit()
+        # The commit expired the tasks; reload them with one query instead of
+        # one refresh per task when the caller serializes them
+        updated_ids = [task_id for task_id, task, _ in results if task is not None]
+        if updated_ids:
+            Task.query.filter(Task.id.in_(updated_ids)).all()
+        return results
+
+    except Exception as e:
+        _err_msg = "Error updating task status"
+        logger.error("%s: %s", _err_msg, e)
         db.session.rollback()
-        return False, _err_msg
\ No newline at end of file
+        return [(task_id, None, _err_msg) for task_id in wanted]
+
+# --- API tokens ---
+def create_api_token_record(user_id, jti, scopes, expires_at, name=''):
+    """
+    Record a newly minted API token.
+    Args:
+        user_id: ID of the user the token belongs to
+        jti: Token id from the token claims
+        scopes: List of scope names
+        expires_at: Expiry datetime (UTC)
+        name: Optional label
+    Returns:
+        ApiToken instance
+    """
+    record = ApiToken(jti=jti, user_id=user_id, name=name, scopes=' '.join(scopes), expires_at=expires_at)
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+def get_user_api_tokens(user_id):
+    """Return the API token records of a user, newest first."""
+    return ApiToken.query.filter_by(user_id=user_id).order_by(ApiToken.created_at.desc()).all()
+
+def revoke_api_token(user_id, jti):
+    """
+    Mark an API token of the user as revoked.
+    Returns:
+        tuple: (ApiToken instance or None, message)
+    """
+    try:
+        record = ApiToken.query.filter_by(jti=jti, user_id=user_id).first()
+        if record is None:
+            return None, "API token not found"
+        if record.revoked_at is None:
+            record.revoked_at = datetime.utcnow()
+            db.session.commit()
+        return record, "API token revoked"
+    except Exception as e:
+        logger.error("revoke_api_token: %s", e)
+        db.session.rollback()
+        return None, "Error revoking API token"
+
+def get_revoked_api_token_ids():
+    """Return the ids of revoked API tokens that have not expired yet (the deny list)."""
+    rows = db.session.query(ApiToken.jti).filter(
+        ApiToken.revoked_at.isnot(None),
+        ApiToken.expires_at > datetime.utcnow()
+    ).all()
+    return [row.jti for row in rows]
+
+# --- Schema upkeep ---
+def ensure_schema():
+    """
+    Bring an existing database up to the current models.
+    db.create_all() creates missing tables but never alters existing ones,
+    so columns added after a database was created are added here.
+    """
+    inspector = inspect(db.engine)
+    existing = {column['name'] for column in inspector.get_columns('tasks')}
+    if 'overdue' not in existing:
+        logger.info("Adding column tasks.overdue")
+        try:
+            db.session.execute(text("ALTER TABLE tasks ADD COLUMN overdue BOOLEAN NOT NULL DEFAULT 0"))
+            db.session.commit()
+        except OperationalError as e:
+            db.session.rollback()
+            # Workers that start together (no preload) may all see the column
+            # missing; the ones that lose the race find it added
+            if 'duplicate column name' not in str(e):
+                raise
+            logger.info("Column tasks.overdue added by another process")
+
+    # Indexes of the hot queries (tests/test_query_plans.py) are likewise only
+    # created by create_all() together with a new table. Building one on a
+    # large table holds the write lock for long, so startup only reports them
+    missing = missing_indexes()
+    if missing:
+        logger.warning("Missing indexes %s: run `flask --app app.main create-indexes`",
+                       ', '.join(index.name for index in missing))
+
+def missing_indexes():
+    """Indexes of the models that the database does not have."""
+    inspector = inspect(db.engine)
+    missing = []
+    for table in (User.__table__, Task.__table__):
+        present = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in present)
+    return missing
+
+def create_missing_indexes():
+    """
+    Build the indexes missing from an existing database (`flask create-indexes`).
+    Each index is built under the SQLite write lock, which blocks writers for
+    a while on a large tasks table: run it as a deployment step, not at startup.
+    Returns:
+        list: names of the created indexes
+    """
+    created = []
+    for index in missing_indexes():
+        logger.info("Creating index %s", index.name)
+        # checkfirst: another process may have built it in the meantime
+        index.create(db.engine, checkfirst=True)
+        created.append(index.name)
+    return created
+
+# --- Background sweeps (see app/jobs.py) ---
+def _update_in_chunks(where, values, chunk_size, pause=0):
+    """
+    Apply `values` to every task matching `where`, `chunk_size` rows per transaction.
+    Each chunk is one UPDATE ... WHERE id IN (SELECT id ... LIMIT n) and its own
+    commit, so the SQLite write lock is only held for one small statement.
+    `where` must be served by an index that updated rows drop out of
+    (tests/test_query_plans.py), so every chunk reads only its own rows instead
+    of scanning the table from the start.
+    Returns:
+        int: number of updated rows
+    """
+    total = 0
+    while True:
+        ids = select(Task.id).where(*where).limit(chunk_size).scalar_subquery()
+        result = db.session.execute(
+            update(Task).where(Task.id.in_(ids)).values(**values).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        total += result.rowcount
+        if result.rowcount < chunk_size:
+            return total
+        if pause:
+            # Let request writers take the lock between chunks
+            time.sleep(pause)
+
+def archive_completed_tasks(older_than_days, chunk_size=200, pause=0):
+    """
+    Archive tasks completed more than `older_than_days` days ago.
+    The completion time is the last update of a completed task.
+    Returns:
+        int: number of archived tasks
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    return _update_in_chunks(
+        (Task.status == 1, Task.updated_at < cutoff),
+        {'status': 2, 'updated_at': datetime.utcnow()},
+        chunk_size, pause
+    )
+
+def mark_overdue_tasks(chunk_size=200, pause=0):
+    """
+    Flag active tasks whose deadline has passed.
+    Returns:
+        int: number of tasks newly marked overdue
+    """
+    return _update_in_chunks(
+        # Status inlined: SQLite only picks the partial index ix_tasks_overdue_deadline
+        # (status = 0 AND ...) when the query names the same constant, not a parameter
+        (Task.status == literal(0, literal_execute=True), Task.overdue.is_(False), Task.deadline.isnot(None),
+         Task.deadline < datetime.utcnow()),
+        {'overdue': True},
+        chunk_size, pause
+    )
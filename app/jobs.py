@@ -0,0 +1,255 @@
+# app/jobs.py
+"""
+Background jobs: periodic sweeps over the tasks table.
+
+Jobs:
+  - archive_completed: archive tasks completed more than JOBS_ARCHIVE_AFTER_DAYS ago.
+  - mark_overdue: flag active tasks whose deadline has passed.
+Both update rows in chunks of JOBS_CHUNK_SIZE, one short transaction per
+chunk, so the SQLite write lock is never held for long.
+
+The scheduler is a daemon thread. It can run inside every gunicorn worker
+(JOBS_ENABLED, started from gunicorn.conf.py) or as a sidecar process
+(`flask --app app.main run-jobs`). Either way a leader lock in Redis or SQLite
+(JOBS_LOCK) makes sure each job runs in only one process per interval: the
+lock is taken for the job's interval and simply left to expire.
+Per-job duration and row counts are logged and recorded in app.metrics
+(timer `job_<name>`, counter `job_<name>_rows`).
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+import click
+from app import metrics, db_utils, utils
+
+# Set up logger
+logger = logging.getLogger('w3tasq.jobs')
+
+LOCK_PREFIX = "w3tasq_job_lock:"
+
+
+def _owner():
+    # Evaluated on every call: the pid changes after fork
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderLock(ABC):
+    """Interface of a leader lock."""
+
+    @abstractmethod
+    def acquire(self, name, ttl):
+        """Take the lock `name` for `ttl` seconds. Returns True if this process holds it."""
+
+
+class RedisLeaderLock(LeaderLock):
+    """SET NX PX lock in Redis, shared by every host."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self, name, ttl):
+        return bool(self.client.set(f"{LOCK_PREFIX}{name}", _owner(), nx=True, px=int(ttl * 1000)))
+
+
+class SQLiteLeaderLock(LeaderLock):
+    """Lock rows in a small SQLite file, shared by the workers of one host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # Opened lazily, per thread and per process (never shared across fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_locks ("
+                " name TEXT PRIMARY KEY,"
+                " owner TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def acquire(self, name, ttl):
+        conn = self._connection()
+        now = time.time()  # Wall clock: shared between processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT expires_at FROM job_locks WHERE name = ?", (name,)).fetchone()
+            acquired = row is None or row[0] <= now
+            if acquired:
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_locks (name, owner, expires_at) VALUES (?, ?, ?)",
+                    (name, _owner(), now + ttl)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+
+class Job:
+    """
+    A periodic job.
+
+    Args:
+        name: Used for the lock, logs and metric names.
+        fn: Callable taking the Flask app, returning the number of rows changed.
+        interval: Seconds between runs.
+    """
+
+    def __init__(self, name, fn, interval):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.next_run = 0.0
+
+
+class JobScheduler:
+    """
+    Runs due jobs under a leader lock, in a background thread or on demand.
+
+    Args:
+        app: Flask app; jobs run inside its app context.
+        lock: LeaderLock shared by all processes.
+        jobs: List of Job.
+        tick: Seconds between checks for due jobs.
+    """
+
+    def __init__(self, app, lock, jobs, tick=1.0):
+        self.app = app
+        self.lock = lock
+        self.jobs = jobs
+        self.tick = tick
+        self.last_runs = {}  # name -> {'rows', 'seconds', 'finished_at'}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_job(self, job):
+        """Run one job now (no lock check) and record its duration and row count."""
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                with metrics.timed(f"job_{job.name}"):
+                    rows = job.fn(self.app)
+        except Exception as e:
+            logger.error("Job %s failed after %.3fs: %s", job.name, time.perf_counter() - start, e)
+            return None
+        seconds = time.perf_counter() - start
+        metrics.inc(f"job_{job.name}_rows", rows)
+        self.last_runs[job.name] = {'rows': rows, 'seconds': seconds, 'finished_at': time.time()}
+        logger.info("Job %s: %s rows in %.3fs", job.name, rows, seconds)
+        return rows
+
+    def run_pending(self):
+        """Run every due job whose lock this process gets."""
+        now = time.monotonic()
+        for job in self.jobs:
+            if now < job.next_run:
+                continue
+            job.next_run = now + job.interval
+            try:
+                acquired = self.lock.acquire(job.name, job.interval)
+            except Exception as e:
+                logger.error("Leader lock for job %s unavailable: %s", job.name, e)
+                continue
+            if acquired:
+                self.run_job(job)
+            else:
+                logger.debug("Job %s is run by another process", job.name)
+
+    def run_forever(self):
+        """Check for due jobs every `tick` seconds until stop() is called."""
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.tick)
+
+    def start(self):
+        """Start the scheduler thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='w3tasq-jobs', daemon=True)
+        self._thread.start()
+        logger.info("Job scheduler started: %s", ', '.join(job.name for job in self.jobs))
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def report(self):
+        """Last duration and row count per job, as recorded by this process."""
+        return dict(self.last_runs)
+
+
+def archive_completed(app):
+    return db_utils.archive_completed_tasks(
+        app.config.get('JOBS_ARCHIVE_AFTER_DAYS', 7),
+        chunk_size=app.config.get('JOBS_CHUNK_SIZE', 200),
+        pause=app.config.get('JOBS_CHUNK_PAUSE', 0.05)
+    )
+
+
+def mark_overdue(app):
+    return db_utils.mark_overdue_tasks(
+        chunk_size=app.config.get('JOBS_CHUNK_SIZE', 200),
+        pause=app.config.get('JOBS_CHUNK_PAUSE', 0.05)
+    )
+
+
+# Scheduler of this process, configured by init_jobs()
+scheduler = None
+
+
+def init_jobs(app):
+    """Create the job scheduler (not started) and register the `run-jobs` CLI command"""
+    global scheduler
+    backend = app.config.get('JOBS_LOCK', 'redis')
+    if backend == 'redis':
+        lock = RedisLeaderLock(utils.redis_client)
+    elif backend == 'sqlite':
+        lock = SQLiteLeaderLock(app.config['JOBS_LOCK_PATH'])
+    else:
+        raise ValueError(f"Invalid JOBS_LOCK: {backend}")
+    scheduler = JobScheduler(app, lock, [
+        Job('archive_completed', archive_completed, app.config.get('JOBS_ARCHIVE_INTERVAL', 3600)),
+        Job('mark_overdue', mark_overdue, app.config.get('JOBS_OVERDUE_INTERVAL', 300)),
+    ])
+
+    @app.cli.command('run-jobs')
+    @click.option('--once', is_flag=True, help='Run every job once, without the leader lock, and exit.')
+    def run_jobs_command(once):
+        """Run the background jobs in the foreground (sidecar process)."""
+        if once:
+            for job in scheduler.jobs:
+                rows = scheduler.run_job(job)
+                click.echo(f"{job.name}: {'failed' if rows is None else f'{rows} rows'} "
+                           f"in {scheduler.last_runs.get(job.name, {}).get('seconds', 0):.3f}s")
+            return
+        logger.info("Running background jobs in the foreground")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+
+    logger.debug("Jobs initialized with %s leader lock", backend)
+
+
+def start_scheduler(app):
+    """Start the scheduler thread in this process if JOBS_ENABLED"""
+    if scheduler is not None and app.config.get('JOBS_ENABLED', False):
+        scheduler.start()
@@ -0,0 +1,222 @@
+# app/logging_setup.py
+"""
+Logging for the 'w3tasq' logger tree.
+
+The console or rotating file handler is not attached to the logger directly:
+with LOG_QUEUE (the default) the logger only gets a QueueHandler, and a
+QueueListener thread drains the queue into the real handlers. A log call on
+the request path then costs a record and a queue put; file writes, rotation
+and their lock happen off the request thread.
+
+Records are tagged with the id of the current request (`request_id`; taken
+from a valid X-Request-ID header or generated, and echoed in the response).
+With LOG_JSON each record is written as one JSON object, including the
+structured fields passed in `extra` (e.g. the access log's timing).
+
+Sampling: informational records can carry an event name
+(`extra={'event': 'tasks_retrieved'}`). LOG_SAMPLE_RATES maps event names to
+the fraction of them to keep; untagged DEBUG/INFO records use
+LOG_SAMPLE_DEFAULT. Warnings and errors are always kept. The decision is
+made per request id, so a sampled request keeps all its lines together, and
+kept records carry their `sample_rate` to scale counts back up.
+
+The listener thread does not survive fork(). With gunicorn's preload_app the
+app (and this listener) is created in the master, so a new queue and listener
+are started in every child process (os.register_at_fork).
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from flask import request
+from app import utils
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes of every LogRecord; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+# Id of the request handled in this thread/task
+_request_id = contextvars.ContextVar('w3tasq_request_id', default=None)
+
+# Handlers and listener of this process, configured by init_logging()
+_handlers = []
+_queue_handler = None
+_listener = None
+
+
+def current_request_id():
+    """Id of the current request, or None outside requests."""
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds `request_id` ('-' outside requests) to every record."""
+
+    def filter(self, record):
+        record.request_id = _request_id.get() or '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of DEBUG/INFO records per event; WARNING and above always pass.
+
+    Args:
+        rates: {event name: fraction to keep (0..1)}.
+        default: Fraction kept of records without an event, or with an unlisted one.
+    """
+
+    def __init__(self, rates=None, default=1.0):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.default = default
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, 'event', None), self.default)
+        if rate >= 1:
+            return True
+        request_id = getattr(record, 'request_id', None) or _request_id.get()
+        if request_id and request_id != '-':
+            # Same decision for every record of a request
+            keep = zlib.crc32(request_id.encode()) / 2 ** 32 < rate
+        else:
+            keep = random.random() < rate
+        if keep:
+            record.sample_rate = rate
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request id and extra fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def build_handlers(app):
+    """The output handlers: console, or rotating file for testing/production."""
+    if app.config.get('LOG_JSON', False):
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            app.config['LOG_FORMAT'],
+            datefmt=app.config.get('LOG_DATEFMT')
+        )
+    if not app.config.get('LOG_TO_FILE', False):
+        handler = logging.StreamHandler()
+    else:
+        # Ensure logs directory exists
+        if not utils.is_log_dir():
+            utils.make_log_dir()
+        handler = RotatingFileHandler(
+            app.config['LOG_FILE'],
+            maxBytes=app.config.get('LOG_MAX_BYTES', 1 * 1024 * 1024),
+            backupCount=app.config.get('LOG_BACKUP_COUNT', 3)
+        )
+    handler.setFormatter(formatter)
+    return [handler]
+
+
+def _start_listener():
+    global _listener
+    _listener = QueueListener(_queue_handler.queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records to the handlers and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in _handlers:
+        handler.close()
+
+
+def _after_fork_in_child():
+    # The parent's listener thread was not copied: start a fresh queue and
+    # listener (records queued in the parent before the fork stay there)
+    if _queue_handler is not None:
+        _queue_handler.queue = queue.SimpleQueue()
+        _start_listener()
+
+
+def init_logging(app):
+    """Configure the 'w3tasq' logger from app configuration (replaces earlier handlers)"""
+    global _handlers, _queue_handler
+    root_logger = logging.getLogger('w3tasq')
+    root_logger.setLevel(app.config['LOG_LEVEL'])
+
+    # Remove existing handlers to avoid duplicates
+    stop_logging()
+    root_logger.handlers.clear()
+    _queue_handler = None
+
+    _handlers = build_handlers(app)
+    if app.config.get('LOG_QUEUE', True):
+        _queue_handler = QueueHandler(queue.SimpleQueue())
+        attached = [_queue_handler]
+        _start_listener()
+    else:
+        attached = _handlers
+    # Filters run in the calling thread, where the request id is known:
+    # records dropped by sampling are never queued or formatted
+    sampling = SamplingFilter(app.config.get('LOG_SAMPLE_RATES'), app.config.get('LOG_SAMPLE_DEFAULT', 1.0))
+    for handler in attached:
+        handler.addFilter(RequestIdFilter())
+        handler.addFilter(sampling)
+        root_logger.addHandler(handler)
+
+
+def _start_request():
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    if not _VALID_REQUEST_ID.match(request_id):
+        request_id = secrets.token_hex(8)
+    _request_id.set(request_id)
+
+
+def _finish_request(response):
+    request_id = _request_id.get()
+    if request_id:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+def _end_request(error=None):
+    _request_id.set(None)
+
+
+def init_request_ids(app):
+    """Assign every request an id (first before_request hook, so all its records carry it)"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+
+
+atexit.register(stop_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,5 @@
+from app.asgi import create_asgi_app
+
+
+# Initialize ASGI application (uvicorn app.main_asgi:app)
+app = create_asgi_app('production')
@@ -0,0 +1,121 @@
+# app/metrics.py
+"""
+In-process counters, gauges, latency timers and histograms for the w3tasq
+application. Values are kept per worker process; snapshot() returns a copy for
+reporting, and app/metrics_export.py merges the snapshots of all gunicorn
+workers for the /metrics endpoint.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Guards both dictionaries; gunicorn gthread workers share them between threads
+_lock = threading.Lock()
+
+# name -> int
+_counters = {}
+
+# name -> {'count': int, 'total': float seconds, 'max': float seconds}
+_timers = {}
+
+# name -> float, last value set
+_gauges = {}
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, sorted label items) -> {'buckets': [count per bound], 'count': int, 'sum': float seconds}
+_histograms = {}
+
+
+def inc(name, value=1):
+    """Increase counter `name` by `value`."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """Set gauge `name` to `value` (a current state, not a running total)."""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, seconds):
+    """Record one duration (in seconds) for timer `name`."""
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+        timer['count'] += 1
+        timer['total'] += seconds
+        if seconds > timer['max']:
+            timer['max'] = seconds
+
+
+def observe_histogram(name, seconds, labels=None):
+    """
+    Record one duration (in seconds) in histogram `name` for a set of labels,
+    e.g. observe_histogram('http_request_duration', 0.012, {'route': '/api/tasks'}).
+    Bucket counts are not cumulative here; the exporter sums them up.
+    """
+    key = (name, tuple(sorted((labels or {}).items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][i] += 1
+                break
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+
+
+@contextmanager
+def timed(name):
+    """
+    Time the enclosed block and record it under timer `name`.
+    The duration is recorded even if the block raises;
+    failures are additionally counted as `<name>_errors`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc(f"{name}_errors")
+        raise
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def snapshot():
+    """
+    Return a copy of all counters, gauges, timers and histograms.
+    Returns:
+        dict: {'counters': {name: value},
+               'gauges': {name: value},
+               'timers': {name: {'count', 'total', 'max', 'avg'}},
+               'histograms': [{'name', 'labels': {..}, 'buckets', 'count', 'sum'}]}
+    """
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timers = {}
+        for name, timer in _timers.items():
+            timers[name] = dict(timer, avg=timer['total'] / timer['count'] if timer['count'] else 0.0)
+        histograms = [
+            {'name': name, 'labels': dict(labels), 'buckets': list(histogram['buckets']),
+             'count': histogram['count'], 'sum': histogram['sum']}
+            for (name, labels), histogram in _histograms.items()
+        ]
+    return {'counters': counters, 'gauges': gauges, 'timers': timers, 'histograms': histograms}
+
+
+def reset():
+    """Drop all recorded values (tests, forked workers)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timers.clear()
+        _histograms.clear()
@@ -0,0 +1,365 @@
+# app/metrics_export.py
+"""
+Prometheus text exposition of app.metrics at GET /metrics.
+
+Recorded here, per request: a latency histogram per route, method and status
+(`w3tasq_http_request_duration_seconds`; its `_count` is the request count)
+and, with request timing enabled, a histogram per phase (db, redis,
+signature, serialize). Everything else comes from the counters, gauges and
+timers the modules already record in app.metrics, plus a few gauges of the
+worker process itself (memory, threads, uptime, checked-out DB connections).
+
+Multiple gunicorn workers: with METRICS_DIR set, every worker writes its
+snapshot to `<METRICS_DIR>/<pid>.json` every METRICS_FLUSH_INTERVAL seconds
+(and right before answering /metrics, and when it exits). /metrics merges all
+files: counters, timers and histograms are summed, gauges are reported per
+worker (`pid` label). When gunicorn reaps a worker, its counters are folded
+into `archive.json` and its gauges dropped, so totals never go backwards.
+Without METRICS_DIR only the serving process is reported.
+
+Access: with METRICS_TOKEN set, `Authorization: Bearer <token>` is required.
+Without it only requests from localhost are answered, unless
+METRICS_REQUIRE_TOKEN is set (production): in a container every request
+arrives from the Docker gateway, so the peer address proves nothing and
+/metrics stays closed until a token is configured.
+"""
+
+import fcntl
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+from flask import request, Response, jsonify
+from app import metrics, timing
+from app.models import db
+
+# Set up logger
+logger = logging.getLogger('w3tasq.metrics_export')
+
+PREFIX = 'w3tasq_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+_started_at = time.time()
+
+# Configured by init_metrics_export()
+metrics_dir = None
+_flush_interval = 5
+_engine = None
+_flusher = None
+
+
+# --- Snapshots of this process ---
+def _resident_memory_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, in KiB on Linux
+
+
+def process_gauges():
+    """Gauges describing this worker process."""
+    gauges = {
+        'process_resident_memory_bytes': _resident_memory_bytes(),
+        'process_threads': threading.active_count(),
+        'process_uptime_seconds': time.time() - _started_at,
+    }
+    if _engine is not None and hasattr(_engine.pool, 'checkedout'):
+        gauges['db_pool_checked_out'] = _engine.pool.checkedout()
+    return gauges
+
+
+def reset_process():
+    """
+    Start this process's metrics afresh: a worker forked from a preloaded
+    master would otherwise report the master's startup counters (once per
+    worker in the merged view) and the master's start as its own.
+    """
+    global _started_at
+    metrics.reset()
+    _started_at = time.time()
+
+
+def process_snapshot():
+    """metrics.snapshot() of this process with its process gauges and pid."""
+    snapshot = metrics.snapshot()
+    snapshot['gauges'].update(process_gauges())
+    snapshot['pid'] = os.getpid()
+    return snapshot
+
+
+# --- Shared directory ---
+class _DirLock:
+    """Exclusive flock on the metrics directory, between processes."""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, LOCK_FILE)
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _write_json(path, data):
+    # Write then rename: readers never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(directory=None):
+    """Write this process's snapshot to the metrics directory (no-op without one)."""
+    directory = directory or metrics_dir
+    if directory:
+        _write_json(os.path.join(directory, f"{os.getpid()}.json"), process_snapshot())
+
+
+def reset_dir(directory):
+    """Remove the files of a previous run (called by the gunicorn master on start)."""
+    os.makedirs(directory, exist_ok=True)
+    with _DirLock(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.json') or name.endswith('.tmp'):
+                os.remove(os.path.join(directory, name))
+
+
+def mark_process_dead(pid, directory=None):
+    """Fold a dead worker's counters, timers and histograms into the archive; drop its gauges."""
+    directory = directory or metrics_dir
+    if not directory:
+        return
+    path = os.path.join(directory, f"{pid}.json")
+    with _DirLock(directory):
+        snapshot = _read_json(path)
+        if snapshot is None:
+            return
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive = _read_json(archive_path) or {'counters': {}, 'gauges': {}, 'timers': {}, 'histograms': []}
+        merged = merge([archive, dict(snapshot, gauges={})])
+        _write_json(archive_path, {
+            'counters': merged['counters'], 'gauges': {}, 'timers': merged['timers'],
+            'histograms': list(merged['histograms'].values()),
+        })
+        os.remove(path)
+
+
+def _read_all(directory):
+    snapshots = []
+    with _DirLock(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json'):
+                snapshot = _read_json(os.path.join(directory, name))
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+    return snapshots
+
+
+def merge(snapshots):
+    """
+    Merge process snapshots.
+    Returns:
+        dict: {'counters': {name: sum}, 'timers': {name: {'count', 'total', 'max'}},
+               'histograms': {(name, labels): {...}}, 'gauges': {(name, pid): value}}
+    """
+    counters, timers, histograms, gauges = {}, {}, {}, {}
+    for snapshot in snapshots:
+        for name, value in snapshot['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+        for name, timer in snapshot['timers'].items():
+            total = timers.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            total['count'] += timer['count']
+            total['total'] += timer['total']
+            total['max'] = max(total['max'], timer['max'])
+        for histogram in snapshot['histograms']:
+            key = (histogram['name'], tuple(sorted(histogram['labels'].items())))
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = dict(histogram, buckets=list(histogram['buckets']))
+                continue
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], histogram['buckets'])]
+            total['count'] += histogram['count']
+            total['sum'] += histogram['sum']
+        for name, value in snapshot['gauges'].items():
+            gauges[(name, snapshot.get('pid'))] = value
+    return {'counters': counters, 'timers': timers, 'histograms': histograms, 'gauges': gauges}
+
+
+def collect():
+    """Merged metrics of every worker (or of this process without METRICS_DIR)."""
+    if not metrics_dir:
+        return merge([process_snapshot()])
+    write_snapshot()
+    return merge(_read_all(metrics_dir))
+
+
+# --- Prometheus text format ---
+def _metric_name(name):
+    return PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _labels(items):
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    """Prometheus text exposition (version 0.0.4) of merged metrics."""
+    lines = []
+    for name in sorted(merged['counters']):
+        metric = _metric_name(name) + '_total'
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {_number(merged['counters'][name])}")
+
+    for name in sorted(merged['timers']):
+        timer = merged['timers'][name]
+        metric = _metric_name(name) + '_seconds'
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {timer['count']}")
+        lines.append(f"{metric}_sum {_number(timer['total'])}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.append(f"{metric}_max {_number(timer['max'])}")
+
+    by_name = {}
+    for (name, labels), histogram in merged['histograms'].items():
+        by_name.setdefault(name, []).append((labels, histogram))
+    for name in sorted(by_name):
+        metric = _metric_name(name) + '_seconds'
+        lines.append(f"# TYPE {metric} histogram")
+        for labels, histogram in sorted(by_name[name], key=lambda item: item[0]):
+            cumulative = 0
+            for bound, count in zip(metrics.BUCKETS, histogram['buckets']):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', _number(float(bound))),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{metric}_count{_labels(labels)} {histogram['count']}")
+            lines.append(f"{metric}_sum{_labels(labels)} {_number(histogram['sum'])}")
+
+    gauges = {}
+    for (name, pid), value in merged['gauges'].items():
+        gauges.setdefault(name, []).append((str(pid), value))
+    for name in sorted(gauges):
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        for pid, value in sorted(gauges[name]):
+            lines.append(f"{metric}{_labels((('pid', pid),))} {_number(value)}")
+
+    # Cache hit ratio of the API token deny list: lookups not needing a reload
+    lookups = merged['counters'].get('api_token_denylist_lookups', 0)
+    if lookups:
+        reloads = merged['counters'].get('api_token_denylist_reloads', 0)
+        lines.append(f"# TYPE {PREFIX}api_token_denylist_hit_ratio gauge")
+        lines.append(f"{PREFIX}api_token_denylist_hit_ratio {_number(max(0.0, 1 - reloads / lookups))}")
+    return '\n'.join(lines) + '\n'
+
+
+# --- Request hooks and endpoint ---
+def _start_request():
+    request.environ['w3tasq.metrics_start'] = time.perf_counter()
+
+
+def _observe_request(start, route, method, status):
+    metrics.observe_histogram('http_request_duration', time.perf_counter() - start, {
+        'route': route, 'method': method, 'status': str(status),
+    })
+    timings = timing.current()
+    if timings is not None:
+        for name in timing.PHASES:
+            if timings.counts[name]:
+                metrics.observe_histogram('http_request_phase', timings.durations[name] / 1000,
+                                          {'route': route, 'phase': name})
+
+
+def _record_request(response):
+    start = request.environ.get('w3tasq.metrics_start')
+    if start is None:
+        return response
+    # The route pattern, not the path: one series per endpoint, not per task id
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    method, status = request.method, response.status_code
+    if response.is_streamed:
+        # The body is generated after this hook: observe once it is sent
+        timing.after_response_sent(response, lambda: _observe_request(start, route, method, status))
+    else:
+        _observe_request(start, route, method, status)
+    return response
+
+
+def _authorized(app):
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        header = request.headers.get('Authorization', '')
+        # Bytes: compare_digest rejects non-ASCII str with TypeError
+        return header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):].encode(), token.encode())
+    if app.config.get('METRICS_REQUIRE_TOKEN', False):
+        return False
+    return request.remote_addr in LOCAL_ADDRESSES
+
+
+def start_flusher():
+    """Write this worker's snapshot to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds (daemon thread)."""
+    global _flusher
+    if not metrics_dir or (_flusher is not None and _flusher.is_alive()):
+        return
+
+    def run():
+        while True:
+            time.sleep(_flush_interval)
+            try:
+                write_snapshot()
+            except Exception as e:
+                logger.error("Writing metrics snapshot failed: %s", e)
+
+    _flusher = threading.Thread(target=run, name='w3tasq-metrics', daemon=True)
+    _flusher.start()
+
+
+def init_metrics_export(app):
+    """Record per-request metrics and register GET /metrics"""
+    global metrics_dir, _flush_interval, _engine
+    metrics_dir = app.config.get('METRICS_DIR')
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+    _flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+    with app.app_context():
+        _engine = db.engine
+
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    if app.config.get('METRICS_REQUIRE_TOKEN', False) and not app.config.get('METRICS_TOKEN'):
+        logger.warning("METRICS_TOKEN is not set: /metrics answers 403 to every request")
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        if not _authorized(app):
+            logger.warning("Rejected /metrics request from %s", request.remote_addr)
+            return jsonify({'error': 'Forbidden'}), 403
+        return Response(render(collect()), content_type=CONTENT_TYPE)
+
+    logger.debug("Metrics export initialized (directory: %s)", metrics_dir or 'none, single process')
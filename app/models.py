@@ -35,8 +35,8 @@ class User(db.Model):
     # Primary key
     id = db.Column(db.Integer, primary_key=True)
     
-    # Web3 wallet address - required
-    wallet_address = db.Column(db.String(42), nullable=False)
+    # Web3 wallet address - required (indexed: looked up on every login)
+    wallet_address = db.Column(db.String(42), nullable=False, index=True)
     
     # Username - required
     username = db.Column(db.String(80), nullable=False)
@@ -49,6 +49,7 @@ class User(db.Model):
     
     # Relationships
     tasks = db.relationship('Task', backref='user', lazy=True, cascade='all, delete-orphan')
+    api_tokens = db.relationship('ApiToken', backref='user', lazy=True, cascade='all, delete-orphan')
     completed_tasks = db.Column(db.Integer, default=0)
     
     def __repr__(self):
@@ -92,6 +93,9 @@ class Task(db.Model):
     
     # Deadline (optional)
     deadline = db.Column(db.DateTime, nullable=True)
+
+    # Set by the mark-overdue job when an active task passes its deadline
+    overdue = db.Column(db.Boolean, default=False, nullable=False)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -111,6 +115,61 @@ class Task(db.Model):
             'priority': self.priority,
             'status': self.status,
             'deadline': self.deadline.isoformat() if self.deadline else None,
+            'overdue': self.overdue,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+
+# Task list pages: equality on user and status, then the page order
+# (priority ASC, id DESC), so pages are read straight from the index
+# without a table scan or a sort
+db.Index('ix_tasks_user_status_priority_id', Task.user_id, Task.status, Task.priority, Task.id.desc())
+# Background sweeps (db_utils.archive_completed_tasks, mark_overdue_tasks):
+# every chunk finds its rows through an index instead of scanning the table.
+# The overdue index only holds active, not yet flagged tasks with a deadline,
+# so flagged rows leave it and it stays small (status leads it so the planner
+# prefers it over the equality on status alone)
+db.Index('ix_tasks_status_updated_at', Task.status, Task.updated_at)
+db.Index('ix_tasks_overdue_deadline', Task.status, Task.deadline,
+         sqlite_where=(Task.status == 0) & Task.overdue.is_(False) & Task.deadline.isnot(None))
+
+
+class ApiToken(db.Model):
+    """
+    Record of an API token minted for a user.
+    The token itself is never stored; requests are authenticated from its
+    HMAC-signed claims. The record allows listing and revoking tokens.
+    """
+
+    __tablename__ = 'api_tokens'
+
+    # Token id (the 'jti' claim)
+    jti = db.Column(db.String(32), primary_key=True)
+
+    # Foreign key to User
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+
+    # Label chosen by the user and space-separated scopes
+    name = db.Column(db.String(80), nullable=False, default='')
+    scopes = db.Column(db.String(200), nullable=False)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        """String representation of ApiToken instance."""
+        return f"<ApiToken {self.jti} (User: {self.user_id}, Scopes: {self.scopes})>"
+
+    def to_dict(self):
+        """Convert ApiToken instance to dictionary for JSON serialization."""
+        return {
+            'id': self.jti,
+            'name': self.name,
+            'scopes': self.scopes.split(),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None
+        }
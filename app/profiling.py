@@ -0,0 +1,230 @@
+# app/profiling.py
+"""
+Opt-in cProfile capture of single requests.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` (for
+operators chasing a slowness report: replay the user's request with the
+header) or, with PROFILE_SAMPLE_RATE > 0, when it is picked at random. The
+profile is written to PROFILE_DIR (`logs/profiles`) as two files named after
+the request id:
+  - `<time>-<request id>.txt`: the call tree (functions above 1% of the
+    request time) and the top functions by cumulative and own time;
+  - `<time>-<request id>.prof`: the raw stats, for pstats or snakeviz.
+Only the newest PROFILE_MAX_FILES profiles are kept. The file name is
+returned in an `X-Profile-Id` response header.
+
+One request per process is profiled at a time (the profiler hooks the whole
+interpreter); other requests are served unprofiled meanwhile. Without a
+token and with a sample rate of 0 no hooks are installed.
+
+Streamed responses are generated after the after_request hooks: the profiler
+is then enabled around each chunk of the body, in whichever thread the server
+generates it, and the profile is written once the body has been sent.
+"""
+
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from flask import request, current_app
+from app import metrics, utils, logging_setup, timing
+
+# Set up logger
+logger = logging.getLogger('w3tasq.profiling')
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+TOP_FUNCTIONS = 30  # Rows of each top-functions table
+TREE_MIN_FRACTION = 0.01  # Call tree branches below this share of the request are pruned
+TREE_MAX_DEPTH = 40
+
+_ENVIRON_KEY = 'w3tasq.profiler'
+
+# Held while a request of this process is being profiled
+_active = threading.Lock()
+
+
+def _requested(app):
+    token = app.config.get('PROFILE_TOKEN')
+    header = request.headers.get(PROFILE_HEADER)
+    if token and header:
+        # Bytes: compare_digest rejects non-ASCII str with TypeError
+        return hmac.compare_digest(header.encode(), token.encode())
+    rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def _func_name(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # Built-in
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def call_tree(stats, min_fraction=TREE_MIN_FRACTION, max_depth=TREE_MAX_DEPTH):
+    """
+    Indented call tree of pstats.Stats, by cumulative time.
+    Recursive calls are shown once; branches under min_fraction of the total are pruned.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((cumulative, func))
+    roots = [func for func, (_, _, _, _, callers) in stats.stats.items() if not callers]
+    total = stats.total_tt or sum(stats.stats[func][3] for func in roots) or 1e-9
+    lines = []
+
+    def walk(func, cumulative, depth, path):
+        lines.append(f"{'  ' * depth}{cumulative * 1000:9.2f} ms {cumulative / total:6.1%}  {_func_name(func)}")
+        if depth >= max_depth:
+            return
+        for child_cumulative, child in sorted(callees.get(func, ()), reverse=True):
+            if child_cumulative / total >= min_fraction and child not in path:
+                walk(child, child_cumulative, depth + 1, path | {child})
+
+    for root in sorted(roots, key=lambda func: stats.stats[func][3], reverse=True):
+        walk(root, stats.stats[root][3], 0, {root})
+    return '\n'.join(lines)
+
+
+def report(profiler, title):
+    """Text report of a profile: title, call tree, top functions by cumulative and own time."""
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    out.write(f"{title}\n\n== Call tree ==\n{call_tree(stats)}\n\n== Top functions by cumulative time ==\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+    out.write("\n== Top functions by own time ==\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def profile_dir(app):
+    """PROFILE_DIR, created (with the logs/ directory) if missing."""
+    directory = app.config['PROFILE_DIR']
+    if not utils.is_log_dir():
+        utils.make_log_dir()
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def prune(directory, keep):
+    """Delete all but the `keep` newest profiles (.txt and .prof pairs)."""
+    # Newest by modification time, not by name: within one second names
+    # only differ in the request id, which is random or sent by the client
+    written = {}
+    for entry in os.scandir(directory):
+        stem, extension = os.path.splitext(entry.name)
+        if extension not in ('.txt', '.prof'):
+            continue
+        try:
+            written[stem] = max(written.get(stem, 0), entry.stat().st_mtime_ns)
+        except FileNotFoundError:
+            pass  # Pruned by another worker meanwhile
+    names = sorted(written, key=written.get)
+    for stem in names[:max(0, len(names) - keep)]:
+        for extension in ('.txt', '.prof'):
+            try:
+                os.remove(os.path.join(directory, stem + extension))
+            except FileNotFoundError:
+                pass
+
+
+def _start_request():
+    app = current_app._get_current_object()
+    if not _requested(app) or not _active.acquire(blocking=False):
+        return
+    profiler = cProfile.Profile()
+    request.environ[_ENVIRON_KEY] = (profiler, time.perf_counter())
+    profiler.enable()
+
+
+def _new_profile_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{logging_setup.current_request_id() or 'none'}"
+
+
+def _request_fields():
+    """(app, method, path with query) of the current request, for _stop after the request context ends."""
+    return current_app._get_current_object(), request.method, request.full_path.rstrip('?')
+
+
+def _profiled_chunks(iterable, profiler):
+    """Iterate a streamed body with the profiler enabled only while each chunk is generated."""
+    iterator = iter(iterable)
+    try:
+        while True:
+            # Enabled and disabled in the thread generating the chunk: cProfile
+            # hooks one thread, and the next chunk may come from another one
+            profiler.enable()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                profiler.disable()
+            yield chunk
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+
+def _stop(entry, status, profile_id, app, method, full_path):
+    """Stop a request's profiler and write its files; returns the profile id or None."""
+    profiler, start = entry
+    try:
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        directory = profile_dir(app)
+        request_id = logging_setup.current_request_id() or 'none'
+        title = f"{method} {full_path} -> {status} in {elapsed_ms:.1f} ms (request {request_id})"
+        with open(os.path.join(directory, profile_id + '.txt'), 'w') as f:
+            f.write(report(profiler, title))
+        profiler.dump_stats(os.path.join(directory, profile_id + '.prof'))
+        prune(directory, app.config.get('PROFILE_MAX_FILES', 50))
+        metrics.inc('profiles_written')
+        logger.info("Profiled %s %s (%.1f ms): %s", method, full_path, elapsed_ms, profile_id)
+        return profile_id
+    except OSError as e:
+        logger.error("Writing profile failed: %s", e)
+        return None
+    finally:
+        _active.release()
+
+
+def _finish_request(response):
+    entry = request.environ.pop(_ENVIRON_KEY, None)
+    if entry is None:
+        return response
+    profile_id = _new_profile_id()
+    stop_args = (entry, response.status_code, profile_id) + _request_fields()
+    if response.is_streamed:
+        # The body is generated after this hook: profile it chunk by chunk and
+        # write the profile once it is sent
+        entry[0].disable()
+        response.response = _profiled_chunks(response.response, entry[0])
+        timing.after_response_sent(response, lambda: _stop(*stop_args))
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    elif _stop(*stop_args):
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def _end_request(error=None):
+    # Requests that failed before after_request still release the profiler
+    entry = request.environ.pop(_ENVIRON_KEY, None)
+    if entry is not None:
+        _stop(entry, 500 if error is not None else 'unknown', _new_profile_id(), *_request_fields())
+
+
+def init_profiling(app):
+    """Install the profiling hooks if profiling can be triggered (token or sample rate)"""
+    if not app.config.get('PROFILE_TOKEN') and not app.config.get('PROFILE_SAMPLE_RATE', 0):
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    logger.debug("Request profiling enabled (sample rate %s)", app.config.get('PROFILE_SAMPLE_RATE', 0))
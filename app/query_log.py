@@ -0,0 +1,167 @@
+# app/query_log.py
+"""
+SQL instrumentation on SQLAlchemy cursor-execute events.
+
+  - Per request: number of statements and their total time, added to the
+    request timing (app/timing.py, `db` phase) and to app.metrics
+    (counter `sql_queries`, timer `sql_query`).
+  - Slow queries: statements slower than SQL_SLOW_QUERY_MS are logged by
+    'w3tasq.sql' with the shapes of their bound parameters (types and string
+    lengths, never the values: they include wallet addresses).
+  - N+1 detection: a statement executed SQL_NPLUSONE_THRESHOLD times or more
+    in one request is logged as a warning; it is usually a lazy load in a loop.
+  - record_queries(): collect the statements of a block, used by the tests to
+    pin the query count of each endpoint.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import request, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import metrics, timing
+
+# Set up logger
+logger = logging.getLogger('w3tasq.sql')
+
+MAX_STATEMENT_LENGTH = 500  # Logged statements are truncated to this many characters
+
+# Statements of the request handled in this thread/task, None outside requests
+_current = contextvars.ContextVar('w3tasq_request_queries', default=None)
+
+# Active record_queries() blocks; checked on every statement, so kept as a plain list
+_recorders = []
+_recorders_lock = threading.Lock()
+
+# Set by init_query_log()
+_slow_query_seconds = None
+
+
+class QueryRecorder:
+    """Statements seen while active, with their durations in seconds."""
+
+    def __init__(self):
+        self.statements = []  # (statement, seconds)
+        self.parameters = []  # Bound parameters of each statement, same order
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def counts(self):
+        """Executions per distinct statement."""
+        return Counter(statement for statement, _ in self.statements)
+
+    def total_seconds(self):
+        return sum(seconds for _, seconds in self.statements)
+
+
+@contextmanager
+def record_queries():
+    """Record every statement executed, in any thread, while the block runs."""
+    recorder = QueryRecorder()
+    with _recorders_lock:
+        _recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        with _recorders_lock:
+            _recorders.remove(recorder)
+
+
+def _one_line(statement):
+    statement = ' '.join(statement.split())
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        return statement[:MAX_STATEMENT_LENGTH] + '...'
+    return statement
+
+
+def _value_shape(value):
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shapes(parameters, executemany=False):
+    """
+    Describe bound parameters without their values, e.g. "(int, str[42], NoneType)".
+    executemany parameter lists are described by their length and first row.
+    """
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {parameter_shapes(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f"{key}: {_value_shape(value)}" for key, value in parameters.items()) + '}'
+    return '(' + ', '.join(_value_shape(value) for value in (parameters or ())) + ')'
+
+
+# --- Cursor events ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('w3tasq_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('w3tasq_query_start')
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+
+    metrics.inc('sql_queries')
+    metrics.observe('sql_query', seconds)
+    timings = timing.current()
+    if timings is not None:
+        timings.add('db', seconds)
+    queries = _current.get()
+    if queries is not None:
+        queries[statement] += 1
+    if _recorders:
+        with _recorders_lock:
+            for recorder in _recorders:
+                recorder.statements.append((statement, seconds))
+                recorder.parameters.append(parameters)
+
+    if _slow_query_seconds is not None and seconds >= _slow_query_seconds:
+        metrics.inc('sql_slow_queries')
+        logger.warning(
+            "Slow query (%.1f ms): %s params %s",
+            seconds * 1000, _one_line(statement), parameter_shapes(parameters, executemany)
+        )
+
+
+def _start_request():
+    _current.set(Counter())
+
+
+def _check_request(response):
+    queries = _current.get()
+    if queries:
+        threshold = current_app.config['SQL_NPLUSONE_THRESHOLD']
+        for statement, executions in queries.items():
+            if executions >= threshold:
+                metrics.inc('sql_nplusone')
+                logger.warning("Possible N+1 on %s: %s executions of %s", request.path, executions, _one_line(statement))
+    return response
+
+
+def _end_request(error=None):
+    _current.set(None)
+
+
+def init_query_log(app):
+    """Install the cursor-execute hooks and the per-request N+1 check"""
+    global _slow_query_seconds
+    slow_ms = app.config.get('SQL_SLOW_QUERY_MS', 100)
+    _slow_query_seconds = slow_ms / 1000 if slow_ms is not None else None
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if app.config.get('SQL_NPLUSONE_THRESHOLD'):
+        app.before_request(_start_request)
+        app.after_request(_check_request)
+        app.teardown_request(_end_request)
+    logger.debug("SQL instrumentation initialized (slow query threshold %s ms)", slow_ms)
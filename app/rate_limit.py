@@ -0,0 +1,275 @@
+# app/rate_limit.py
+"""
+Sliding-window rate limiting for auth and write endpoints.
+
+Each limited endpoint has rules keyed by client IP and by wallet address
+(RATE_LIMITS in app/config.py). Behind reverse proxies the client IP is taken
+from X-Forwarded-For, trusting PROXY_FIX_X_FOR hops (werkzeug's ProxyFix,
+installed by init_proxy_fix; client_ip() applies the same rule for ASGI).
+A request is allowed when every rule has fewer than `limit` hits within the
+last `window` seconds; only allowed requests are counted. The check runs in a before_request hook, so throttled
+requests are rejected before any signature recovery or database work.
+
+Backends:
+  - RedisRateLimitBackend: sliding-window logs in Redis sorted sets, all rules
+    of a request checked and recorded with one atomic script call.
+  - MemoryRateLimitBackend: the same algorithm in-process, for tests and
+    single-worker setups.
+If Redis fails, requests are let through (fail open): rate limiting must not
+take the site down with it.
+"""
+
+import logging
+import math
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from flask import request, session, jsonify
+from werkzeug.http import parse_list_header
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app import metrics, api_tokens
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# Set up logger
+logger = logging.getLogger('w3tasq.rate_limit')
+
+KEY_PREFIX = "w3tasq_rl:"
+MAX_IDENTITY_LENGTH = 64  # Client-supplied addresses are truncated before use in keys
+
+
+class RateLimitBackend(ABC):
+    """Interface of a rate limit backend."""
+
+    @abstractmethod
+    def hit(self, rules, now):
+        """
+        Record a hit for every (key, limit, window) rule if all of them have room.
+        Returns:
+            float: 0 if the hit was allowed, otherwise seconds until it would be.
+        """
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Sliding-window logs in Redis sorted sets (score = hit time in ms)."""
+
+    # KEYS: one sorted set per rule
+    # ARGV: now_ms, unique member, then limit and window_ms for each key
+    HIT_LUA = """
+local now = tonumber(ARGV[1])
+local retry = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[1 + 2 * i])
+    local window = tonumber(ARGV[2 + 2 * i])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local wait = tonumber(oldest[2]) + window - now
+        if wait > retry then
+            retry = wait
+        end
+    end
+end
+if retry > 0 then
+    return retry
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, tonumber(ARGV[2 + 2 * i]))
+end
+return 0
+"""
+
+    def __init__(self, client):
+        self.client = client
+        self._hit_script = client.register_script(self.HIT_LUA)
+
+    def hit(self, rules, now):
+        now_ms = int(now * 1000)
+        keys = []
+        args = [now_ms, f"{now_ms}-{secrets.token_hex(4)}"]
+        for key, limit, window in rules:
+            keys.append(key)
+            args.extend([limit, int(window * 1000)])
+        with metrics.timed('redis_rate_limit'):
+            retry_ms = self._hit_script(keys=keys, args=args)
+        return int(retry_ms) / 1000
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """In-process sliding-window logs (one deque of hit times per key)."""
+
+    CLEANUP_EVERY = 1000  # Hits between sweeps of idle keys
+
+    def __init__(self):
+        self._hits = {}  # key -> deque of hit times
+        self._windows = {}  # key -> window, for the idle key sweep
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= now - self._windows[k]]:
+            del self._hits[key]
+            del self._windows[key]
+
+    def hit(self, rules, now):
+        with self._lock:
+            retry = 0.0
+            for key, limit, window in rules:
+                hits = self._hits.setdefault(key, deque())
+                self._windows[key] = window
+                while hits and hits[0] <= now - window:
+                    hits.popleft()
+                if len(hits) >= limit:
+                    retry = max(retry, hits[0] + window - now)
+            if retry > 0:
+                return retry
+            for key, _, _ in rules:
+                self._hits[key].append(now)
+            self._calls += 1
+            if self._calls % self.CLEANUP_EVERY == 0:
+                self._sweep(now)
+            return 0.0
+
+
+class RateLimiter:
+    """
+    Applies per-endpoint rules to a request identity.
+
+    Args:
+        backend: RateLimitBackend holding the hit logs.
+        limits: {endpoint: {'ip': (limit, window), 'wallet': (limit, window)}}
+        breaker: Optional CircuitBreaker, so a stalled Redis is skipped quickly.
+    """
+
+    def __init__(self, backend, limits, breaker=None):
+        self.backend = backend
+        self.limits = limits
+        self.breaker = breaker
+
+    def check(self, endpoint, ip=None, wallet=None):
+        """
+        Count a request to `endpoint` from `ip` / `wallet`.
+        Returns:
+            float: 0 if allowed, otherwise seconds the client should wait.
+        """
+        endpoint_limits = self.limits.get(endpoint)
+        if not endpoint_limits:
+            return 0.0
+
+        rules = []
+        for scope, identity in (('ip', ip), ('wallet', wallet)):
+            if identity and scope in endpoint_limits:
+                limit, window = endpoint_limits[scope]
+                rules.append((f"{KEY_PREFIX}{endpoint}:{scope}:{identity}", limit, window))
+        if not rules:
+            return 0.0
+
+        try:
+            if self.breaker is not None:
+                return self.breaker.call(self.backend.hit, rules, time.time())
+            return self.backend.hit(rules, time.time())
+        except CircuitOpenError:
+            return 0.0
+        except Exception as e:
+            # Fail open: an unavailable limiter must not block logins
+            metrics.inc('rate_limit_errors')
+            logger.error("Rate limit check failed, allowing request: %s", e)
+            return 0.0
+
+
+# Active rate limiter, configured by init_rate_limit() (None: no limits)
+limiter = None
+
+
+def init_rate_limit(app, redis_client=None):
+    """Create the rate limiter selected by RATE_LIMIT_STORAGE in the app configuration"""
+    global limiter
+    limits = app.config.get('RATE_LIMITS') or {}
+    if not app.config.get('RATE_LIMIT_ENABLED', True) or not limits:
+        limiter = None
+        logger.debug("Rate limiting disabled")
+        return
+
+    storage = app.config.get('RATE_LIMIT_STORAGE', 'redis')
+    breaker = None
+    if storage == 'redis':
+        backend = RedisRateLimitBackend(redis_client)
+        breaker = CircuitBreaker(
+            'rate_limit',
+            failure_threshold=app.config.get('RATE_LIMIT_BREAKER_THRESHOLD', 5),
+            reset_timeout=app.config.get('RATE_LIMIT_BREAKER_RESET', 30)
+        )
+    elif storage == 'memory':
+        backend = MemoryRateLimitBackend()
+    else:
+        raise ValueError(f"Invalid RATE_LIMIT_STORAGE: {storage}")
+    limiter = RateLimiter(backend, limits, breaker)
+    logger.debug("Rate limiter initialized: %s", storage)
+
+
+def init_proxy_fix(app):
+    """Take the client address from X-Forwarded-For, trusting PROXY_FIX_X_FOR proxy hops"""
+    trusted_hops = app.config.get('PROXY_FIX_X_FOR', 0)
+    if trusted_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_hops, x_proto=0)
+        logger.debug("Trusting %s X-Forwarded-For hop(s)", trusted_hops)
+
+
+def client_ip(remote_addr, forwarded_for, trusted_hops):
+    """
+    Client address by ProxyFix's rule: the `trusted_hops`-th X-Forwarded-For
+    value from the right, or the peer address if there are fewer values.
+    """
+    if trusted_hops and forwarded_for:
+        values = parse_list_header(forwarded_for)
+        if len(values) >= trusted_hops:
+            return values[-trusted_hops]
+    return remote_addr
+
+
+def _request_wallet():
+    """Wallet of the request: session or API token wallet, or the address an auth call is made for."""
+    address = session.get('user_address')
+    if not address:
+        try:
+            claims = api_tokens.request_claims()
+        except api_tokens.InvalidTokenError:
+            claims = None  # Rejected by the handler; limited by IP only
+        if claims is not None:
+            address = claims['addr']
+    if not address:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            address = data.get('address')
+    return wallet_identity(address)
+
+
+def wallet_identity(address):
+    """Rate limit identity of a client-supplied wallet address, None if there is none."""
+    if not isinstance(address, str) or not address:
+        return None
+    # Plain lowercase, no checksum work before the limit is checked
+    return address.strip().lower()[:MAX_IDENTITY_LENGTH]
+
+
+def check_request():
+    """
+    before_request hook: reject the request with 429 if it is over a limit.
+    Returns:
+        Response or None: the 429 response, or None to continue.
+    """
+    if limiter is None or request.endpoint not in limiter.limits:
+        return None
+
+    retry_after = limiter.check(request.endpoint, ip=request.remote_addr, wallet=_request_wallet())
+    if retry_after <= 0:
+        return None
+
+    metrics.inc('rate_limited')
+    logger.warning("Rate limited %s from %s, retry in %.1fs", request.endpoint, request.remote_addr, retry_after)
+    response = jsonify({'error': 'Too many requests, please retry later'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
@@ -0,0 +1,187 @@
+# app/seeding.py
+"""
+Synthetic users and tasks for capacity planning and benchmarks.
+
+`flask --app app.main seed --users 100000 --tasks 10000000` fills the
+configured database with data shaped like production:
+  - tasks per user follow a Zipf-like distribution: the user of rank r gets
+    a share proportional to 1 / r**skew (skew 0 = uniform), so user 1 is the
+    heaviest and most users have few tasks;
+  - priorities and statuses are drawn with configurable weights;
+  - descriptions range from empty to `max_description_words` words;
+  - some tasks have a deadline; creation times are spread over `span_days`.
+Users' completed_tasks counters match their completed tasks.
+
+Rows are inserted with executemany in transactions of `chunk_size` rows,
+with synchronous writes off while seeding, so 10M tasks take minutes. The
+output depends only on the parameters: the same seed gives the same rows.
+Used by benchmarks/bench_db.py to build its datasets.
+"""
+
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+import click
+from sqlalchemy import text
+from app.models import db, TaskStatus
+
+# Set up logger
+logger = logging.getLogger('w3tasq.seeding')
+
+DEFAULT_START = datetime(2025, 1, 1)
+DESCRIPTION_POOL = 1024  # Distinct descriptions, drawn per task
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # How SQLAlchemy stores DateTime in SQLite
+
+_WORDS = (
+    "review update deploy fix write test plan call email draft budget report meeting design "
+    "invoice client server release backup migrate refactor document research schedule order "
+    "follow up prepare check verify sign contract wallet token audit security weekly monthly"
+).split()
+_TITLES = (
+    "Review {}", "Fix {}", "Write {}", "Plan {}", "Call about {}", "Prepare {}", "Check {}", "Update {}",
+)
+
+
+def _weights(value, count, name):
+    """Parse comma-separated weights, e.g. '2,3,5'."""
+    try:
+        weights = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise ValueError(f"{name} must be {count} comma-separated numbers, got {value!r}")
+    if len(weights) != count or any(weight < 0 for weight in weights) or not sum(weights):
+        raise ValueError(f"{name} must be {count} non-negative numbers, got {value!r}")
+    return weights
+
+
+def _format(moment):
+    return moment.strftime(DATETIME_FORMAT)
+
+
+def seed_database(users, tasks, seed=1, skew=1.0, priority_weights=(2, 3, 5), status_weights=(6, 3, 1),
+                  max_description_words=120, deadline_share=0.3, start=DEFAULT_START, span_days=365,
+                  chunk_size=100000, progress=None):
+    """
+    Insert `users` users and `tasks` tasks into the database (app context required).
+
+    Args:
+        users: Number of users, added after the existing ones.
+        tasks: Number of tasks, distributed over the new users.
+        seed: Random seed; the same arguments give the same rows.
+        skew: Exponent of the tasks-per-user distribution (0 = uniform).
+        priority_weights: Relative weights of HIGH, MEDIUM, LOW.
+        status_weights: Relative weights of ACTIVE, COMPLETED, ARCHIVED.
+        max_description_words: Longest description; lengths are uniform from empty to this.
+        deadline_share: Fraction of tasks with a deadline.
+        start, span_days: Creation times are spread evenly over this period.
+        chunk_size: Rows per INSERT transaction.
+        progress: Optional callable(tasks inserted so far).
+    Returns:
+        dict: {'users': ..., 'tasks': ..., 'first_user_id': ..., 'seconds': ...}
+    """
+    if users < 1 and tasks:
+        raise ValueError("Tasks need at least one user")
+    began = time.perf_counter()
+    rng = random.Random(seed)
+    descriptions = [' '.join(rng.choices(_WORDS, k=rng.randint(0, max_description_words))) or None
+                    for _ in range(DESCRIPTION_POOL)]
+
+    cum_user_weights = list(accumulate(1 / rank ** skew for rank in range(1, users + 1)))
+    step = timedelta(days=span_days) / max(tasks, 1)
+    completed = {}
+    insert = ("INSERT INTO tasks (user_id, title, description, priority, status, deadline, overdue, "
+              "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)")
+
+    # One connection throughout: PRAGMA synchronous is per connection
+    with db.engine.connect() as connection:
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+        connection.exec_driver_sql("PRAGMA synchronous = OFF")
+        try:
+            first_user_id = (connection.execute(text("SELECT max(id) FROM users")).scalar() or 0) + 1
+            user_ids = range(first_user_id, first_user_id + users)
+            created = _format(start)
+            connection.exec_driver_sql(
+                "INSERT INTO users (id, wallet_address, username, is_active, created_at, completed_tasks) "
+                "VALUES (?, ?, ?, 1, ?, 0)",
+                [(user_id, f"0x{rng.getrandbits(160):040x}", f"user_{user_id}", created) for user_id in user_ids]
+            )
+            connection.commit()
+
+            for offset in range(0, tasks, chunk_size):
+                count = min(chunk_size, tasks - offset)
+                owners = rng.choices(user_ids, cum_weights=cum_user_weights, k=count)
+                priorities = rng.choices((1, 2, 3), weights=priority_weights, k=count)
+                statuses = rng.choices((TaskStatus.ACTIVE, TaskStatus.COMPLETED, TaskStatus.ARCHIVED),
+                                       weights=status_weights, k=count)
+                rows = []
+                for i in range(count):
+                    number = offset + i
+                    moment = start + step * number
+                    deadline = None
+                    if rng.random() < deadline_share:
+                        deadline = _format(moment + timedelta(days=rng.randint(1, 60)))
+                    if statuses[i] == TaskStatus.COMPLETED:
+                        completed[owners[i]] = completed.get(owners[i], 0) + 1
+                    stamp = _format(moment)
+                    rows.append((
+                        owners[i], rng.choice(_TITLES).format(rng.choice(_WORDS)) + f" #{number}",
+                        descriptions[rng.randrange(DESCRIPTION_POOL)], priorities[i], statuses[i], deadline,
+                        stamp, stamp,
+                    ))
+                connection.exec_driver_sql(insert, rows)
+                connection.commit()
+                if progress is not None:
+                    progress(offset + count)
+
+            if completed:
+                connection.exec_driver_sql(
+                    "UPDATE users SET completed_tasks = ? WHERE id = ?",
+                    [(done, user_id) for user_id, done in sorted(completed.items())]
+                )
+                connection.commit()
+        finally:
+            connection.exec_driver_sql(f"PRAGMA synchronous = {int(synchronous)}")
+    seconds = time.perf_counter() - began
+    logger.info("Seeded %s users and %s tasks in %.1fs", users, tasks, seconds)
+    return {'users': users, 'tasks': tasks, 'first_user_id': first_user_id, 'seconds': seconds}
+
+
+def init_seeding(app):
+    """Register the `seed` CLI command"""
+
+    @app.cli.command('seed')
+    @click.option('--users', type=click.IntRange(min=1), default=1000, show_default=True, help='Users to create.')
+    @click.option('--tasks', type=click.IntRange(min=0), default=100000, show_default=True, help='Tasks to create.')
+    @click.option('--seed', 'seed_value', type=int, default=1, show_default=True, help='Random seed.')
+    @click.option('--skew', type=click.FloatRange(min=0), default=1.0, show_default=True,
+                  help='Tasks-per-user skew: share of the user of rank r ~ 1/r**skew (0 = uniform).')
+    @click.option('--priorities', default='2,3,5', show_default=True, help='Weights of HIGH,MEDIUM,LOW.')
+    @click.option('--statuses', default='6,3,1', show_default=True, help='Weights of ACTIVE,COMPLETED,ARCHIVED.')
+    @click.option('--max-description-words', type=click.IntRange(min=0), default=120, show_default=True)
+    @click.option('--deadline-share', type=click.FloatRange(0, 1), default=0.3, show_default=True,
+                  help='Fraction of tasks with a deadline.')
+    @click.option('--chunk-size', type=click.IntRange(min=1), default=100000, show_default=True,
+                  help='Rows per transaction.')
+    @click.option('--append', is_flag=True, help='Allow seeding a database that already has tasks.')
+    def seed_command(users, tasks, seed_value, skew, priorities, statuses, max_description_words,
+                     deadline_share, chunk_size, append):
+        """Fill the database with synthetic users and tasks."""
+        try:
+            priority_weights = _weights(priorities, 3, '--priorities')
+            status_weights = _weights(statuses, 3, '--statuses')
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        if not append and db.session.execute(text("SELECT 1 FROM tasks LIMIT 1")).first():
+            raise click.ClickException("The database already has tasks; use --append to add more")
+
+        def progress(done):
+            click.echo(f"\r{done}/{tasks} tasks", nl=done == tasks)
+
+        result = seed_database(
+            users, tasks, seed=seed_value, skew=skew, priority_weights=priority_weights,
+            status_weights=status_weights, max_description_words=max_description_words,
+            deadline_share=deadline_share, chunk_size=chunk_size, progress=progress
+        )
+        click.echo(f"Seeded {result['users']} users (ids from {result['first_user_id']}) and "
+                   f"{result['tasks']} tasks in {result['seconds']:.1f}s")
@@ -0,0 +1,172 @@
+# app/signature_service.py
+"""
+Signature recovery service for wallet login.
+
+Recovering the signer of a personal_sign message is CPU-bound ECDSA work.
+It can run inline on the request thread, or in a bounded thread/process pool
+so that a burst of logins does not occupy every request worker.
+The pool has a hard limit on queued work: when it is full, new requests are
+rejected immediately instead of piling up behind each other.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from app import metrics, timing
+
+# Set up logger
+logger = logging.getLogger('w3tasq.signature_service')
+
+VALID_MODES = ('inline', 'thread', 'process')
+
+
+class VerificationUnavailableError(Exception):
+    """Signature recovery could not be performed right now (busy or too slow)."""
+
+
+class VerificationBusyError(VerificationUnavailableError):
+    """All worker slots and queue slots are taken."""
+
+
+class VerificationTimeoutError(VerificationUnavailableError):
+    """Recovery did not finish within the configured timeout."""
+
+
+def recover_address(message, signature):
+    """
+    Recover the checksum address that signed `message` with personal_sign (EIP-191).
+    Uses the module-level eth_account Account API, no per-call Web3() instance.
+    Must stay a module-level function so it can be pickled for a process pool.
+    """
+    # Imported on first use (cached by Python afterwards) to keep worker startup fast
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+    return Account.recover_message(encode_defunct(text=message), signature=signature)
+
+
+class SignatureVerifier:
+    """
+    Runs signature recovery inline or in a bounded worker pool.
+
+    Args:
+        mode: 'inline' (request thread), 'thread' or 'process' pool.
+        workers: Number of pool workers.
+        max_queue: Number of requests allowed to wait for a free worker.
+        timeout: Seconds to wait for a pooled recovery before giving up.
+    """
+
+    def __init__(self, mode='inline', workers=2, max_queue=16, timeout=2.0):
+        if mode not in VALID_MODES:
+            raise ValueError(f"Invalid signature verification mode: {mode}. Must be one of {VALID_MODES}")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # One slot per running or waiting recovery
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._started_at = time.monotonic()
+
+    def _get_executor(self):
+        # Created lazily so that each gunicorn worker gets its own pool after fork
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.mode == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix='w3tasq-sig')
+        return self._executor
+
+    def call(self, fn, *args):
+        """
+        Run `fn(*args)` according to the configured mode and return its result.
+        Raises:
+            VerificationBusyError: the pool and its queue are full.
+            VerificationTimeoutError: the call did not finish in time.
+        """
+        if self.mode == 'inline':
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            metrics.inc('signature_rejected_busy')
+            logger.warning("Signature verification pool is full, rejecting request")
+            raise VerificationBusyError("Signature verification is busy, please retry")
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is freed when the work is really done, even after a timeout
+        future.add_done_callback(lambda _future: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            metrics.inc('signature_timeouts')
+            logger.warning("Signature verification timed out after %ss", self.timeout)
+            raise VerificationTimeoutError("Signature verification timed out, please retry")
+
+    def recover(self, message, signature):
+        """Recover the signer address of `message`, recording latency and throughput."""
+        with metrics.timed('signature_recover'):
+            address = self.call(recover_address, message, signature)
+        metrics.inc('signature_recovered')
+        return address
+
+    def stats(self):
+        """
+        Return throughput and latency figures for this worker process.
+        Returns:
+            dict: mode, recovered count, per-second throughput since start,
+                  average and max latency, busy rejections and timeouts.
+        """
+        snapshot = metrics.snapshot()
+        counters = snapshot['counters']
+        timer = snapshot['timers'].get('signature_recover', {'avg': 0.0, 'max': 0.0})
+        recovered = counters.get('signature_recovered', 0)
+        uptime = time.monotonic() - self._started_at
+        return {
+            'mode': self.mode,
+            'recovered': recovered,
+            'per_second': recovered / uptime if uptime > 0 else 0.0,
+            'avg_latency': timer['avg'],
+            'max_latency': timer['max'],
+            'rejected_busy': counters.get('signature_rejected_busy', 0),
+            'timeouts': counters.get('signature_timeouts', 0),
+        }
+
+    def shutdown(self):
+        """Stop the worker pool, if one was started."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Shared verifier, replaced by init_signature_service() with the app configuration
+verifier = SignatureVerifier()
+
+
+def init_signature_service(app):
+    """Initialize the shared signature verifier with app configuration"""
+    global verifier
+    verifier.shutdown()
+    verifier = SignatureVerifier(
+        mode=app.config.get('SIGNATURE_VERIFY_MODE', 'inline'),
+        workers=app.config.get('SIGNATURE_VERIFY_WORKERS', 2),
+        max_queue=app.config.get('SIGNATURE_VERIFY_MAX_QUEUE', 16),
+        timeout=app.config.get('SIGNATURE_VERIFY_TIMEOUT', 2.0)
+    )
+    logger.debug("Signature verifier initialized in %s mode", verifier.mode)
+
+
+def recover(message, signature):
+    """Recover the signer address of `message` with the shared verifier."""
+    with timing.phase('signature'):
+        return verifier.recover(message, signature)
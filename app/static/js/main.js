@@ -5,9 +5,20 @@
 let paginationState = {
     current_cursor: null,
     is_loading: false,
-    has_more_tasks: true
+    has_more_tasks: true,
+    page_size: null,        // Size of the last page; null = server default (TASKS_PER_PAGE)
+    last_loaded_at: 0       // When the last page arrived (ms)
 };
 
+// --- Prefetch settings for infinite scroll ---
+const prefetchConfig = {
+    rootMarginPx: 1500,     // Start loading the next page this far before the end of the list
+    fastScrollMs: 2500,     // Next page needed sooner than this after the previous one = fast scrolling
+    maxPageSize: 60         // Client-side cap; the server clamps to TASKS_PER_PAGE_MAX anyway
+};
+
+let prefetchObserver = null;
+
 // --- Helper function to escape HTML ---
 function escapeHtml(unsafe) {
     if (typeof unsafe !== 'string') return unsafe;
@@ -45,23 +56,22 @@ function formatTaskHtml(task) {
     const isCompleted = task.status === 1;
     const checkboxCheckedAttr = isCompleted ? ' checked' : '';
     const taskCompletedClass = isCompleted ? ' completed' : ''; // Add class if completed
+    // Archive request queued but not confirmed yet
+    const taskUpdatingClass = task.pendingArchive ? ' task-updating' : '';
+    const archiveDisabledAttr = task.pendingArchive ? ' disabled' : '';
 
     return `
-        <div class="task-item priority-${task.priority}${taskCompletedClass}" data-task-id="${task.id}">
+        <div class="task-item priority-${task.priority}${taskCompletedClass}${taskUpdatingClass}" data-task-id="${task.id}">
             <h4>
             <input type="checkbox" id="task-complete-checkbox-${task.id}" class="task-complete-checkbox" data-task-id="${task.id}"${checkboxCheckedAttr}>
             ${escapeHtml(task.title)}
-            <button class="task-archive-btn" data-task-id="${task.id}" title="Archive task">✕</button>
+            <button class="task-archive-btn${taskUpdatingClass}" data-task-id="${task.id}" title="Archive task"${archiveDisabledAttr}>✕</button>
             </h4>
             ${task.description ? `<p>${escapeHtml(task.description)}</p>` : ''}
             <div class="task-meta">
                 <span>${createdAtStr}</span>
             </div>
             ${task.deadline ? `<div style="font-size: 0.8em; color: #888; margin-top: 5px;">Deadline: ${new Date(task.deadline).toLocaleString()}</div>` : ''}
-            <!-- Loading indicator for task update -->
-            <div class="task-loading-spinner" style="display: none; font-size: 0.8em; color: #666; margin-top: 5px;">
-                Updating...
-            </div>
         </div>
     `;
 }
@@ -193,10 +203,17 @@ if (taskForm) {
 }
 
 // --- Helper function to load tasks (common logic) ---
-function fetchTasks(cursor = null) {
-    let url = `/api/tasks`;
+function fetchTasks(cursor = null, limit = null) {
+    const params = new URLSearchParams();
     if (cursor !== null) {
-        url += `?cursor=${cursor}`;
+        params.set('cursor', cursor);
+    }
+    if (limit !== null) {
+        params.set('limit', limit);
+    }
+    let url = `/api/tasks`;
+    if (params.toString()) {
+        url += `?${params.toString()}`;
     }
 
     return fetch(url)
@@ -211,6 +228,159 @@ function fetchTasks(cursor = null) {
         });
 }
 
+// --- Windowed (virtualized) task list ---
+// All loaded tasks are kept in memory, but only the rows around the viewport
+// are present in the DOM. Two spacers stand in for the rows above and below
+// the rendered window, so the page keeps its full scroll height.
+const taskListState = {
+    tasks: [],                 // Loaded tasks, in display order
+    taskById: new Map(),       // taskId (number) -> task object from `tasks`
+    rowHeights: new Map(),     // taskId -> measured row height incl. gap (px)
+    estimatedRowHeight: 120,   // Used for rows that were never rendered
+    rowGap: 10,                // Must match the margin of #taskListRows .task-item
+    overscan: 5,               // Extra rows rendered above and below the viewport
+    renderedStart: 0,
+    renderedEnd: 0,
+    renderScheduled: false
+};
+
+// --- Helper: height of a row, measured if it was rendered before ---
+function getRowHeight(task) {
+    return taskListState.rowHeights.get(task.id) || taskListState.estimatedRowHeight;
+}
+
+// --- Helper: index of the row that contains vertical position `y` ---
+function findRowAt(offsets, y) {
+    // offsets[i] is the top of row i, offsets[offsets.length - 1] the list bottom
+    let low = 0;
+    let high = offsets.length - 2;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (offsets[mid + 1] > y) {
+            high = mid;
+        } else {
+            low = mid + 1;
+        }
+    }
+    return low;
+}
+
+// --- Function to build the empty list skeleton inside the container ---
+function resetTaskList(container) {
+    taskListState.tasks = [];
+    taskListState.taskById = new Map();
+    taskListState.rowHeights = new Map();
+    taskListState.renderedStart = 0;
+    taskListState.renderedEnd = 0;
+
+    container.innerHTML = `
+        <div id="taskListTopSpacer"></div>
+        <div id="taskListRows"></div>
+        <div id="taskListBottomSpacer"></div>
+        <div id="taskListSentinel"></div>
+        <div id="taskListFooter"></div>
+    `;
+}
+
+// --- Function to add loaded tasks to the end of the list ---
+function addTasksToList(tasks) {
+    tasks.forEach(task => {
+        if (taskListState.taskById.has(task.id)) return; // Already loaded
+        taskListState.tasks.push(task);
+        taskListState.taskById.set(task.id, task);
+    });
+    renderVisibleTasks(true);
+}
+
+// --- Function to render only the rows that are near the viewport ---
+function renderVisibleTasks(force = false) {
+    taskListState.renderScheduled = false;
+
+    const rows = document.getElementById('taskListRows');
+    const topSpacer = document.getElementById('taskListTopSpacer');
+    const bottomSpacer = document.getElementById('taskListBottomSpacer');
+    if (!rows || !topSpacer || !bottomSpacer) return;
+
+    const tasks = taskListState.tasks;
+    if (tasks.length === 0) {
+        rows.innerHTML = '';
+        topSpacer.style.height = '0px';
+        bottomSpacer.style.height = '0px';
+        taskListState.renderedStart = 0;
+        taskListState.renderedEnd = 0;
+        return;
+    }
+
+    // Top offset of every row relative to the start of the list
+    const offsets = new Array(tasks.length + 1);
+    offsets[0] = 0;
+    for (let i = 0; i < tasks.length; i++) {
+        offsets[i + 1] = offsets[i] + getRowHeight(tasks[i]);
+    }
+
+    // Part of the list that is inside the viewport
+    const viewTop = -topSpacer.getBoundingClientRect().top;
+    const viewBottom = viewTop + window.innerHeight;
+
+    const start = Math.max(0, findRowAt(offsets, viewTop) - taskListState.overscan);
+    const end = Math.min(tasks.length, findRowAt(offsets, viewBottom) + 1 + taskListState.overscan);
+
+    if (!force && start === taskListState.renderedStart && end === taskListState.renderedEnd) {
+        return; // Same window as before, nothing to do
+    }
+
+    rows.innerHTML = tasks.slice(start, end).map(formatTaskHtml).join('');
+    taskListState.renderedStart = start;
+    taskListState.renderedEnd = end;
+
+    // Measure the rendered rows so the estimates get replaced by real heights
+    rows.querySelectorAll('.task-item').forEach(element => {
+        taskListState.rowHeights.set(Number(element.dataset.taskId), element.offsetHeight + taskListState.rowGap);
+    });
+
+    let heightBelow = 0;
+    for (let i = end; i < tasks.length; i++) {
+        heightBelow += getRowHeight(tasks[i]);
+    }
+    topSpacer.style.height = `${offsets[start]}px`;
+    bottomSpacer.style.height = `${heightBelow}px`;
+}
+
+// --- Function to re-render the window at most once per animation frame ---
+function scheduleTaskListRender() {
+    if (taskListState.renderScheduled) return;
+    taskListState.renderScheduled = true;
+    requestAnimationFrame(() => renderVisibleTasks());
+}
+
+// --- Function to remove a task from the list (with animation if it is visible) ---
+function removeTaskFromList(taskId) {
+    const task = taskListState.taskById.get(Number(taskId));
+    if (!task) return;
+
+    const dropTask = () => {
+        const index = taskListState.tasks.indexOf(task);
+        if (index !== -1) {
+            taskListState.tasks.splice(index, 1);
+        }
+        taskListState.taskById.delete(task.id);
+        taskListState.rowHeights.delete(task.id);
+        renderVisibleTasks(true);
+    };
+
+    const taskItem = document.querySelector(`#taskListRows .task-item[data-task-id="${task.id}"]`);
+    if (taskItem) {
+        finalizeTaskCompletion(taskItem, dropTask);
+    } else {
+        dropTask();
+    }
+}
+
+// --- Function to get the footer element below the list (loader, end message) ---
+function getTaskListFooter() {
+    return document.getElementById('taskListFooter') || document.getElementById('tasksContainer');
+}
+
 // --- Function to display tasks (for initial load) ---
 function displayTasks(tasks) {
     const container = document.getElementById('tasksContainer');
@@ -222,18 +392,8 @@ function displayTasks(tasks) {
         return;
     }
 
-    let tasksHtml = '';
-    tasks.forEach(task => {
-        tasksHtml += formatTaskHtml(task);
-    });
-
-    container.innerHTML = tasksHtml;
-
-    // Attach event listeners to the newly rendered checkboxes
-    attachTaskCheckboxListeners();
-
-    addArchiveButtonListeners();
-
+    resetTaskList(container);
+    addTasksToList(tasks);
 }
 
 // --- Function to append tasks to the end of the list ---
@@ -243,25 +403,17 @@ function appendTasks(tasks) {
 
     if (tasks.length === 0) {
         // If there are no tasks, show a message (only if it's the first load)
-        if (container.children.length === 0 || container.querySelector('.text-center')) {
+        if (taskListState.tasks.length === 0) {
             container.innerHTML = '<p class="text-center">No tasks found.</p>';
         }
         paginationState.has_more_tasks = false;
         return;
     }
 
-    let tasksHtml = '';
-    tasks.forEach(task => {
-        tasksHtml += formatTaskHtml(task);
-    });
-
-    // Add HTML to the end of the container
-    container.insertAdjacentHTML('beforeend', tasksHtml);
-
-    // Attach event listeners to the newly appended checkboxes
-    attachTaskCheckboxListeners();
-
-    addArchiveButtonListeners();
+    if (!document.getElementById('taskListRows')) {
+        resetTaskList(container);
+    }
+    addTasksToList(tasks);
 
     // If there are no more tasks, show a message
     if (!paginationState.has_more_tasks) {
@@ -270,7 +422,7 @@ function appendTasks(tasks) {
         endMsg.style.marginTop = '20px';
         endMsg.style.color = '#666';
         endMsg.textContent = 'No more tasks to load.';
-        container.appendChild(endMsg);
+        getTaskListFooter().appendChild(endMsg);
     }
 }
 
@@ -284,14 +436,17 @@ function loadUserTasks(reset_cursor = true) {
         paginationState.current_cursor = null;
         paginationState.has_more_tasks = true;
         paginationState.is_loading = true;
+        paginationState.page_size = null;
         container.innerHTML = '<div class="loading">Loading tasks...</div>';
     }
 
-    fetchTasks(paginationState.current_cursor)
+    fetchTasks(paginationState.current_cursor, paginationState.page_size)
         .then(data => {
             // Update pagination state
             paginationState.has_more_tasks = data.pagination.has_more;
             paginationState.current_cursor = data.pagination.next_cursor;
+            paginationState.page_size = data.pagination.limit;
+            paginationState.last_loaded_at = Date.now();
 
             // If reset, replace the entire content
             if (reset_cursor) {
@@ -302,6 +457,7 @@ function loadUserTasks(reset_cursor = true) {
             }
 
             paginationState.is_loading = false;
+            observePrefetchSentinel();
         })
         .catch(error => {
             console.error('Error loading tasks:', error);
@@ -310,41 +466,45 @@ function loadUserTasks(reset_cursor = true) {
         });
 }
 
-// --- UPDATED FUNCTION: Check if we need to load more tasks based on window scroll ---
-function checkWindowScroll() {
-    // Assume pagination is managed by the global paginationState object
-    if (paginationState.is_loading || !paginationState.has_more_tasks) return;
-
-    const container = document.getElementById('tasksContainer');
-    if (!container) return;
-
-    // --- Logic 1: Check if we are near the bottom of the page ---
-    // This checks the distance from the current scroll position to the bottom of the document
-    const scrollTop = window.scrollY || document.documentElement.scrollTop;
-    const windowHeight = window.innerHeight;
-    const documentHeight = document.documentElement.scrollHeight;
+// --- Function to pick the size of the next page ---
+function nextPageSize() {
+    /**
+     * If the user reached the prefetch point soon after the previous page
+     * arrived, they are scrolling fast: double the page size (up to the cap)
+     * so fewer round trips are needed. Otherwise fall back to the default.
+     */
+    const sinceLastLoad = Date.now() - paginationState.last_loaded_at;
+    if (sinceLastLoad < prefetchConfig.fastScrollMs) {
+        return Math.min(paginationState.page_size * 2, prefetchConfig.maxPageSize);
+    }
+    return null;
+}
 
-    // If we are within N pixels of the bottom of the document, load more
-    const distanceFromBottom = documentHeight - (scrollTop + windowHeight);
-    const thresholdPixels = 100; // pixels from the bottom
+// --- Function to watch the sentinel below the list and prefetch the next page ---
+function observePrefetchSentinel() {
+    /**
+     * Uses an IntersectionObserver on an empty element placed after the list.
+     * The observer fires when the sentinel comes within rootMarginPx of the
+     * viewport, so the next page is usually loaded before the user gets there,
+     * and no layout math runs on scroll events.
+     * Re-observing after every page makes the observer report the current
+     * state again, so a sentinel that is still in range triggers the next page.
+     */
+    if (!('IntersectionObserver' in window)) return;
 
-    if (distanceFromBottom <= thresholdPixels) {
-        loadMoreTasks();
-        return; // Exit to prevent multiple calls
+    if (!prefetchObserver) {
+        prefetchObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadMoreTasks();
+            }
+        }, { rootMargin: `0px 0px ${prefetchConfig.rootMarginPx}px 0px` });
     }
 
-    // --- Logic 2: Alternative - Check distance to the bottom of the tasks container ---
-    // Sometimes more precise if you want to trigger loading before reaching the absolute page bottom
-    /*
-    const containerRect = container.getBoundingClientRect();
-    const containerBottomRelativeToViewport = containerRect.bottom; // Bottom edge of container in viewport
-    const viewportHeight = window.innerHeight;
-
-    // If the bottom of the container is within N pixels of the bottom of the viewport
-    if ((viewportHeight - containerBottomRelativeToViewport) < thresholdPixels) {
-        loadMoreTasks();
+    prefetchObserver.disconnect();
+    const sentinel = document.getElementById('taskListSentinel');
+    if (sentinel && paginationState.has_more_tasks) {
+        prefetchObserver.observe(sentinel);
     }
-    */
 }
 
 // --- Function to load the next batch of tasks ---
@@ -360,6 +520,9 @@ function loadMoreTasks() {
         paginationState.is_loading = true;
     }
 
+    // Larger pages while the user scrolls fast
+    paginationState.page_size = nextPageSize();
+
     // Show loading indicator at the bottom
     const loader = document.createElement('div');
     loader.id = 'scroll-loader';
@@ -368,9 +531,9 @@ function loadMoreTasks() {
     loader.style.textAlign = 'center';
     loader.style.padding = '20px';
     loader.style.color = '#666';
-    container.appendChild(loader);
+    getTaskListFooter().appendChild(loader);
 
-    fetchTasks(paginationState.current_cursor)
+    fetchTasks(paginationState.current_cursor, paginationState.page_size)
         .then(data => {
             // Remove loading indicator
             const loaderElement = document.getElementById('scroll-loader');
@@ -379,11 +542,14 @@ function loadMoreTasks() {
             // Update pagination state
             paginationState.has_more_tasks = data.pagination.has_more;
             paginationState.current_cursor = data.pagination.next_cursor;
+            paginationState.page_size = data.pagination.limit;
+            paginationState.last_loaded_at = Date.now();
 
             // Add new tasks to the end of the existing list
             appendTasks(data.tasks);
 
             paginationState.is_loading = false;
+            observePrefetchSentinel();
         })
         .catch(error => {
             console.error('Error loading more tasks:', error);
@@ -396,7 +562,7 @@ function loadMoreTasks() {
             errorMsg.className = 'text-center';
             errorMsg.style.color = 'red';
             errorMsg.textContent = 'Error loading tasks: ' + (error.error || error.message || 'Unknown error');
-            container.appendChild(errorMsg);
+            getTaskListFooter().appendChild(errorMsg);
 
             paginationState.is_loading = false;
         });
@@ -460,8 +626,12 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
+    // One set of delegated listeners for all task rows
+    initTaskListEvents();
+
     // Add global scroll handler (in case the container itself is not scrollable)
-    window.addEventListener('scroll', checkWindowScroll);
+    window.addEventListener('scroll', scheduleTaskListRender, { passive: true });
+    window.addEventListener('resize', scheduleTaskListRender);
 });
 
 // Function to update marquee with a new message
@@ -473,187 +643,221 @@ document.addEventListener('DOMContentLoaded', function () {
         marqueeText.style.animation = 'marquee 18s linear infinite'; // Restart animation
     }
 
-// --- Function to handle the change event on a task completion checkbox ---
-function handleTaskCheckboxChange(event) {
-    /**
-     * Handles the logic when a user clicks the completion checkbox for a task.
-     * 1. Immediately disables the checkbox to prevent double-clicks.
-     * 2. Determines the new status (0=ACTIVE, 1=COMPLETED).
-     * 3. Shows a loading indicator.
-     * 4. Sends a PATCH request to update the task status on the server.
-     * 5. On success: Updates the UI to reflect completion (strikethrough, opacity).
-     * 6. On error: Reverts the checkbox state and shows an error message.
-     * 7. Re-enables the checkbox in case of error or for allowing status toggle.
-     */
-    const checkbox = event.target; // The checkbox that triggered the event
+// --- Client-side mutation queue for task status changes ---
+// Status changes are applied to the UI immediately (optimistically) and
+// collected for a short window; all changes made within that window are sent
+// to the server as one PATCH /api/tasks request. Items the server rejects are
+// rolled back one by one, the rest of the batch stays applied.
+const mutationQueue = {
+    pending: new Map(),   // taskId -> { status, originalStatus, onConfirm, onRollback }
+    timer: null,
+    flushDelayMs: 400,    // Coalescing window
+    maxBatchSize: 50      // Must not exceed TASKS_BATCH_MAX on the server
+};
 
-    // --- Immediate UI Feedback ---
-    // 1. Disable the checkbox instantly to prevent multiple rapid clicks
-    checkbox.disabled = true;
+/**
+ * Queue a status change for a task and schedule a batched flush.
+ * If the task already has a pending change, the new status replaces it;
+ * if it returns the task to its original status, the change is dropped.
+ * @param {string} taskId - ID of the task to update.
+ * @param {number} status - New status (0=ACTIVE, 1=COMPLETED, 2=ARCHIVED).
+ * @param {number} originalStatus - Status the task had before this change.
+ * @param {Object} callbacks - { onConfirm(task), onRollback(errorMessage, serverStatus) }.
+ */
+function queueTaskStatusChange(taskId, status, originalStatus, callbacks) {
+    const existing = mutationQueue.pending.get(taskId);
+    if (existing) {
+        // Keep the status the server still knows about for rollback
+        originalStatus = existing.originalStatus;
+    }
 
-    const taskId = checkbox.dataset.taskId;
-    const isChecked = checkbox.checked;
+    if (status === originalStatus) {
+        // The change cancels out a pending one, nothing to send
+        mutationQueue.pending.delete(taskId);
+        return;
+    }
 
-    // Determine the numeric status to send (0=ACTIVE, 1=COMPLETED)
-    const statusToSend = isChecked ? 1 : 0;
+    mutationQueue.pending.set(taskId, {
+        status: status,
+        originalStatus: originalStatus,
+        onConfirm: callbacks.onConfirm,
+        onRollback: callbacks.onRollback
+    });
 
-    // Find the parent task item container
-    const taskItem = checkbox.closest('.task-item');
-    if (!taskItem) {
-        console.error('Task item container not found for checkbox');
+    if (mutationQueue.pending.size >= mutationQueue.maxBatchSize) {
+        flushTaskStatusChanges();
         return;
     }
 
+    clearTimeout(mutationQueue.timer);
+    mutationQueue.timer = setTimeout(flushTaskStatusChanges, mutationQueue.flushDelayMs);
+}
 
+/**
+ * Send all pending status changes to the server in one request.
+ * @param {boolean} keepalive - Let the request outlive the page (used on page hide).
+ */
+function flushTaskStatusChanges(keepalive = false) {
+    clearTimeout(mutationQueue.timer);
+    mutationQueue.timer = null;
+    if (mutationQueue.pending.size === 0) return;
+
+    // Take the current batch; changes made while it is in flight start a new one
+    const batch = mutationQueue.pending;
+    mutationQueue.pending = new Map();
+
+    const updates = [];
+    batch.forEach((change, taskId) => {
+        updates.push({ id: parseInt(taskId), status: change.status });
+    });
 
-    // 2. Show loading indicator within the task item
-    const spinner = taskItem.querySelector('.task-loading-spinner');
-    if (spinner) {
-        spinner.style.display = 'block';
-    }
-
-    // --- Send Update Request ---
-    fetch(`/api/tasks/${taskId}`, {
+    fetch('/api/tasks', {
         method: 'PATCH',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ status: statusToSend })
+        body: JSON.stringify({ updates: updates }),
+        keepalive: keepalive
     })
     .then(response => {
-        // Remove loading indicator regardless of outcome
-        if (spinner) spinner.style.display = 'none';
-
         if (!response.ok) {
-            // If HTTP status is not 2xx, attempt to parse error JSON
             return response.json().then(err => Promise.reject(err));
         }
         return response.json();
     })
     .then(data => {
-        if (!data.success) {
-            // --- API returned success=false ---
-            throw new Error(data.error || 'Unknown error from server');
+        let failed = 0;
+        data.results.forEach(result => {
+            const change = batch.get(String(result.id));
+            if (!change) return;
+            if (result.success) {
+                change.onConfirm(result.task);
+            } else {
+                failed += 1;
+                change.onRollback(result.error || 'Unknown error from server', change.originalStatus);
             }
-        // --- Success Path ---
-        console.log(`Task ${taskId} status updated to ${statusToSend} on server.`);
-        updateMarquee(`${data.task.title} status updated`);
-
-        // Update the visual state of the task item based on the new status
-        if (statusToSend === 1) {
-            // Mark as completed: Add visual styles
-            taskItem.classList.add('completed');
-            // Optional: Fade out and remove task from the list
-            finalizeTaskCompletion(taskItem);
-            // Better approach: Reload the task list to respect filtering
-            // This ensures completed tasks are removed from the "active tasks" view
-            // loadUserTasks(true); // true = reset cursor and reload first page
+        });
 
+        if (failed > 0) {
+            updateMarquee(`${failed} of ${data.results.length} task updates failed`);
+        } else if (data.results.length === 1) {
+            updateMarquee(`${data.results[0].task.title} status updated`);
         } else {
-            // Mark as active (undo completion): Remove visual styles
-            taskItem.classList.remove('completed');
-            // If we were reloading on completion, we might want to reload on un-completion too
-            // to ensure it reappears correctly if filtering changes. For now, just update UI.
+            updateMarquee(`${data.results.length} tasks updated`);
         }
-
-        // Keep checkbox enabled if we allow toggling back.
-        // If checkbox is kept disabled after completion, user cannot undo easily.
-        // Decision: Keep enabled for flexibility.
-        // checkbox.disabled = false;
     })
     .catch(error => {
-        // --- Error Path ---
-        console.error('Error updating task status:', error);
-
-        // 1. Revert UI changes made optimistically or due to state mismatch
-        checkbox.checked = !isChecked; // Undo the checkbox change
-        if (isChecked) {
-            taskItem.classList.remove('completed'); // Undo strikethrough if it was checked
-        } else {
-            taskItem.classList.add('completed'); // Reinstate strikethrough if it was unchecked
-        }
-
-        // 2. Re-enable the checkbox so the user can try again
-        checkbox.disabled = false;
-
-        // 3. Inform the user about the error
-        updateMarquee('Error updating task status: ' + (error.message || 'Unknown error'));
-
+        // The whole request failed: roll back every item of the batch
+        console.error('Error updating task statuses:', error);
+        const message = error.error || error.message || 'Unknown error';
+        batch.forEach(change => change.onRollback(message, change.originalStatus));
+        updateMarquee('Error updating tasks: ' + message);
     });
-    // Note: There is no 'finally' block here to re-enable the checkbox,
-    // as re-enabling is handled explicitly in both success and error paths.
-    // This allows us to keep the checkbox disabled after a successful completion
-    // if desired, or re-enable it for toggling, based on specific logic.
 }
 
-// --- Function to attach event listeners to task checkboxes ---
-function attachTaskCheckboxListeners() {
+// Do not lose queued changes when the user leaves or hides the page
+window.addEventListener('pagehide', () => flushTaskStatusChanges(true));
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+        flushTaskStatusChanges(true);
+    }
+});
+
+// --- Function to handle the change event on a task completion checkbox ---
+function handleTaskCheckboxChange(event) {
     /**
-     * Attaches the 'change' event listener to all task completion checkboxes
-     * that do not already have a listener attached.
-     * This prevents duplicate listeners when new tasks are appended.
+     * Handles the logic when a user clicks the completion checkbox for a task.
+     * 1. Determines the new status (0=ACTIVE, 1=COMPLETED).
+     * 2. Updates the task data and the UI optimistically (strikethrough, opacity).
+     * 3. Queues the change; it is sent together with other changes made shortly after.
+     * 4. On confirmation of a completion: removes the task from the active list.
+     * 5. On error: restores the status of this task only and re-renders it.
      */
-    document.querySelectorAll('.task-complete-checkbox').forEach(checkbox => {
-        // Check if a listener has already been attached using a data attribute
-        if (!checkbox.dataset.listenerAttached) {
-            // Attach the named event handler function
-            checkbox.addEventListener('change', handleTaskCheckboxChange);
-            // Mark the checkbox to prevent re-attaching the listener
-            checkbox.dataset.listenerAttached = 'true';
+    const checkbox = event.target; // The checkbox that triggered the event
+
+    const taskId = checkbox.dataset.taskId;
+    const isChecked = checkbox.checked;
+    const task = taskListState.taskById.get(Number(taskId));
+
+    // Determine the numeric status to send (0=ACTIVE, 1=COMPLETED)
+    const statusToSend = isChecked ? 1 : 0;
+
+    // Find the parent task item container
+    const taskItem = checkbox.closest('.task-item');
+    if (!taskItem || !task) {
+        console.error('Task item container not found for checkbox');
+        return;
+    }
+
+    // --- Optimistic UI update ---
+    // The task object is the source of truth, rows are re-rendered from it when scrolled
+    const originalStatus = task.status;
+    task.status = statusToSend;
+    taskItem.classList.toggle('completed', isChecked);
+
+    queueTaskStatusChange(taskId, statusToSend, originalStatus, {
+        onConfirm: confirmedTask => {
+            console.log(`Task ${taskId} status updated to ${confirmedTask.status} on server.`);
+            task.status = confirmedTask.status;
+            if (confirmedTask.status === 1) {
+                // Completed tasks are not part of the "active tasks" view
+                removeTaskFromList(taskId);
+            }
+        },
+        onRollback: (message, serverStatus) => {
+            console.error(`Error updating task ${taskId} status:`, message);
+            task.status = serverStatus;
+            renderVisibleTasks(true);
         }
     });
 }
 
 // Handle archive button click
 function handleTaskArchiveClick(event) {
-    const button = event.target;
+    const button = event.target.closest('.task-archive-btn');
     const taskId = button.getAttribute('data-task-id');
     const taskItem = button.closest('.task-item');
-    const spinner = taskItem.querySelector('.task-loading-spinner');
+    const task = taskListState.taskById.get(Number(taskId));
+    if (!task) return;
 
-    // Block interactions
+    // Optimistically hide the task while the change is queued
+    task.pendingArchive = true;
     button.disabled = true;
     taskItem.classList.add('task-updating');
     button.classList.add('task-updating');
-    if (spinner) spinner.style.display = 'block';
 
-    // Send request to update status
-    fetch(`/api/tasks/${taskId}`, {
-        method: 'PATCH',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ status: 2 }) // ARCHIVED
-    })
-    .then(response => {
-        if (spinner) spinner.style.display = 'none';
-        if (!response.ok) {
-            return response.json().then(err => Promise.reject(err));
-        }
-        return response.json();
-    })
-    .then(data => {
-        if (!data.success) {
-            throw new Error(data.error || 'Unknown error from server');
+    queueTaskStatusChange(taskId, 2, task.status, { // ARCHIVED
+        onConfirm: () => removeTaskFromList(taskId), // Reuse animation
+        onRollback: (message, serverStatus) => {
+            console.error(`Error archiving task ${taskId}:`, message);
+            task.pendingArchive = false;
+            task.status = serverStatus;
+            renderVisibleTasks(true);
         }
-        updateMarquee(`${data.task.title} archived successfully`);
-        finalizeTaskCompletion(taskItem); // Reuse animation
-    })
-    .catch(error => {
-        console.error('Error archiving task:', error);
-        updateMarquee('Error archiving task: ' + (error.message || 'Unknown error'));
-        button.disabled = false;
-        taskItem.classList.remove('task-updating');
-        button.classList.remove('task-updating');
     });
 }
 
-// Add listeners to all archive buttons
-function addArchiveButtonListeners() {
-    document.querySelectorAll('.task-archive-btn').forEach(button => {
-        if (!button.dataset.listenerAttached) {
-            button.addEventListener('click', handleTaskArchiveClick);
-            button.dataset.listenerAttached = 'true';
+// --- Function to attach delegated event listeners to the task list ---
+function initTaskListEvents() {
+    /**
+     * Attaches one 'change' and one 'click' listener to the tasks container.
+     * Rows are created and destroyed while scrolling, so per-row listeners
+     * would have to be re-attached on every render; delegated listeners
+     * handle rows that do not exist yet.
+     */
+    const container = document.getElementById('tasksContainer');
+    if (!container) return;
+
+    container.addEventListener('change', function (event) {
+        if (event.target.matches('.task-complete-checkbox')) {
+            handleTaskCheckboxChange(event);
+        }
+    });
+
+    container.addEventListener('click', function (event) {
+        const button = event.target.closest('.task-archive-btn');
+        if (button && !button.disabled) {
+            handleTaskArchiveClick(event);
         }
     });
 }
@@ -663,13 +867,14 @@ function addArchiveButtonListeners() {
  * Applies a fade-out animation to a task item and removes it from the DOM after the animation completes.
  * Provides visual feedback that a completed task is being removed from the list.
  * @param {HTMLElement} taskItemElement - The .task-item DOM element to animate and remove.
+ * @param {Function} [onRemoved] - Called once the animation has finished.
  */
-function finalizeTaskCompletion(taskItemElement) {
+function finalizeTaskCompletion(taskItemElement, onRemoved) {
     /**
      * Handles the smooth visual disappearance of a task marked as completed.
      * 1. Adds a CSS class that triggers a fade-out/shrink animation.
      * 2. Waits for the animation to finish (using setTimeout).
-     * 3. Removes the task element from the DOM.
+     * 3. Removes the task element from the DOM and notifies the caller.
      */
     if (!taskItemElement) {
         console.warn('finalizeTaskCompletion called with null/undefined taskItemElement');
@@ -688,9 +893,9 @@ function finalizeTaskCompletion(taskItemElement) {
         // Check if element is still connected before removing (good practice)
         if (taskItemElement.isConnected) {
             taskItemElement.remove();
-            console.log('Task item removed from DOM after animation.');
-        } else {
-            console.log('Task item was already removed from DOM.');
+        }
+        if (onRemoved) {
+            onRemoved();
         }
     }, animationDurationMs);
-}
\ No newline at end of file
+}
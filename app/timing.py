@@ -0,0 +1,184 @@
+# app/timing.py
+"""
+Per-request latency breakdown.
+
+While a request is handled, time spent in these phases is accumulated:
+  - db:        SQL statements (added by the cursor hooks of app/query_log.py)
+  - redis:     Redis round trips (a timed connection class in the Redis pool)
+  - signature: wallet signature recovery
+  - serialize: ORM objects to dicts and JSON encoding
+Together with the total they are written as structured fields of the access
+log line (logger 'w3tasq.access') and, when SERVER_TIMING_HEADER is set
+(development and testing), as a `Server-Timing` response header.
+
+With REQUEST_TIMING_ENABLED = False no hooks are installed and phase() only
+does one context variable lookup.
+
+Streamed responses are generated after the after_request hooks, so the access
+line is written once the body has been sent (after_response_sent); they get
+no Server-Timing header.
+"""
+
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+import redis
+from flask import request, current_app
+from flask.json.provider import DefaultJSONProvider
+
+# Set up logger
+access_logger = logging.getLogger('w3tasq.access')
+
+PHASES = ('db', 'redis', 'signature', 'serialize')
+
+# Timings of the request handled in this thread/task, None outside requests
+_current = contextvars.ContextVar('w3tasq_request_timing', default=None)
+
+
+class RequestTimings:
+    """Accumulated milliseconds and call counts per phase for one request."""
+
+    __slots__ = ('start', 'durations', 'counts')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+
+    def add(self, name, seconds, calls=1):
+        self.durations[name] += seconds * 1000
+        self.counts[name] += calls
+
+    def total_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+
+@contextmanager
+def phase(name, calls=1):
+    """Add the time spent in the enclosed block to phase `name` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start, calls)
+
+
+def current():
+    """RequestTimings of the current request, or None."""
+    return _current.get()
+
+
+def server_timing_header(timings, total_ms):
+    """Format timings as a Server-Timing header value."""
+    entries = [
+        f'{name};desc="{timings.counts[name]} calls";dur={timings.durations[name]:.2f}'
+        for name in PHASES if timings.counts[name]
+    ]
+    entries.append(f'total;dur={total_ms:.2f}')
+    return ', '.join(entries)
+
+
+def access_fields(timings, total_ms):
+    """Timing fields of an access log record (milliseconds, rounded)."""
+    fields = {'total_ms': round(total_ms, 2)}
+    for name in PHASES:
+        fields[f'{name}_ms'] = round(timings.durations[name], 2)
+        fields[f'{name}_calls'] = timings.counts[name]
+    return fields
+
+
+# --- Hooks ---
+class TimedRedisConnection(redis.Connection):
+    """Redis connection that adds command round trips to the redis phase (one call per reply)."""
+
+    def send_packed_command(self, command, check_health=True):
+        with phase('redis', calls=0):
+            return super().send_packed_command(command, check_health)
+
+    def read_response(self, *args, **kwargs):
+        with phase('redis'):
+            return super().read_response(*args, **kwargs)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that adds JSON encoding to the serialize phase."""
+
+    def dumps(self, obj, **kwargs):
+        with phase('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+def redis_connection_class(app):
+    """Connection class for the Redis pool: timed if request timing is enabled."""
+    return TimedRedisConnection if app.config.get('REQUEST_TIMING_ENABLED', True) else redis.Connection
+
+
+class _FieldList:
+    """key=value rendering of access log fields, built only if the record is emitted."""
+
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(f"{key}={value}" for key, value in self.fields.items())
+
+
+def after_response_sent(response, callback):
+    """
+    Call callback() once the body of `response` has been sent (or the client went
+    away), with the context variables of the current request: request id,
+    timings. For work that must cover the body of a streamed response.
+    The request context has been popped (and torn down) by then: read what
+    callback needs from `request` beforehand.
+    """
+    context = contextvars.copy_context()
+    response.call_on_close(lambda: context.run(callback))
+
+
+def _log_access(timings, method, path, status, total_ms):
+    fields = access_fields(timings, total_ms)
+    access_logger.info(
+        "%s %s %s %s", method, path, status, _FieldList(fields),
+        extra={'event': 'access', 'timing': fields, 'method': method, 'path': path, 'status': status}
+    )
+
+
+def _start_request():
+    _current.set(RequestTimings())
+
+
+def _finish_request(response):
+    timings = _current.get()
+    if timings is None:
+        return response
+    method, path, status = request.method, request.path, response.status_code
+    if response.is_streamed:
+        # The body is generated after this hook: log the request once it is sent
+        after_response_sent(response, lambda: _log_access(timings, method, path, status, timings.total_ms()))
+        return response
+    total_ms = timings.total_ms()
+    if current_app.config.get('SERVER_TIMING_HEADER', False):
+        response.headers['Server-Timing'] = server_timing_header(timings, total_ms)
+    _log_access(timings, method, path, status, total_ms)
+    return response
+
+
+def _end_request(error=None):
+    _current.set(None)
+
+
+def init_timing(app):
+    """Install the timing hooks (first before_request hook, so it also covers rate limiting)"""
+    if not app.config.get('REQUEST_TIMING_ENABLED', True):
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
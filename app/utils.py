@@ -1,11 +1,10 @@
 import logging
 import secrets
 from datetime import datetime, timedelta
-from web3 import Web3
-from eth_account.messages import encode_defunct
 import os, sys
 import redis
 import json
+from app import signature_service, challenges, challenge_store, timing, metrics
 
 def get_source_dir():
     return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,14 +22,46 @@ redis_client = None
 def init_redis(app):
     """Initialize Redis client with app configuration"""
     global redis_client
-    redis_client = redis.Redis(
+    # Blocking pool: when all connections are busy, wait up to REDIS_POOL_TIMEOUT
+    # for a free one instead of opening unbounded new connections
+    pool = redis.BlockingConnectionPool(
         host=app.config['REDIS_HOST'],
         port=app.config['REDIS_PORT'],
         password=app.config['REDIS_PASSWORD'],
-        decode_responses=True  # Automatically decode strings
+        max_connections=app.config.get('REDIS_MAX_CONNECTIONS', 10),
+        timeout=app.config.get('REDIS_POOL_TIMEOUT', 2),
+        socket_timeout=app.config.get('REDIS_SOCKET_TIMEOUT', 2),
+        socket_connect_timeout=app.config.get('REDIS_SOCKET_CONNECT_TIMEOUT', 2),
+        health_check_interval=app.config.get('REDIS_HEALTH_CHECK_INTERVAL', 30),
+        decode_responses=True,  # Automatically decode strings
+        connection_class=timing.redis_connection_class(app)  # Round trips in the request timing
     )
+    redis_client = redis.Redis(connection_pool=pool)
     logger.debug("Redis client initialized")
 
+def reset_redis_pool():
+    """
+    Forget the pooled Redis connections inherited from a parent process.
+    Called in a freshly forked worker: the sockets still belong to the parent,
+    so they are dropped without being closed and the child opens its own.
+    """
+    if redis_client is not None:
+        redis_client.connection_pool.reset()
+
+def store_challenge(normalized_address, challenge_data):
+    """
+    Store a challenge for an address in the configured challenge store, with its TTL.
+    """
+    challenge_store.store.put(normalized_address, challenge_data, challenges.ttl)
+
+def consume_challenge(normalized_address):
+    """
+    Atomically fetch and delete the challenge for an address.
+    Returns:
+        dict: The stored challenge fields, empty if there is no challenge.
+    """
+    return challenge_store.store.consume(normalized_address)
+
 def get_redis_pwd():
     return private_data.REDIS_PWD
 
@@ -43,19 +74,30 @@ def get_redis_port():
 def get_env():
     return os.getenv('FLASK_ENV', 'default')
 
-def generate_challenge_message(address):
+def new_challenge(address):
     """
-    Generate a unique challenge message for the given address
-    This simulates what the server sends to the client
+    Validate `address` and create a challenge for it, without storing anything.
+    Returns:
+        tuple: (normalized_address, message, challenge_data) where challenge_data
+               is the dict to keep in the challenge store, or None in 'hmac' mode.
+    Raises:
+        ValueError: invalid address.
     """
-    logger.debug(f"Generating challenge for address {address}")
+    # Imported here: the eth stack is only needed on the auth paths
+    from eth_utils import is_address, to_checksum_address
+    logger.debug("Generating challenge for address %s", address)
     # Validate address format
-    if not Web3.is_address(address):
-        logger.error(f"Invalid Ethereum address format: {address}")
+    if not is_address(address):
+        logger.error("Invalid Ethereum address format: %s", address)
         raise ValueError("Invalid Ethereum address format")
     
     # Normalize address
-    normalized_address = Web3.to_checksum_address(address)
+    normalized_address = to_checksum_address(address)
+    metrics.inc('auth_challenges_issued')
+
+    # Stateless mode: everything needed for verification is in the signed message
+    if challenges.mode == 'hmac':
+        return normalized_address, challenges.challenger.issue(normalized_address), None
     
     # Generate unique challenge
     challenge = secrets.token_hex(16)
@@ -63,72 +105,144 @@ def generate_challenge_message(address):
     
     # Create message for signing
     message = f"Sign this message to authenticate: {challenge} at {timestamp}"
-    
-    # Store challenge in Redis with 5-minute TTL
-    redis_key = f"w3tasq_challenge:{normalized_address}"
-    redis_client.hset(redis_key, mapping={
+    return normalized_address, message, {
         'challenge': challenge,
         'message': message,
         'expires_at': timestamp
-    })
-    redis_client.expire(redis_key, 300)  # 5 minutes TTL
-    logger.info(f"Challenge generated for address {normalized_address}")
+    }
+
+def generate_challenge_message(address):
+    """
+    Generate a unique challenge message for the given address
+    This simulates what the server sends to the client
+    """
+    normalized_address, message, challenge_data = new_challenge(address)
+    if challenge_data is not None:
+        # Store challenge for CHALLENGE_TTL seconds
+        store_challenge(normalized_address, challenge_data)
+    logger.info("Challenge generated for address %s", normalized_address, extra={'event': 'challenge_generated'})
     return message
 
 def get_test_w3addres():
     return private_data.TEST_ADDR1
 
-def verify_signature(address, signature):
+def check_stored_challenge(normalized_address, stored_challenge):
+    """
+    Check a challenge taken from the challenge store ('redis' challenge mode).
+    Returns:
+        tuple: (message to verify the signature against or None, error message or None)
+    """
+    if not stored_challenge:
+        logger.warning("No challenge found for address %s", normalized_address)
+        metrics.inc('auth_challenges_rejected')
+        return None, "No challenge found for this address"
+    
+    # Check if challenge has expired ('expires_at' holds the issue time)
+    expires_at = datetime.fromisoformat(stored_challenge['expires_at'])
+    if datetime.utcnow() > expires_at + timedelta(seconds=challenges.ttl):
+        logger.warning("Challenge expired for address %s", normalized_address)
+        metrics.inc('auth_challenges_rejected')
+        return None, "Challenge has expired"
+    return stored_challenge['message'], None
+
+def reject_challenge(normalized_address, error):
+    """Log and count a rejected 'hmac' mode challenge; returns the error message."""
+    logger.warning("Challenge rejected for address %s: %s", normalized_address, error)
+    metrics.inc('auth_challenges_rejected')
+    return error
+
+def check_challenge(normalized_address, message, stored_challenge=None):
+    """
+    Check the challenge a signature answers, before the signer is recovered.
+    In 'hmac' mode that is the returned `message`; in 'redis' mode the caller
+    consumes the stored challenge and passes it as `stored_challenge`.
+    Returns:
+        tuple: (message to verify the signature against or None,
+                'hmac' nonce to claim once the signature is verified or None,
+                error message or None)
+    """
+    if challenges.mode == 'hmac':
+        # Check HMAC, address and expiry; the nonce is consumed only
+        # once the signature is verified
+        nonce, error = challenges.challenger.check(normalized_address, message)
+        if error:
+            return None, None, reject_challenge(normalized_address, error)
+        return message, nonce, None
+    signed_message, error = check_stored_challenge(normalized_address, stored_challenge)
+    return signed_message, None, error
+
+def check_recovered_address(normalized_address, recovered_address):
+    """
+    Compare the address recovered from a signature with the claimed one.
+    Returns:
+        tuple: (is_valid: bool, message)
+    """
+    from eth_utils import to_checksum_address
+    is_valid = to_checksum_address(recovered_address) == normalized_address
+    
+    if is_valid:
+        logger.info("Signature verified for address %s", normalized_address, extra={'event': 'signature_verified'})
+        metrics.inc('auth_signatures_valid')
+    else:
+        logger.warning("Signature does not match address %s", normalized_address)
+        metrics.inc('auth_signatures_invalid')
+    
+    return is_valid, "Signature verified successfully" if is_valid else "Signature does not match the address"
+
+def check_nonce_claim(normalized_address, claimed, result):
+    """
+    Outcome of a verified 'hmac' mode signature once its nonce was claimed
+    (claimed: False if another request used the challenge first).
+    Returns:
+        tuple: (is_valid: bool, message)
+    """
+    if not claimed:
+        return False, reject_challenge(normalized_address, "Challenge has already been used")
+    return True, result
+
+# Verification errors that are not the client's fault: callers answer with a retryable error
+RETRYABLE_VERIFICATION_ERRORS = (signature_service.VerificationUnavailableError,
+                                 challenge_store.ChallengeStoreUnavailableError)
+
+def verification_error(address, error):
+    """Log an unexpected verification error; returns the (is_valid, message) answer for it."""
+    logger.error("Verification error for address %s: %s", address, error)
+    return False, f"Verification error: {str(error)}"
+
+def verify_signature(address, signature, message=None):
     """
     Verify that the signature corresponds to the address for the given message
+    In 'hmac' challenge mode the client must send back the challenge `message`;
+    in 'redis' mode the message is taken from the stored challenge.
     """
-    logger.debug(f"Verifying signature for address {address}")
+    logger.debug("Verifying signature for address %s", address)
+    from eth_utils import to_checksum_address
     try:
         # Normalize address
-        normalized_address = Web3.to_checksum_address(address)
+        normalized_address = to_checksum_address(address)
         
-        # Check if challenge exists in Redis
-        redis_key = f"w3tasq_challenge:{normalized_address}"
-        stored_challenge = redis_client.hgetall(redis_key)
+        stored_challenge = None
+        if challenges.mode != 'hmac':
+            # Fetch and consume the challenge in one atomic step;
+            # a challenge can be used for a single verification attempt only
+            stored_challenge = consume_challenge(normalized_address)
+        signed_message, nonce, error = check_challenge(normalized_address, message, stored_challenge)
+        if error:
+            return False, error
         
-        if not stored_challenge:
-            logger.warning(f"No challenge found for address {normalized_address}")
-            return False, "No challenge found for this address"
-        
-        # Check if challenge has expired
-        expires_at = datetime.fromisoformat(stored_challenge['expires_at'])
-        if datetime.utcnow() > expires_at + timedelta(minutes=5):
-            logger.warning(f"Challenge expired for address {normalized_address}")
-            redis_client.delete(redis_key)
-            return False, "Challenge has expired"
-        
-        # Create Web3 instance
-        w3 = Web3()
-        
-        # Encode message properly for Ethereum signing
-        message_hash = encode_defunct(text=stored_challenge['message'])
-        
-        # Recover address from signature
-        recovered_address = w3.eth.account.recover_message(
-            message_hash, 
-            signature=signature
-        )
+        # Recover address from signature (inline or in the verification pool)
+        recovered_address = signature_service.recover(signed_message, signature)
         
         # Verify addresses match
-        is_valid = Web3.to_checksum_address(recovered_address) == normalized_address
-        
-        # If valid, remove used challenge
-        if is_valid:
-            logger.info(f"Signature verified for address {normalized_address}")
-            redis_client.delete(redis_key)
-        else:
-            logger.warning(f"Signature does not match address {normalized_address}")
-        
-        return is_valid, "Signature verified successfully" if is_valid else "Signature does not match the address"
+        is_valid, result = check_recovered_address(normalized_address, recovered_address)
+        if is_valid and nonce is not None:
+            return check_nonce_claim(normalized_address, challenges.challenger.consume(nonce), result)
+        return is_valid, result
     
+    except RETRYABLE_VERIFICATION_ERRORS:
+        raise
     except Exception as e:
-        logger.error(f"Verification error for address {address}: {str(e)}")
-        return False, f"Verification error: {str(e)}"
+        return verification_error(address, e)
 
 def sign_message_with_private_key(message):
     """
@@ -139,7 +253,8 @@ def sign_message_with_private_key(message):
     # In real browser, client would use their wallet to sign
     # Here we simulate with a test private key
     logger.debug("Signing message with private key")
-    w3 = Web3()
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
     # This private key is for testing only
     private_key = private_data.PRIVATE_KEY
     
@@ -147,7 +262,7 @@ def sign_message_with_private_key(message):
     message_hash = encode_defunct(text=message)
     
     # Sign the encoded message
-    signed_message = w3.eth.account.sign_message(
+    signed_message = Account.sign_message(
         message_hash,
         private_key=private_key
     )
@@ -170,6 +285,20 @@ def get_secret_key():
     logger.warning("Using temporary secret key for development")
     return secrets.token_urlsafe(32)
 
+def get_metrics_token():
+    """
+    Bearer token for /metrics from private_data (METRICS_TOKEN), or None:
+    then /metrics only answers requests from localhost
+    """
+    return getattr(private_data, 'METRICS_TOKEN', None) or None
+
+def get_profile_token():
+    """
+    Value of the X-Profile header that profiles a request, from private_data
+    (PROFILE_TOKEN), or None: then only PROFILE_SAMPLE_RATE triggers profiles
+    """
+    return getattr(private_data, 'PROFILE_TOKEN', None) or None
+
 def get_database_path():
     """
     Get database file path outside of repository
@@ -177,7 +306,7 @@ def get_database_path():
     """
     logger.debug("Retrieving database path")
     db_path = join_path(os.path.dirname(get_source_dir()), 'db', 'tasks_notes.db')
-    logger.info(f"Database path: {db_path}")
+    logger.info("Database path: %s", db_path)
     return db_path
 
 def join_path(*args):
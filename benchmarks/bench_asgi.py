@@ -0,0 +1,170 @@
+# benchmarks/bench_asgi.py
+"""
+Benchmark: sync (gunicorn gthread) vs ASGI serving of /api/auth/challenge.
+
+The challenge endpoint is dominated by the challenge store round trip. Both
+modes get a store with the same simulated Redis latency:
+  - sync: WSGI app called from a fixed pool of threads, like gunicorn with
+    `workers * threads` request threads (time.sleep in the store);
+  - asgi: ASGIApp with an async store (asyncio.sleep), all clients
+    concurrently on one event loop.
+Prints throughput and latency percentiles for each mode.
+
+Usage:
+    python -m benchmarks.bench_asgi --requests 2000 --clients 200 --latency-ms 5 --threads 12
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import utils, challenge_store, rate_limit
+from app.app import create_app
+from app.asgi import ASGIApp
+from app.challenge_store import ChallengeStore, MemoryChallengeStore
+
+
+class SlowStore(ChallengeStore):
+    """Memory store with a blocking delay, standing in for a sync Redis call."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.store = MemoryChallengeStore(max_size=1000000)
+
+    def put(self, address, challenge_data, ttl):
+        time.sleep(self.latency)
+        self.store.put(address, challenge_data, ttl)
+
+    def consume(self, address):
+        time.sleep(self.latency)
+        return self.store.consume(address)
+
+    def claim(self, key, ttl):
+        time.sleep(self.latency)
+        return self.store.claim(key, ttl)
+
+
+class AsyncSlowStore:
+    """Memory store with a non-blocking delay, standing in for redis.asyncio."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.store = MemoryChallengeStore(max_size=1000000)
+
+    async def put(self, address, challenge_data, ttl):
+        await asyncio.sleep(self.latency)
+        self.store.put(address, challenge_data, ttl)
+
+    async def consume(self, address):
+        await asyncio.sleep(self.latency)
+        return self.store.consume(address)
+
+    async def claim(self, key, ttl):
+        await asyncio.sleep(self.latency)
+        return self.store.claim(key, ttl)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_sync(flask_app, requests, clients, threads, body):
+    """
+    Serve `requests` challenges to `clients` concurrent callers with only
+    `threads` request threads, return (seconds, latencies).
+    Latency is measured from the client's point of view, including the wait
+    for a free request thread.
+    """
+    latencies = []
+    request_threads = threading.BoundedSemaphore(threads)
+
+    def one(_):
+        start = time.perf_counter()
+        with request_threads:
+            with flask_app.test_client() as client:
+                response = client.post('/api/auth/challenge', data=body, content_type='application/json')
+        assert response.status_code == 200, response.status_code
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(one, range(requests)))
+    return time.perf_counter() - start, latencies
+
+
+def run_asgi(asgi_app, requests, clients, body):
+    """Serve `requests` challenges with `clients` concurrent ASGI calls, return (seconds, latencies)."""
+    latencies = []
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': '/api/auth/challenge', 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')], 'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80), 'scheme': 'http', 'http_version': '1.1', 'root_path': '',
+    }
+
+    async def one():
+        sent = []
+        received = [False]
+
+        async def receive():
+            if received[0]:
+                return {'type': 'http.disconnect'}
+            received[0] = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        start = time.perf_counter()
+        await asgi_app(scope, receive, send)
+        assert sent[0]['status'] == 200, sent[0]['status']
+        latencies.append(time.perf_counter() - start)
+
+    async def main():
+        semaphore = asyncio.Semaphore(clients)
+
+        async def limited():
+            async with semaphore:
+                await one()
+
+        await asyncio.gather(*(limited() for _ in range(requests)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='challenge requests per mode')
+    parser.add_argument('--clients', type=int, default=200, help='concurrent clients')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated Redis round trip')
+    parser.add_argument('--threads', type=int, default=12, help='sync request threads (gunicorn workers * threads)')
+    args = parser.parse_args()
+
+    flask_app = create_app('testing')
+    rate_limit.limiter = None  # Measure serving, not throttling
+    body = json.dumps({'address': utils.get_test_w3addres()}).encode()
+    latency = args.latency_ms / 1000
+
+    challenge_store.store = SlowStore(latency)
+    sync_elapsed, sync_latencies = run_sync(flask_app, args.requests, args.clients, args.threads, body)
+
+    asgi_app = ASGIApp(flask_app, async_store=AsyncSlowStore(latency))
+    asgi_elapsed, asgi_latencies = run_asgi(asgi_app, args.requests, args.clients, body)
+    asgi_app.executor.shutdown()
+
+    print(f"store latency {args.latency_ms} ms, {args.requests} requests, {args.clients} clients")
+    print(f"{'mode':<24} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, elapsed, latencies in (
+        (f"sync ({args.threads} threads)", sync_elapsed, sync_latencies),
+        ('asgi', asgi_elapsed, asgi_latencies),
+    ):
+        print(f"{name:<24} {len(latencies) / elapsed:>9.1f} {percentile(latencies, 0.50) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.95) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+# benchmarks/bench_db.py
+"""
+Benchmark: db_utils functions and API endpoints on seeded on-disk databases.
+
+For each dataset size (1k, 100k and 1M tasks by default) a SQLite database
+is seeded with app/seeding.py (one user per 100 tasks, skewed: user 1 owns
+the most tasks, most users few) and kept in benchmarks/data/, so later runs
+reuse it. Every run works on a fresh copy: writes made by the benchmarks
+never leak into the next run.
+
+Measured, each `--repeat` times (median, p95, min and mean in ms):
+  - db_utils: get_user_tasks_cursor (first page and a page 90% deep into the
+    heavy user's tasks, first page of a median user), create_task,
+    update_task_status_internal, get_or_create_user (existing and new user);
+  - endpoints through the Flask test client, logged in as the heavy user:
+    GET /api/tasks (first and deep page), POST /api/tasks, PATCH /api/tasks/<id>.
+
+Results are written as JSON (with the git commit) to benchmarks/results/;
+`--compare` prints the change against an earlier results file and exits
+with status 1 when a median got slower by more than `--threshold`.
+
+Usage:
+    python -m benchmarks.bench_db --sizes 1k,100k,1m --repeat 50
+    python -m benchmarks.bench_db --sizes 100k --compare benchmarks/results/bench_db-<commit>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import text
+from app import db_utils, seeding
+from app.app import create_app
+from app.config import TestingConfig, config_map
+from app.models import db, User, Task
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(SOURCE_DIR, 'benchmarks', 'data')
+RESULTS_DIR = os.path.join(SOURCE_DIR, 'benchmarks', 'results')
+
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+TASKS_PER_USER = 100
+HEAVY_USER_ID = 1  # Seeded users are ranked by task count: user 1 has the most
+DEEP_PAGE_FRACTION = 0.9  # Position of the deep-page cursor in the heavy user's active tasks
+
+
+def bench_config(db_path):
+    """Testing configuration on the given database file, with quiet logs."""
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+        LOG_TO_FILE = False
+        LOG_LEVEL = 'ERROR'
+        SQL_SLOW_QUERY_MS = None
+        PROFILE_TOKEN = None
+    return BenchConfig
+
+
+def make_app(db_path):
+    config_map['bench_db'] = bench_config(db_path)
+    return create_app(config_name='bench_db')
+
+
+# --- Datasets ---
+def seed(db_path, tasks, seed_value):
+    """Create a database with `tasks` tasks and one user per TASKS_PER_USER tasks (app/seeding.py)."""
+    app = make_app(db_path)
+    with app.app_context():
+        seeding.seed_database(dataset_users(tasks), tasks, seed=seed_value)
+        db.engine.dispose()
+
+
+def dataset_users(tasks):
+    return max(10, tasks // TASKS_PER_USER)
+
+
+def dataset(name, tasks, data_dir, seed_value):
+    """Path of the seeded database (seeded now if missing) and the seconds spent seeding, or None."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"tasks-{name}-seed{seed_value}.db")
+    if os.path.exists(path):
+        return path, None
+    start = time.perf_counter()
+    partial = path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+    seed(partial, tasks, seed_value)
+    os.replace(partial, path)
+    return path, time.perf_counter() - start
+
+
+# --- Measurements ---
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        'median_ms': round(statistics.median(ordered) * 1000, 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        'min_ms': round(ordered[0] * 1000, 4),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'runs': len(ordered),
+    }
+
+
+def measure(call, repeat, setup=None):
+    """
+    Time `call(state)` `repeat` times; `setup(i)` (untimed) returns its state.
+    The session is cleared after every call, like at the end of a request.
+    """
+    durations = []
+    for i in range(repeat):
+        state = setup(i) if setup else None
+        start = time.perf_counter()
+        call(state)
+        durations.append(time.perf_counter() - start)
+        db.session.remove()
+    return summarize(durations)
+
+
+def deep_cursor(user_id):
+    """Id of the task DEEP_PAGE_FRACTION into the user's active tasks, in page order."""
+    active = db.session.execute(
+        text("SELECT count(*) FROM tasks WHERE user_id = :user_id AND status = 0"), {'user_id': user_id}
+    ).scalar()
+    return db.session.execute(
+        text("SELECT id FROM tasks WHERE user_id = :user_id AND status = 0 "
+             "ORDER BY priority ASC, id DESC LIMIT 1 OFFSET :offset"),
+        {'user_id': user_id, 'offset': int(active * DEEP_PAGE_FRACTION)}
+    ).scalar()
+
+
+def run_dataset(db_path, tasks, repeat, seed_value):
+    """All measurements on a copy of the database at db_path, {benchmark name: summary}."""
+    rng = random.Random(seed_value)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        work_path = os.path.join(directory, 'bench.db')
+        shutil.copyfile(db_path, work_path)
+        app = make_app(work_path)
+        limit = app.config['TASKS_PER_PAGE']
+        median_user_id = HEAVY_USER_ID + dataset_users(tasks) // 2
+
+        with app.app_context():
+            heavy = db.session.get(User, HEAVY_USER_ID)
+            heavy_address = heavy.wallet_address
+            addresses = [row[0] for row in db.session.execute(text("SELECT wallet_address FROM users"))]
+            cursor = deep_cursor(HEAVY_USER_ID)
+            task_ids = [row[0] for row in db.session.execute(
+                text("SELECT id FROM tasks WHERE user_id = :user_id AND status = 0 ORDER BY id DESC LIMIT :n"),
+                {'user_id': HEAVY_USER_ID, 'n': repeat}
+            )]
+            db.session.remove()
+
+            results['db.get_user_tasks_cursor.first_page'] = measure(
+                lambda _: db_utils.get_user_tasks_cursor(HEAVY_USER_ID, None, limit), repeat)
+            results['db.get_user_tasks_cursor.deep_page'] = measure(
+                lambda _: db_utils.get_user_tasks_cursor(HEAVY_USER_ID, cursor, limit), repeat)
+            results['db.get_user_tasks_cursor.median_user'] = measure(
+                lambda _: db_utils.get_user_tasks_cursor(median_user_id, None, limit), repeat)
+            results['db.create_task'] = measure(
+                lambda _: db_utils.create_task(HEAVY_USER_ID, "Benchmark task", "created by bench_db", 2), repeat)
+            results['db.update_task_status_internal'] = measure(
+                lambda task: db_utils.update_task_status_internal(task, 1), repeat,
+                setup=lambda i: db.session.get(Task, task_ids[i % len(task_ids)]))
+            results['db.get_or_create_user.existing'] = measure(
+                lambda _: db_utils.get_or_create_user(rng.choice(addresses)), repeat)
+            results['db.get_or_create_user.new'] = measure(
+                lambda _: db_utils.get_or_create_user(f"0x{rng.getrandbits(160):040x}"), repeat)
+
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = HEAVY_USER_ID
+                sess['user_address'] = heavy_address
+                sess['authenticated'] = True
+
+            def endpoint(method, url, expected, **kwargs):
+                def call(_):
+                    response = client.open(url, method=method, **kwargs)
+                    assert response.status_code == expected, (url, response.status_code)
+                return call
+
+            with app.app_context():
+                results['api.get_tasks.first_page'] = measure(endpoint('GET', '/api/tasks', 200), repeat)
+                results['api.get_tasks.deep_page'] = measure(
+                    endpoint('GET', f'/api/tasks?cursor={cursor}', 200), repeat)
+                results['api.create_task'] = measure(
+                    endpoint('POST', '/api/tasks', 201, json={'title': "Benchmark task", 'priority': 2}), repeat)
+                results['api.update_task_status'] = measure(
+                    lambda task_id: endpoint('PATCH', f'/api/tasks/{task_id}', 200, json={'status': 0})(None),
+                    repeat, setup=lambda i: task_ids[i % len(task_ids)])
+        with app.app_context():
+            db.engine.dispose()
+    return results
+
+
+# --- Results ---
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=SOURCE_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print median changes against a baseline results file; returns True if any regressed."""
+    regressed = False
+    print(f"\nagainst {baseline.get('commit') or 'baseline'} (regression: median slower by > {threshold:.0%})")
+    for name, dataset_results in current['datasets'].items():
+        old = baseline.get('datasets', {}).get(name)
+        if not old:
+            continue
+        for bench, summary in dataset_results['results'].items():
+            before = old['results'].get(bench)
+            if not before:
+                continue
+            change = summary['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0.0
+            flag = 'REGRESSION' if change > threshold else ''
+            regressed = regressed or bool(flag)
+            print(f"{name:<5} {bench:<42} {before['median_ms']:>10.3f} -> {summary['median_ms']:>10.3f} ms"
+                  f" {change:>+8.1%} {flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1k,100k,1m', help=f"comma-separated dataset sizes ({', '.join(SIZES)})")
+    parser.add_argument('--repeat', type=int, default=50, help='runs per benchmark')
+    parser.add_argument('--seed', type=int, default=1, help='random seed of the datasets')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='where seeded databases are kept')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/bench_db-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='median slowdown reported as regression')
+    args = parser.parse_args()
+
+    names = [name.strip().lower() for name in args.sizes.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    report = dict(environment(), benchmark='bench_db', repeat=args.repeat, seed=args.seed, datasets={})
+    for name in names:
+        tasks = SIZES[name]
+        path, seed_seconds = dataset(name, tasks, args.data_dir, args.seed)
+        if seed_seconds is not None:
+            print(f"seeded {name} ({tasks} tasks) in {seed_seconds:.1f} s: {path}")
+        results = run_dataset(path, tasks, args.repeat, args.seed)
+        report['datasets'][name] = {
+            'tasks': tasks, 'users': dataset_users(tasks), 'seed_seconds': seed_seconds,
+            'results': results,
+        }
+        print(f"\n{name}: {tasks} tasks")
+        print(f"{'benchmark':<42} {'median ms':>10} {'p95 ms':>10} {'min ms':>10}")
+        for bench, summary in results.items():
+            print(f"{bench:<42} {summary['median_ms']:>10.3f} {summary['p95_ms']:>10.3f} {summary['min_ms']:>10.3f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_db-{(report['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(report, baseline, args.threshold) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_logging.py
+"""
+Benchmark: logging cost per request, as paid by the request thread.
+
+Replays the log calls of one GET /api/tasks (two suppressed debug calls, the
+"Retrieved N tasks" info line and the access log line) against a rotating
+log file, from several threads at once:
+  - before: RotatingFileHandler on the logger, messages built with f-strings;
+  - after:  QueueHandler + QueueListener (app/logging_setup.py), lazy
+            %-style arguments.
+Prints the mean and p99 time spent in logging per request, and for the queue
+setup how long the listener needed afterwards to write everything out.
+
+Usage:
+    python -m benchmarks.bench_logging --requests 20000 --threads 8
+"""
+
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from app.template_filters import shorten_wallet_address
+
+ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+FIELDS = {'total_ms': 3.21, 'db_ms': 1.02, 'db_calls': 1, 'redis_ms': 0.0, 'redis_calls': 0,
+          'signature_ms': 0.0, 'signature_calls': 0, 'serialize_ms': 0.41, 'serialize_calls': 2}
+
+
+class FieldList:
+    """Renders key=value pairs only when the record is formatted (as app/timing.py does)."""
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(f"{key}={value}" for key, value in self.fields.items())
+
+
+def request_eager(logger, access_logger, tasks):
+    logger.debug("Processing task retrieval")
+    logger.debug(f"Cursor {None}, limit {12} for user {shorten_wallet_address(ADDRESS)}")
+    logger.info(f"Retrieved {len(tasks)} tasks for user {shorten_wallet_address(ADDRESS)}")
+    access_logger.info(f"GET /api/tasks 200 " + ' '.join(f"{key}={value}" for key, value in FIELDS.items()))
+
+
+def request_lazy(logger, access_logger, tasks):
+    logger.debug("Processing task retrieval")
+    logger.debug("Cursor %s, limit %s for user %s", None, 12, ADDRESS)
+    logger.info("Retrieved %s tasks for user %s", len(tasks), shorten_wallet_address(ADDRESS))
+    access_logger.info("%s %s %s %s", 'GET', '/api/tasks', 200, FieldList(FIELDS))
+
+
+def make_file_handler(path):
+    handler = RotatingFileHandler(path, maxBytes=1024 * 1024, backupCount=3)
+    handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+    return handler
+
+
+def run(name, log_request, handler, requests, threads):
+    """Log `requests` requests from `threads` threads, return per-request seconds."""
+    root = logging.getLogger(f'bench_{name}')
+    root.handlers.clear()
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    root.propagate = False
+    logger, access_logger = root.getChild('app'), root.getChild('access')
+    tasks = list(range(12))
+    per_thread = requests // threads
+    durations = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            log_request(logger, access_logger, tasks)
+            local.append(time.perf_counter() - start)
+        with lock:
+            durations.extend(local)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return durations
+
+
+def summary(durations):
+    ordered = sorted(durations)
+    mean = sum(ordered) / len(ordered)
+    return mean * 1e6, ordered[int(len(ordered) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000, help='simulated requests per setup')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent request threads')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        before_handler = make_file_handler(os.path.join(directory, 'before.log'))
+        before = run('before', request_eager, before_handler, args.requests, args.threads)
+        before_handler.close()
+
+        after_handler = make_file_handler(os.path.join(directory, 'after.log'))
+        listener = QueueListener(queue.SimpleQueue(), after_handler, respect_handler_level=True)
+        listener.start()
+        after = run('after', request_lazy, QueueHandler(listener.queue), args.requests, args.threads)
+        drain_start = time.perf_counter()
+        listener.stop()
+        drain = time.perf_counter() - drain_start
+        after_handler.close()
+
+    print(f"{args.requests} requests, {args.threads} threads, 4 log calls per request (2 suppressed)")
+    print(f"{'setup':<32} {'mean us':>9} {'p99 us':>9}")
+    for name, durations in (('before: file handler, f-strings', before), ('after: queue, lazy args', after)):
+        mean, p99 = summary(durations)
+        print(f"{name:<32} {mean:>9.1f} {p99:>9.1f}")
+    print(f"listener drained the remaining queue in {drain * 1000:.0f} ms after the last request")
+
+
+if __name__ == '__main__':
+    main()
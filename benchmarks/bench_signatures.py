@@ -0,0 +1,85 @@
+# benchmarks/bench_signatures.py
+"""
+Benchmark: signature verifications per second, per core.
+
+Signs N messages with fresh accounts, then recovers them through the
+SignatureVerifier in every mode and prints throughput and latency.
+
+Usage:
+    python -m benchmarks.bench_signatures --count 500 --workers 2
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from app.signature_service import SignatureVerifier
+
+
+def make_samples(count):
+    """Return a list of (message, signature, address) signed by fresh accounts."""
+    samples = []
+    for i in range(count):
+        account = Account.create()
+        message = f"Sign this message to authenticate: {i:032x} at 2025-01-01T00:00:00"
+        signed = Account.sign_message(encode_defunct(text=message), private_key=account.key)
+        samples.append((message, signed.signature.hex(), account.address))
+    return samples
+
+
+def run_mode(mode, samples, workers, concurrency):
+    """Recover every sample through a verifier in `mode`, return (seconds, latencies)."""
+    verifier = SignatureVerifier(mode=mode, workers=workers, max_queue=concurrency, timeout=30)
+    latencies = []
+
+    def verify(sample):
+        message, signature, address = sample
+        start = time.perf_counter()
+        assert verifier.recover(message, signature) == address
+        latencies.append(time.perf_counter() - start)
+
+    try:
+        # Warm up: start pool workers and import caches outside the measurement
+        verify(samples[0])
+        latencies.clear()
+
+        start = time.perf_counter()
+        if mode == 'inline':
+            for sample in samples:
+                verify(sample)
+        else:
+            # Callers emulate concurrent request threads submitting to the pool
+            with ThreadPoolExecutor(max_workers=concurrency) as callers:
+                list(callers.map(verify, samples))
+        elapsed = time.perf_counter() - start
+    finally:
+        verifier.shutdown()
+    return elapsed, latencies
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=300, help='signatures to verify per mode')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='pool workers')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent callers for pool modes')
+    args = parser.parse_args()
+
+    samples = make_samples(args.count)
+    print(f"{'mode':<8} {'workers':>7} {'verif/s':>9} {'per core':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in ('inline', 'thread', 'process'):
+        elapsed, latencies = run_mode(mode, samples, args.workers, args.concurrency)
+        cores = 1 if mode == 'inline' else min(args.workers, os.cpu_count() or 1)
+        rate = len(samples) / elapsed
+        print(f"{mode:<8} {1 if mode == 'inline' else args.workers:>7} {rate:>9.1f} {rate / cores:>9.1f} "
+              f"{percentile(latencies, 0.50) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
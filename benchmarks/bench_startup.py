@@ -0,0 +1,96 @@
+# benchmarks/bench_startup.py
+"""
+Benchmark: import time and cold start of a w3tasq worker.
+
+Each measurement runs in a fresh interpreter, the way a gunicorn worker or
+a test run starts:
+  - import: `import app.app`
+  - cold start: import + create_app() + first request to /login
+
+The budgets below are enforced by tests/test_startup.py.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Seconds, generous enough for slow CI machines but far below the
+# cost of importing the web3 stack at startup
+IMPORT_BUDGET_SECONDS = 1.0
+COLD_START_BUDGET_SECONDS = 1.5
+
+# Modules that must only be imported on the auth paths
+HEAVY_MODULES = ('web3', 'eth_account')
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import app.app
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'heavy_loaded': [m for m in %(heavy)r if m in sys.modules]}))
+"""
+
+_COLD_START_CODE = """
+import json, sys, time
+start = time.perf_counter()
+from app.app import create_app
+app = create_app(%(config)r)
+with app.test_client() as client:
+    status = client.get('/login').status_code
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'status': status, 'heavy_loaded': [m for m in %(heavy)r if m in sys.modules]}))
+"""
+
+
+def _run(code):
+    """Run `code` in a fresh interpreter from the source dir, return its JSON output."""
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=SOURCE_DIR, capture_output=True, text=True, check=True
+    )
+    # The measurement is the last line; anything before it is log output
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_import():
+    """Seconds to `import app.app` in a fresh interpreter, plus heavy modules loaded."""
+    return _run(_IMPORT_CODE % {'heavy': HEAVY_MODULES})
+
+
+def measure_cold_start(config_name='testing'):
+    """Seconds from interpreter start of work to the first served request."""
+    return _run(_COLD_START_CODE % {'config': config_name, 'heavy': HEAVY_MODULES})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per measurement')
+    parser.add_argument('--config', default='testing', help='config name for the cold start')
+    args = parser.parse_args()
+
+    over_budget = False
+    for name, measure, budget in (
+        ('import', measure_import, IMPORT_BUDGET_SECONDS),
+        ('cold start', lambda: measure_cold_start(args.config), COLD_START_BUDGET_SECONDS),
+    ):
+        results = [measure() for _ in range(args.runs)]
+        median = statistics.median(result['seconds'] for result in results)
+        heavy = sorted({module for result in results for module in result['heavy_loaded']})
+        status = 'ok' if median <= budget else 'OVER BUDGET'
+        over_budget = over_budget or median > budget
+        print(f"{name:<11} median {median * 1000:8.1f} ms  budget {budget * 1000:8.1f} ms  {status}"
+              f"  heavy modules: {', '.join(heavy) or 'none'}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
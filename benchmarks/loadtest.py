@@ -0,0 +1,246 @@
+# benchmarks/loadtest.py
+"""
+Load test: many wallets running the whole login -> create -> list -> complete flow.
+
+Every simulated wallet is a fresh eth_account key and an HTTP session with
+its own cookies. Per iteration it:
+  - login:    POST /api/auth/challenge, signs the message the way
+              utils.sign_message_with_private_key does, POST /api/auth/verify;
+  - create:   POST /api/tasks (`--tasks` times);
+  - list:     GET /api/tasks;
+  - complete: PATCH /api/tasks/<id> with status 1 for every created task.
+All wallets run concurrently, each in its own thread.
+
+Target: by default the app is started in this process on a threaded
+werkzeug server (127.0.0.1, free port) with a fresh SQLite database file.
+Redis is replaced by an in-process stand-in: the in-memory challenge store,
+optionally with a simulated round trip (`--redis-latency-ms`), and no rate
+limits. `--redis real` uses the configured Redis server instead, and
+`--url` targets an app that is already running (e.g. gunicorn). The local
+server shares the interpreter (and the GIL) with the clients, so it shows
+relative changes; absolute throughput is measured against gunicorn.
+
+Reported per phase and endpoint: requests, errors (by status), p50, p95,
+p99 and max latency, plus overall throughput; `--output` also writes them
+as JSON.
+
+Usage:
+    python -m benchmarks.loadtest --wallets 50 --iterations 3 --tasks 5
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --wallets 100
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from werkzeug.serving import make_server
+from app import challenge_store
+from app.app import create_app
+from app.challenge_store import ChallengeStore
+from app.config import config_map
+from benchmarks.bench_db import bench_config
+
+PHASES = ('login', 'create', 'list', 'complete')
+
+
+class LatencyStore(ChallengeStore):
+    """Wraps the in-memory challenge store with a blocking delay per call, like a Redis round trip."""
+
+    def __init__(self, store, latency):
+        self.store = store
+        self.latency = latency
+
+    def put(self, address, challenge_data, ttl):
+        time.sleep(self.latency)
+        self.store.put(address, challenge_data, ttl)
+
+    def consume(self, address):
+        time.sleep(self.latency)
+        return self.store.consume(address)
+
+    def claim(self, key, ttl):
+        time.sleep(self.latency)
+        return self.store.claim(key, ttl)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Stats:
+    """Latencies and errors per (phase, endpoint), shared by the wallet threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.flows = []  # Seconds per completed wallet iteration
+
+    def record(self, phase, endpoint, seconds, error=None):
+        with self.lock:
+            self.latencies[(phase, endpoint)].append(seconds)
+            if error is not None:
+                self.errors[(phase, endpoint)][error] += 1
+
+    def summary(self, elapsed):
+        rows = []
+        for key in sorted(self.latencies, key=lambda key: (PHASES.index(key[0]), key[1])):
+            latencies = self.latencies[key]
+            rows.append({
+                'phase': key[0], 'endpoint': key[1], 'requests': len(latencies),
+                'errors': sum(self.errors[key].values()), 'error_kinds': dict(self.errors[key]),
+                'p50_ms': percentile(latencies, 0.50) * 1000, 'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000, 'max_ms': max(latencies) * 1000,
+            })
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            'seconds': elapsed, 'requests': total, 'requests_per_second': total / elapsed if elapsed else 0.0,
+            'errors': sum(row['errors'] for row in rows), 'endpoints': rows,
+            'flow_p50_ms': percentile(self.flows, 0.50) * 1000 if self.flows else None,
+            'flow_p99_ms': percentile(self.flows, 0.99) * 1000 if self.flows else None,
+        }
+
+
+class Wallet:
+    """One simulated user: an Ethereum key and an HTTP session."""
+
+    def __init__(self, base_url, stats, timeout):
+        self.account = Account.create()
+        self.address = self.account.address
+        self.base_url = base_url
+        self.stats = stats
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    def call(self, phase, method, path, endpoint, expected, **kwargs):
+        """Send one request and record it; returns the decoded JSON body or None on error."""
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            self.stats.record(phase, endpoint, time.perf_counter() - start, type(e).__name__)
+            return None
+        seconds = time.perf_counter() - start
+        if response.status_code != expected:
+            self.stats.record(phase, endpoint, seconds, str(response.status_code))
+            return None
+        self.stats.record(phase, endpoint, seconds)
+        return response.json()
+
+    def sign(self, message):
+        # As utils.sign_message_with_private_key, with this wallet's key
+        signed = Account.sign_message(encode_defunct(text=message), private_key=self.account.key)
+        return signed.signature.hex()
+
+    def login(self):
+        challenge = self.call('login', 'POST', '/api/auth/challenge', 'POST /api/auth/challenge', 200,
+                              json={'address': self.address})
+        if challenge is None:
+            return False
+        message = challenge['message']
+        verified = self.call('login', 'POST', '/api/auth/verify', 'POST /api/auth/verify', 200,
+                             json={'address': self.address, 'signature': self.sign(message), 'message': message})
+        return verified is not None
+
+    def run(self, iterations, tasks):
+        for iteration in range(iterations):
+            start = time.perf_counter()
+            if not self.login():
+                continue
+            created = []
+            for i in range(tasks):
+                body = self.call('create', 'POST', '/api/tasks', 'POST /api/tasks', 201,
+                                 json={'title': f"Load test task {iteration}.{i}", 'priority': 1 + i % 3})
+                if body is not None:
+                    created.append(body['task']['id'])
+            self.call('list', 'GET', '/api/tasks', 'GET /api/tasks', 200)
+            for task_id in created:
+                self.call('complete', 'PATCH', f'/api/tasks/{task_id}', 'PATCH /api/tasks/<id>', 200,
+                          json={'status': 1})
+            with self.stats.lock:
+                self.stats.flows.append(time.perf_counter() - start)
+
+
+def start_local_app(db_path, redis, latency):
+    """Serve the app on a free local port from a background thread; returns (base URL, server)."""
+    overrides = {}
+    if redis == 'real':
+        overrides.update(CHALLENGE_STORE='redis', RATE_LIMIT_STORAGE='redis')
+    config_map['loadtest'] = type('LoadTestConfig', (bench_config(db_path),), overrides)
+    app = create_app(config_name='loadtest')
+    if redis == 'standin' and latency:
+        challenge_store.store = LatencyStore(challenge_store.store, latency)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No line per request
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def print_summary(summary, wallets, iterations):
+    print(f"{wallets} wallets x {iterations} iterations: {summary['requests']} requests in "
+          f"{summary['seconds']:.1f} s ({summary['requests_per_second']:.1f} req/s), {summary['errors']} errors")
+    if summary['flow_p50_ms'] is not None:
+        print(f"full flow per wallet iteration: p50 {summary['flow_p50_ms']:.1f} ms, p99 {summary['flow_p99_ms']:.1f} ms")
+    print(f"{'phase':<9} {'endpoint':<27} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    for row in summary['endpoints']:
+        kinds = ', '.join(f"{kind}: {count}" for kind, count in sorted(row['error_kinds'].items()))
+        print(f"{row['phase']:<9} {row['endpoint']:<27} {row['requests']:>8} {row['errors']:>6} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}"
+              f"{'  (' + kinds + ')' if kinds else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wallets', type=int, default=50, help='concurrent simulated wallets')
+    parser.add_argument('--iterations', type=int, default=3, help='login -> create -> list -> complete rounds per wallet')
+    parser.add_argument('--tasks', type=int, default=5, help='tasks created and completed per round')
+    parser.add_argument('--url', help='base URL of a running app (default: start one in this process)')
+    parser.add_argument('--redis', choices=('standin', 'real'), default='standin',
+                        help='local app: in-process Redis stand-in or the configured Redis server')
+    parser.add_argument('--redis-latency-ms', type=float, default=0.5, help='simulated round trip of the stand-in')
+    parser.add_argument('--db', help='local app: SQLite database file (default: a fresh temporary one)')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds per HTTP request')
+    parser.add_argument('--output', help='also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        base_url = args.url
+        if base_url is None:
+            db_path = args.db or os.path.join(directory, 'loadtest.db')
+            base_url, server = start_local_app(db_path, args.redis, args.redis_latency_ms / 1000)
+        base_url = base_url.rstrip('/')
+
+        stats = Stats()
+        # Keys are generated before the clock starts
+        wallets = [Wallet(base_url, stats, args.timeout) for _ in range(args.wallets)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.wallets) as pool:
+            for future in [pool.submit(wallet.run, args.iterations, args.tasks) for wallet in wallets]:
+                future.result()
+        elapsed = time.perf_counter() - start
+        if server is not None:
+            server.shutdown()
+
+    summary = stats.summary(elapsed)
+    summary.update(target=args.url or 'local', redis=None if args.url else args.redis,
+                   wallets=args.wallets, iterations=args.iterations, tasks=args.tasks)
+    print_summary(summary, args.wallets, args.iterations)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# gunicorn.conf.py
+"""
+gunicorn settings for w3tasq.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Defaults come from the GUNICORN_* settings of the app configuration selected by
+FLASK_ENV (app/config.py); environment variables of the same name override them:
+  GUNICORN_WORKER_CLASS   'sync', 'gthread' (default) or 'gevent'
+  GUNICORN_WORKERS        worker processes (default: derived from usable CPUs)
+  GUNICORN_THREADS        threads per gthread worker (default: derived)
+  GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER
+  GUNICORN_BIND           default 0.0.0.0:5000
+
+The app is preloaded in the master and shared copy-on-write by the workers.
+Connections must never be shared across fork(): post_fork() drops the
+SQLAlchemy pool and the Redis pool inherited from the master, and the metrics
+it recorded while loading the app. Background jobs
+(app/jobs.py) are started in each worker once it has loaded the app.
+
+Metrics of all workers are aggregated through METRICS_DIR (app/metrics_export.py):
+the master clears it on start, workers write snapshots to it, and the master
+folds the counters of every exited worker into its archive.
+"""
+
+import os
+import sys
+
+# gunicorn loads this file by path; make the app package importable from it
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import config_map, FLASK_ENV
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+
+
+def usable_cpus():
+    """CPUs this process may run on (respects taskset/cpuset), at least 1."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def derive_sizing(worker_class, cpus):
+    """
+    Default (workers, threads) for a worker class.
+      sync:    2 * CPUs + 1 single-threaded workers, the classic rule for
+               blocking workers.
+      gthread: CPUs + 1 workers with 4 threads each; threads cover Redis and
+               SQLite waits, processes cover CPU-bound work.
+      gevent:  one worker per CPU; concurrency comes from worker_connections.
+    """
+    if worker_class == 'sync':
+        return 2 * cpus + 1, 1
+    if worker_class == 'gthread':
+        return cpus + 1, 4
+    return cpus, 1
+
+
+def _setting(name, cast=str):
+    """GUNICORN_<name> from the environment, else from the app configuration."""
+    value = os.environ.get(f'GUNICORN_{name}')
+    if value is None or value == '':
+        return getattr(_config, f'GUNICORN_{name}', None)
+    return cast(value)
+
+
+_config = config_map.get(FLASK_ENV, config_map['default'])
+
+worker_class = _setting('WORKER_CLASS')
+if worker_class not in WORKER_CLASSES:
+    raise ValueError(f"Invalid GUNICORN_WORKER_CLASS: {worker_class}. Must be one of {WORKER_CLASSES}")
+
+_default_workers, _default_threads = derive_sizing(worker_class, usable_cpus())
+workers = _setting('WORKERS', int) or _default_workers
+threads = _setting('THREADS', int) or _default_threads
+if worker_class == 'gevent':
+    worker_connections = 1000
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+timeout = _setting('TIMEOUT', int)
+graceful_timeout = timeout
+keepalive = 5
+
+# Bound memory growth: recycle workers, staggered by the jitter
+max_requests = _setting('MAX_REQUESTS', int)
+max_requests_jitter = _setting('MAX_REQUESTS_JITTER', int)
+
+# gevent patches the standard library in each worker after fork; a preloaded
+# app would already hold unpatched sockets and locks, so it is loaded per worker
+preload_app = worker_class != 'gevent'
+
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Master starting: drop the metrics snapshots of a previous run."""
+    if _config.METRICS_DIR:
+        from app import metrics_export
+        metrics_export.reset_dir(_config.METRICS_DIR)
+
+
+def when_ready(server):
+    """
+    Master is ready, workers not forked yet: import the wallet auth stack once
+    here so every worker shares it instead of paying for it on its first login.
+    """
+    if preload_app:
+        import eth_account  # noqa: F401
+        import eth_utils  # noqa: F401
+    server.log.info("w3tasq: %s %s workers x %s threads, max_requests %s+%s",
+                    workers, worker_class, threads, max_requests, max_requests_jitter)
+
+
+def post_fork(server, worker):
+    """Drop the database and Redis connections and the metrics inherited from the master."""
+    if 'app.main' not in sys.modules:
+        return  # App not preloaded; the worker builds its own pools
+    from app.main import app
+    from app.models import db
+    from app import utils, metrics_export
+    with app.app_context():
+        # close=False: the parent's connections are left alone, only forgotten here
+        db.engine.dispose(close=False)
+    utils.reset_redis_pool()
+    metrics_export.reset_process()
+
+
+def post_worker_init(worker):
+    """The worker has loaded the app: start the background job scheduler (JOBS_ENABLED)."""
+    from app.main import app
+    from app import jobs, metrics_export
+    jobs.start_scheduler(app)
+    metrics_export.start_flusher()
+
+
+def worker_exit(server, worker):
+    """Worker exiting: write its last metrics snapshot."""
+    from app import metrics_export
+    metrics_export.write_snapshot()
+
+
+def child_exit(server, worker):
+    """Worker gone (master side): keep its counters in the archive, drop its gauges."""
+    if _config.METRICS_DIR:
+        from app import metrics_export
+        metrics_export.mark_process_dead(worker.pid, _config.METRICS_DIR)
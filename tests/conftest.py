@@ -1,7 +1,8 @@
 import pytest
+from contextlib import contextmanager
 from app.app import create_app
 from app.models import db, User, Task
-from app import db_utils
+from app import db_utils, query_log, seeding
 
 
 @pytest.fixture(scope='session')
@@ -146,4 +147,44 @@ def authenticated_client_for_user1(client, user1):
     # However, modifying session in session_transaction after yield is tricky.
     # The client fixture itself handles session isolation quite well for new requests.
     # So, often no explicit teardown is needed here for session clearing.
-    # If needed, a more complex teardown could involve another session_transaction.
\ No newline at end of file
+    # If needed, a more complex teardown could involve another session_transaction.
+
+
+@pytest.fixture
+def max_queries():
+    """
+    Pin the number of SQL statements run by a block, e.g. a request:
+
+        with max_queries(2):
+            client.get('/api/tasks')
+
+    Fails with the list of statements if the block runs more than `limit`.
+    """
+    @contextmanager
+    def check(limit):
+        with query_log.record_queries() as recorder:
+            yield recorder
+        statements = '\n'.join(f"  {statement}" for statement, _ in recorder.statements)
+        assert recorder.count <= limit, f"Expected at most {limit} queries, got {recorder.count}:\n{statements}"
+
+    return check
+
+
+@pytest.fixture
+def seeded(_db):
+    """
+    Seed synthetic users and tasks (app/seeding.py) into the test database:
+    seeded(users, tasks, **options) returns the new user ids. Removed after the test.
+    """
+    user_ids = []
+
+    def seed(users, tasks, **options):
+        result = seeding.seed_database(users, tasks, **options)
+        ids = list(range(result['first_user_id'], result['first_user_id'] + users))
+        user_ids.extend(ids)
+        return ids
+
+    yield seed
+    Task.query.filter(Task.user_id.in_(user_ids)).delete(synchronize_session=False)
+    User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    _db.session.commit()
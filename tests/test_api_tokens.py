@@ -0,0 +1,140 @@
+# tests/test_api_tokens.py
+import pytest
+from datetime import timedelta
+from app import api_tokens
+from app.api_tokens import TokenIssuer, RevocationList, InvalidTokenError
+
+
+@pytest.fixture
+def issuer():
+    """Token issuer with an in-memory deny list."""
+    return TokenIssuer('test-secret', set())
+
+def mint_token(client, **payload):
+    """Mint a token through the API with the client's session."""
+    response = client.post('/api/tokens', json=payload)
+    assert response.status_code == 201
+    return response.get_json()
+
+def test_issued_token_verifies(issuer):
+    """Test: a fresh token returns its claims"""
+    token, claims = issuer.issue(7, '0xabc', ['tasks:read'], timedelta(days=1))
+
+    verified = issuer.verify(token)
+
+    assert verified == claims
+    assert verified['sub'] == 7
+    assert verified['scp'] == ['tasks:read']
+
+def test_tampered_token_is_rejected(issuer):
+    """Test: changing the claims breaks the HMAC"""
+    token, _ = issuer.issue(7, '0xabc', ['tasks:read'], timedelta(days=1))
+    forged, _ = TokenIssuer('other-secret', set()).issue(8, '0xdef', ['tasks:write'], timedelta(days=1))
+    prefix, _, mac = token.split('.')
+    forged_payload = forged.split('.')[1]
+
+    with pytest.raises(InvalidTokenError):
+        issuer.verify(f"{prefix}.{forged_payload}.{mac}")
+    with pytest.raises(InvalidTokenError):
+        issuer.verify(forged)
+    with pytest.raises(InvalidTokenError):
+        issuer.verify('not-a-token')
+
+def test_expired_token_is_rejected(issuer):
+    """Test: tokens past their expiry are refused"""
+    token, _ = issuer.issue(7, '0xabc', ['tasks:read'], timedelta(seconds=-1))
+
+    with pytest.raises(InvalidTokenError, match='expired'):
+        issuer.verify(token)
+
+def test_revocation_list_reloads_after_ttl(monkeypatch):
+    """Test: the deny list is cached and reloaded only after its TTL"""
+    now = [100.0]
+    monkeypatch.setattr(api_tokens.time, 'monotonic', lambda: now[0])
+    loads = []
+    revoked_ids = set()
+    revoked = RevocationList(lambda: loads.append(1) or set(revoked_ids), ttl=30)
+
+    assert 'a' not in revoked
+    revoked_ids.add('a')
+    assert 'a' not in revoked  # Still cached
+    now[0] += 30
+    assert 'a' in revoked
+    assert len(loads) == 2
+
+def test_token_authenticates_task_endpoints(authenticated_client_for_user1, app, user1):
+    """Test: a minted token is accepted instead of the session"""
+    token = mint_token(authenticated_client_for_user1, name='script')['token']
+
+    with app.test_client() as client:
+        headers = {'Authorization': f'Bearer {token}'}
+        created = client.post('/api/tasks', json={'title': 'From a script'}, headers=headers)
+        listed = client.get('/api/tasks', headers=headers)
+
+    assert created.status_code == 201
+    assert created.get_json()['task']['user_id'] == user1.id
+    assert listed.status_code == 200
+    assert [task['title'] for task in listed.get_json()['tasks']] == ['From a script']
+
+def test_token_scopes_are_enforced(authenticated_client_for_user1, app):
+    """Test: a read-only token can not change tasks"""
+    token = mint_token(authenticated_client_for_user1, scopes=['tasks:read'])['token']
+
+    with app.test_client() as client:
+        headers = {'Authorization': f'Bearer {token}'}
+        assert client.get('/api/tasks', headers=headers).status_code == 200
+        response = client.post('/api/tasks', json={'title': 'Nope'}, headers=headers)
+
+    assert response.status_code == 403
+
+def test_invalid_bearer_token_is_rejected(client):
+    """Test: a bad token gets 401 even without a session"""
+    response = client.get('/api/tasks', headers={'Authorization': 'Bearer w3t.abc.def'})
+
+    assert response.status_code == 401
+
+def test_tokens_can_not_mint_tokens(authenticated_client_for_user1, app):
+    """Test: minting a token requires a wallet login session"""
+    token = mint_token(authenticated_client_for_user1)['token']
+
+    with app.test_client() as client:
+        response = client.post('/api/tokens', json={}, headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 401
+
+def test_invalid_token_request_is_rejected(authenticated_client_for_user1):
+    """Test: unknown scopes and out-of-range lifetimes are refused"""
+    assert authenticated_client_for_user1.post('/api/tokens', json={'scopes': ['admin']}).status_code == 400
+    assert authenticated_client_for_user1.post('/api/tokens', json={'ttl_days': 0}).status_code == 400
+
+def test_revoked_token_is_rejected(authenticated_client_for_user1, app):
+    """Test: revocation takes effect immediately in the same worker"""
+    minted = mint_token(authenticated_client_for_user1)
+    token, token_id = minted['token'], minted['token_info']['id']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_client() as client:
+        assert client.get('/api/tasks', headers=headers).status_code == 200
+        revoked = client.delete(f'/api/tokens/{token_id}', headers=headers)
+        after = client.get('/api/tasks', headers=headers)
+
+    assert revoked.status_code == 200
+    assert revoked.get_json()['token_info']['revoked_at'] is not None
+    assert after.status_code == 401
+    listed = authenticated_client_for_user1.get('/api/tokens').get_json()['tokens']
+    assert [item['id'] for item in listed] == [token_id]
+
+def test_revoke_unknown_token_returns_404(authenticated_client_for_user1):
+    """Test: only the user's own tokens can be revoked"""
+    response = authenticated_client_for_user1.delete('/api/tokens/0123456789abcdef')
+
+    assert response.status_code == 404
+
+def test_token_verification_needs_no_database(authenticated_client_for_user1, app, monkeypatch):
+    """Test: with a warm deny list, token checks do not query the database"""
+    token = mint_token(authenticated_client_for_user1)['token']
+    api_tokens.issuer.verify(token)  # Warm the deny list
+    monkeypatch.setattr(api_tokens.issuer.revoked, 'loader', lambda: pytest.fail("deny list reloaded"))
+
+    for _ in range(3):
+        api_tokens.issuer.verify(token)
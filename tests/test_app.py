@@ -199,4 +199,186 @@ def test_api_patch_task_status_updates_to2(authenticated_client_for_user1, user1
         task_from_db, msg = db_utils.get_task_by_id(task_id)
         assert task_from_db is not None, "Task should still exist in the database"
         assert task_from_db.status == 2, f"Task status in DB should be updated to 1 (COMPLETED). Got: {task_from_db.status}"
-        assert task_from_db.user_id == user_id, "Task user_id in DB should be unchanged"
\ No newline at end of file
+        assert task_from_db.user_id == user_id, "Task user_id in DB should be unchanged"
+
+def test_api_batch_patch_updates_several_tasks(authenticated_client_for_user1, user1, task1):
+    """
+    Test that PATCH /api/tasks applies several status changes in one request
+    and reports a result for each task.
+    """
+    client = authenticated_client_for_user1
+
+    with client.application.app_context():
+        task2 = db_utils.create_task(user_id=user1.id, title='Task 2 for User 1', priority=3)
+        task2_id = task2.id
+
+    patch_data = {
+        "updates": [
+            {"id": task1.id, "status": 1},  # COMPLETED
+            {"id": task2_id, "status": 2},  # ARCHIVED
+        ]
+    }
+    response = client.patch('/api/tasks', json=patch_data)
+
+    assert response.status_code == 200, f"Expected 200 OK, got {response.status_code}. Response data: {response.get_json()}"
+    data = response.get_json()
+    assert data['success'] is True
+    results = {item['id']: item for item in data['results']}
+    assert results[task1.id]['success'] is True
+    assert results[task1.id]['task']['status'] == 1
+    assert results[task2_id]['success'] is True
+    assert results[task2_id]['task']['status'] == 2
+
+    with client.application.app_context():
+        task_from_db, msg = db_utils.get_task_by_id(task1.id)
+        assert task_from_db.status == 1
+        task_from_db, msg = db_utils.get_task_by_id(task2_id)
+        assert task_from_db.status == 2
+        user_from_db, msg = db_utils.get_user_by_id(user1.id)
+        assert user_from_db.completed_tasks == 1
+
+def test_api_batch_patch_reports_failed_items(authenticated_client_for_user1, user1, user2, task1):
+    """
+    Test that invalid items in a batch are rejected individually
+    while the valid ones are still applied.
+    """
+    client = authenticated_client_for_user1
+
+    with client.application.app_context():
+        foreign_task = db_utils.create_task(user_id=user2.id, title='Task for User 2')
+        foreign_task_id = foreign_task.id
+
+    patch_data = {
+        "updates": [
+            {"id": task1.id, "status": 1},
+            {"id": foreign_task_id, "status": 1},  # Belongs to another user
+            {"id": 999999, "status": 1},           # Does not exist
+        ]
+    }
+    response = client.patch('/api/tasks', json=patch_data)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is False
+    results = {item['id']: item for item in data['results']}
+    assert results[task1.id]['success'] is True
+    assert results[foreign_task_id]['success'] is False
+    assert results[999999]['success'] is False
+
+    with client.application.app_context():
+        task_from_db, msg = db_utils.get_task_by_id(foreign_task_id)
+        assert task_from_db.status == 0, "Task of another user must not be modified"
+
+def test_api_batch_patch_validates_body(authenticated_client_for_user1):
+    """Test: PATCH /api/tasks rejects a body without a usable 'updates' list"""
+    client = authenticated_client_for_user1
+
+    response = client.patch('/api/tasks', json={})
+    assert response.status_code == 400
+
+    response = client.patch('/api/tasks', json={"updates": [{"status": 1}]})
+    assert response.status_code == 400
+
+    response = client.patch('/api/tasks', json={"updates": [{"id": True, "status": True}]})
+    assert response.status_code == 400
+
+    max_batch = client.application.config['TASKS_BATCH_MAX']
+    too_many = [{"id": i, "status": 1} for i in range(1, max_batch + 2)]
+    response = client.patch('/api/tasks', json={"updates": too_many})
+    assert response.status_code == 400
+
+def test_api_batch_patch_requires_authentication(client):
+    """Test: PATCH /api/tasks requires an authenticated session"""
+    response = client.patch('/api/tasks', json={"updates": [{"id": 1, "status": 1}]})
+    assert response.status_code == 401
+
+def test_api_get_tasks_limit_is_bounded(authenticated_client_for_user1, user1):
+    """Test: GET /api/tasks honours ?limit= within TASKS_PER_PAGE_MIN/MAX"""
+    client = authenticated_client_for_user1
+    config = client.application.config
+
+    with client.application.app_context():
+        for i in range(config['TASKS_PER_PAGE_MAX'] + 5):
+            db_utils.create_task(user_id=user1.id, title=f'Task {i}')
+
+    # Default page size without a limit
+    data = client.get('/api/tasks').get_json()
+    assert len(data['tasks']) == config['TASKS_PER_PAGE']
+    assert data['pagination']['limit'] == config['TASKS_PER_PAGE']
+
+    # Larger pages on request
+    data = client.get('/api/tasks?limit=10').get_json()
+    assert len(data['tasks']) == 10
+    assert data['pagination']['has_more'] is True
+
+    # Clamped to the configured maximum and minimum
+    data = client.get('/api/tasks?limit=100000').get_json()
+    assert len(data['tasks']) == config['TASKS_PER_PAGE_MAX']
+    data = client.get('/api/tasks?limit=0').get_json()
+    assert len(data['tasks']) == config['TASKS_PER_PAGE_MIN']
+
+    # Invalid value falls back to the default
+    data = client.get('/api/tasks?limit=abc').get_json()
+    assert len(data['tasks']) == config['TASKS_PER_PAGE']
+
+def test_api_get_tasks_limit_pages_follow_cursor(authenticated_client_for_user1, user1):
+    """Test: pages of different sizes chained by cursor return every task exactly once"""
+    client = authenticated_client_for_user1
+
+    with client.application.app_context():
+        created_ids = {db_utils.create_task(user_id=user1.id, title=f'Task {i}').id for i in range(17)}
+
+    seen_ids = []
+    cursor = None
+    for limit in [3, 6, 12]:
+        url = f'/api/tasks?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        seen_ids.extend(task['id'] for task in data['tasks'])
+        cursor = data['pagination']['next_cursor']
+        if not data['pagination']['has_more']:
+            break
+
+    assert len(seen_ids) == len(set(seen_ids))
+    assert set(seen_ids) == created_ids
+
+# --- Query counts per endpoint (see the max_queries fixture in conftest.py) ---
+def test_api_get_tasks_query_count(authenticated_client_for_user1, user1, max_queries):
+    """Test: a page of tasks is one query, however many tasks it holds"""
+    client = authenticated_client_for_user1
+    for i in range(12):
+        db_utils.create_task(user_id=user1.id, title=f'Task {i}')
+
+    with max_queries(1):
+        response = client.get('/api/tasks')
+    assert len(response.get_json()['tasks']) == client.application.config['TASKS_PER_PAGE']
+
+def test_api_create_task_query_count(authenticated_client_for_user1, user1, max_queries):
+    """Test: creating a task is an INSERT and the reload of its defaults"""
+    with max_queries(2):
+        response = authenticated_client_for_user1.post('/api/tasks', json={'title': 'Counted'})
+    assert response.status_code == 201
+
+def test_api_patch_task_status_query_count(authenticated_client_for_user1, user1, task1, max_queries):
+    """Test: completing a task does not lazy-load its user"""
+    task_id = task1.id
+
+    with max_queries(4) as recorder:
+        response = authenticated_client_for_user1.patch(f'/api/tasks/{task_id}', json={'status': 1})
+    assert response.status_code == 200
+    assert not any(statement.startswith('SELECT users') for statement, _ in recorder.statements)
+
+    user_from_db, msg = db_utils.get_user_by_id(user1.id)
+    assert user_from_db.completed_tasks == 1
+
+def test_api_batch_patch_query_count(authenticated_client_for_user1, user1, task1, max_queries):
+    """Test: a batch update runs the same number of queries for 1 or 10 tasks"""
+    task_ids = [task1.id] + [db_utils.create_task(user_id=user1.id, title=f'Task {i}').id for i in range(9)]
+
+    with max_queries(4):
+        response = authenticated_client_for_user1.patch('/api/tasks', json={
+            'updates': [{'id': task_id, 'status': 1} for task_id in task_ids]
+        })
+    assert [item['task']['status'] for item in response.get_json()['results']] == [1] * 10
+
+    user_from_db, msg = db_utils.get_user_by_id(user1.id)
+    assert user_from_db.completed_tasks == 10
@@ -0,0 +1,269 @@
+# tests/test_asgi.py
+import asyncio
+import json
+import threading
+import pytest
+from app import utils, challenges, rate_limit
+from app.asgi import ASGIApp, BoundedExecutor, ExecutorBusyError
+from app.challenges import HmacChallenger
+from app.challenge_store import AsyncBreakerChallengeStore, MemoryChallengeStore, ChallengeStoreUnavailableError
+from app.circuit_breaker import CircuitBreaker
+from app.rate_limit import RateLimiter, MemoryRateLimitBackend
+
+
+class ASGIResponse:
+    def __init__(self, status_code, headers, data):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+
+    def get_json(self):
+        return json.loads(self.data)
+
+
+class ASGITestClient:
+    """Minimal ASGI client with a cookie jar, mirroring the Flask test client API used here."""
+
+    def __init__(self, asgi_app):
+        self.asgi_app = asgi_app
+        self.cookies = {}
+
+    async def _request(self, method, path, body, headers):
+        path, _, query = path.partition('?')
+        raw_headers = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        if self.cookies:
+            raw_headers.append((b'cookie', '; '.join(f'{k}={v}' for k, v in self.cookies.items()).encode()))
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+            'headers': raw_headers, 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+            'scheme': 'http', 'http_version': '1.1', 'root_path': '',
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        await self.asgi_app(scope, receive, send)
+        start = sent[0]
+        headers = {}
+        for name, value in start['headers']:
+            name, value = name.decode(), value.decode()
+            if name == 'set-cookie':
+                cookie_name, _, rest = value.partition('=')
+                self.cookies[cookie_name] = rest.split(';', 1)[0]
+            headers[name] = value
+        data = b''.join(message.get('body', b'') for message in sent[1:])
+        return ASGIResponse(start['status'], headers, data)
+
+    def open(self, method, path, json_body=None, headers=None):
+        headers = dict(headers or {})
+        body = b''
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        return asyncio.run(self._request(method, path, body, headers))
+
+    def get(self, path, headers=None):
+        return self.open('GET', path, headers=headers)
+
+    def post(self, path, json=None, headers=None):
+        return self.open('POST', path, json, headers)
+
+
+@pytest.fixture
+def asgi_client(app, _db):
+    yield ASGITestClient(ASGIApp(app))
+
+@pytest.fixture(params=['wsgi', 'asgi'])
+def any_client(request, app, _db):
+    """The Flask test client and the ASGI client, for parity checks."""
+    if request.param == 'wsgi':
+        with app.test_client() as client:
+            yield client
+    else:
+        yield ASGITestClient(ASGIApp(app))
+
+@pytest.fixture
+def login_user(_db):
+    """Remove the test wallet's user after a login test."""
+    yield
+    from app.models import User
+    user = User.query.filter_by(wallet_address=utils.get_test_w3addres()).first()
+    if user:
+        _db.session.delete(user)
+        _db.session.commit()
+
+def login(client, message_in_verify=False):
+    address = utils.get_test_w3addres()
+    response = client.post('/api/auth/challenge', json={'address': address})
+    assert response.status_code == 200
+    message = response.get_json()['message']
+    payload = {'address': address, 'signature': f"0x{utils.sign_message_with_private_key(message)}"}
+    if message_in_verify:
+        payload['message'] = message
+    return client.post('/api/auth/verify', json=payload)
+
+def test_login_flow_parity(any_client, login_user):
+    """Test: challenge, verify and a session-authenticated task request work the same way"""
+    response = login(any_client)
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
+
+    response = any_client.post('/api/tasks', json={'title': 'After login'})
+    assert response.status_code == 201
+    response = any_client.get('/api/tasks')
+    assert response.status_code == 200
+    assert [task['title'] for task in response.get_json()['tasks']] == ['After login']
+
+def test_challenge_is_single_use_parity(any_client, login_user):
+    """Test: a consumed challenge can not be verified again"""
+    address = utils.get_test_w3addres()
+    message = any_client.post('/api/auth/challenge', json={'address': address}).get_json()['message']
+    payload = {'address': address, 'signature': f"0x{utils.sign_message_with_private_key(message)}"}
+
+    assert any_client.post('/api/auth/verify', json=payload).status_code == 200
+    response = any_client.post('/api/auth/verify', json=payload)
+    assert response.status_code == 401
+    assert response.get_json()['error'] == "No challenge found for this address"
+
+@pytest.mark.parametrize('payload, status', [
+    ({}, 400),
+    ({'address': 'not-an-address'}, 400),
+])
+def test_challenge_validation_parity(any_client, payload, status):
+    """Test: invalid challenge requests get the same errors"""
+    assert any_client.post('/api/auth/challenge', json=payload).status_code == status
+
+def test_verify_requires_fields_parity(any_client):
+    """Test: verify without a signature is rejected"""
+    response = any_client.post('/api/auth/verify', json={'address': utils.get_test_w3addres()})
+    assert response.status_code == 400
+
+def test_hmac_mode_parity(any_client, app, monkeypatch, login_user):
+    """Test: stateless challenges work through the async handlers"""
+    monkeypatch.setattr(challenges, 'mode', 'hmac')
+    monkeypatch.setattr(challenges, 'challenger', HmacChallenger(app.config['SECRET_KEY'], ttl=300))
+
+    assert login(any_client, message_in_verify=True).status_code == 200
+
+def test_rate_limit_parity(any_client, monkeypatch):
+    """Test: throttled auth requests get 429 in both modes"""
+    monkeypatch.setattr(rate_limit, 'limiter', RateLimiter(MemoryRateLimitBackend(), {
+        'get_challenge': {'ip': (1, 60)},
+    }))
+    address = utils.get_test_w3addres()
+
+    assert any_client.post('/api/auth/challenge', json={'address': address}).status_code == 200
+    response = any_client.post('/api/auth/challenge', json={'address': address})
+    assert response.status_code == 429
+    assert 'retry-after' in {name.lower() for name in response.headers.keys()}
+
+def test_rate_limit_uses_forwarded_client_ip(asgi_client, app, monkeypatch):
+    """Test: behind a trusted proxy, clients are limited by their X-Forwarded-For address"""
+    monkeypatch.setitem(app.config, 'PROXY_FIX_X_FOR', 1)
+    monkeypatch.setattr(rate_limit, 'limiter', RateLimiter(MemoryRateLimitBackend(), {
+        'get_challenge': {'ip': (1, 60)},
+    }))
+    address = utils.get_test_w3addres()
+
+    def challenge(client_ip):
+        return asgi_client.post('/api/auth/challenge', json={'address': address},
+                                headers={'X-Forwarded-For': client_ip}).status_code
+
+    assert challenge('203.0.113.7') == 200
+    assert challenge('203.0.113.8') == 200  # Another client, own bucket
+    assert challenge('203.0.113.7') == 429
+
+def test_unauthenticated_task_request_is_delegated(asgi_client):
+    """Test: non-auth routes are answered by the Flask app"""
+    response = asgi_client.get('/api/tasks')
+
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Authentication required'
+
+def test_async_store_is_used_for_challenges(app, _db, login_user):
+    """Test: with an async store, challenges never touch the sync store"""
+    class RecordingAsyncStore:
+        def __init__(self):
+            self.store = MemoryChallengeStore()
+            self.calls = []
+
+        async def put(self, address, data, ttl):
+            self.calls.append('put')
+            self.store.put(address, data, ttl)
+
+        async def consume(self, address):
+            self.calls.append('consume')
+            return self.store.consume(address)
+
+    async_store = RecordingAsyncStore()
+    client = ASGITestClient(ASGIApp(app, async_store=async_store))
+
+    assert login(client).status_code == 200
+    assert async_store.calls == ['put', 'consume']
+
+def test_async_breaker_store_falls_back(monkeypatch):
+    """Test: a failing async primary falls back to the local store"""
+    class FailingAsyncStore:
+        async def put(self, address, data, ttl):
+            raise ConnectionError("Timeout connecting to server")
+
+        async def consume(self, address):
+            raise ConnectionError("Timeout connecting to server")
+
+    store = AsyncBreakerChallengeStore(FailingAsyncStore(), CircuitBreaker('challenge_store', failure_threshold=1),
+                                       MemoryChallengeStore())
+
+    async def round_trip():
+        await store.put('0xabc', {'message': 'hi'}, 60)
+        return await store.consume('0xabc')
+
+    assert asyncio.run(round_trip()) == {'message': 'hi'}
+
+def test_async_breaker_store_without_fallback_fails_fast():
+    """Test: like the sync store, the async one raises a retryable error when it has no fallback"""
+    class FailingAsyncStore:
+        async def claim(self, key, ttl):
+            raise ConnectionError("Timeout connecting to server")
+
+    store = AsyncBreakerChallengeStore(FailingAsyncStore(), CircuitBreaker('challenge_store', failure_threshold=1))
+
+    with pytest.raises(ChallengeStoreUnavailableError):
+        asyncio.run(store.claim('nonce:abc', 60))
+    # The breaker is open: fails without touching the primary
+    with pytest.raises(ChallengeStoreUnavailableError):
+        asyncio.run(store.consume('0xabc'))
+
+def test_bounded_executor_rejects_when_full():
+    """Test: calls beyond workers + queue are rejected immediately"""
+    executor = BoundedExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(executor.run(release.wait, 5))
+        second = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorBusyError):
+            await executor.run(lambda: None)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == [True, True]
+    executor.shutdown()
+
+def test_busy_executor_answers_503(app, monkeypatch):
+    """Test: a saturated executor turns into 503 with Retry-After"""
+    asgi_app = ASGIApp(app)
+
+    async def busy(*args):
+        raise ExecutorBusyError("Server is busy, please retry")
+
+    monkeypatch.setattr(asgi_app.executor, 'run', busy)
+    response = ASGITestClient(asgi_app).get('/api/tasks')
+
+    assert response.status_code == 503
+    assert response.headers['retry-after'] == '1'
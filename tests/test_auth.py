@@ -218,4 +218,17 @@ def test_dashboard_page_contains_logout_button(client):
     
     # Проверяем, что страница содержит кнопку logout
     html_content = response.data.decode('utf-8')
-    assert 'logout' in html_content.lower()
\ No newline at end of file
+    assert 'logout' in html_content.lower()
+
+def test_challenge_can_be_used_only_once():
+    """Test: a challenge is consumed by the first verification attempt"""
+    address = utils.get_test_w3addres()
+    message = utils.generate_challenge_message(address)
+    signature = utils.sign_message_with_private_key(message)
+
+    result, msg = utils.verify_signature(address, f"0x{signature}")
+    assert result is True
+
+    # Replaying the same signature must fail, the challenge is gone
+    result, msg = utils.verify_signature(address, f"0x{signature}")
+    assert result is False
@@ -0,0 +1,117 @@
+# tests/test_challenge_store.py
+import threading
+import pytest
+from app import challenge_store
+from app.challenge_store import MemoryChallengeStore, SQLiteChallengeStore
+
+ADDRESS = "0x742d35Cc6634C0532925a3b8D4C7d26990d0f7f6"
+CHALLENGE = {'challenge': 'abc', 'message': 'Sign this message', 'expires_at': '2025-01-01T00:00:00'}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    """Every local challenge store backend."""
+    if request.param == 'memory':
+        yield MemoryChallengeStore(max_size=3)
+    else:
+        yield SQLiteChallengeStore(str(tmp_path / 'challenges.db'), max_size=3)
+
+def test_store_put_and_consume_once(store):
+    """Test: a stored challenge is returned once and then gone"""
+    store.put(ADDRESS, CHALLENGE, ttl=60)
+    assert store.consume(ADDRESS) == CHALLENGE
+    assert store.consume(ADDRESS) == {}
+
+def test_store_put_replaces_previous_challenge(store):
+    """Test: a new challenge for the same address replaces the old one"""
+    store.put(ADDRESS, CHALLENGE, ttl=60)
+    store.put(ADDRESS, dict(CHALLENGE, challenge='def'), ttl=60)
+    assert store.consume(ADDRESS)['challenge'] == 'def'
+
+def test_store_expired_challenge_is_not_returned(store):
+    """Test: a challenge past its TTL is treated as missing"""
+    store.put(ADDRESS, CHALLENGE, ttl=0)
+    assert store.consume(ADDRESS) == {}
+
+def test_store_consume_is_atomic_across_threads(store):
+    """Test: concurrent consumers never both receive the same challenge"""
+    store.put(ADDRESS, CHALLENGE, ttl=60)
+    results = []
+    barrier = threading.Barrier(8)
+
+    def consumer():
+        barrier.wait()
+        results.append(store.consume(ADDRESS))
+
+    threads = [threading.Thread(target=consumer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(1 for result in results if result) == 1
+
+def test_store_claim_once_until_expiry(store):
+    """Test: a key can be claimed once; an expired claim can be made again"""
+    assert store.claim('nonce:a', ttl=60) is True
+    assert store.claim('nonce:a', ttl=60) is False
+    assert store.claim('nonce:b', ttl=0) is True
+    assert store.claim('nonce:b', ttl=60) is True
+
+def test_memory_store_evicts_oldest_when_full():
+    """Test: the in-memory store stays within max_size by evicting the oldest entry"""
+    store = MemoryChallengeStore(max_size=2)
+    for i in range(3):
+        store.put(f"0x{i}", CHALLENGE, ttl=60)
+
+    assert len(store) == 2
+    assert store.consume("0x0") == {}
+    assert store.consume("0x2") == CHALLENGE
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    """Test: two store instances on one file (like two workers) see the same challenges"""
+    path = str(tmp_path / 'challenges.db')
+    worker_a = SQLiteChallengeStore(path)
+    worker_b = SQLiteChallengeStore(path)
+
+    worker_a.put(ADDRESS, CHALLENGE, ttl=60)
+    assert worker_b.consume(ADDRESS) == CHALLENGE
+    assert worker_a.consume(ADDRESS) == {}
+
+def test_memory_store_rejects_claims_when_full():
+    """Test: a full store rejects new claims instead of forgetting used ones"""
+    store = MemoryChallengeStore(max_size=2)
+    assert store.claim('a', ttl=60) and store.claim('b', ttl=60)
+    assert store.claim('c', ttl=60) is False
+    assert store.claim('a', ttl=60) is False
+
+def test_sqlite_store_claims_are_shared_between_instances(tmp_path):
+    """Test: a key claimed by one worker can not be claimed by another"""
+    path = str(tmp_path / 'challenges.db')
+    assert SQLiteChallengeStore(path).claim('nonce:a', ttl=60) is True
+    assert SQLiteChallengeStore(path).claim('nonce:a', ttl=60) is False
+
+def test_sqlite_store_prunes_to_max_size(tmp_path, monkeypatch):
+    """Test: periodic cleanup keeps the SQLite table within max_size"""
+    monkeypatch.setattr(SQLiteChallengeStore, 'PRUNE_EVERY', 1)
+    store = SQLiteChallengeStore(str(tmp_path / 'challenges.db'), max_size=2)
+    for i in range(5):
+        store.put(f"0x{i}", CHALLENGE, ttl=60 + i)
+
+    (count,) = store._connection().execute("SELECT COUNT(*) FROM challenges").fetchone()
+    assert count == 2
+    assert store.consume("0x4") == CHALLENGE
+
+def test_testing_config_uses_memory_store(app):
+    """Test: the test configuration runs without Redis"""
+    assert app.config['CHALLENGE_STORE'] == 'memory'
+    assert isinstance(challenge_store.store, MemoryChallengeStore)
+
+def test_store_interface_is_abstract():
+    """Test: a backend must implement the whole interface"""
+    class PartialStore(challenge_store.ChallengeStore):
+        def put(self, address, challenge_data, ttl):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialStore()
@@ -0,0 +1,118 @@
+# tests/test_challenges.py
+import pytest
+from app import challenges, utils
+from app.challenges import HmacChallenger
+from app.challenge_store import MemoryChallengeStore
+
+ADDRESS = "0x742d35Cc6634C0532925a3b8D4C7d26990d0f7f6"
+
+
+@pytest.fixture
+def hmac_mode(app, monkeypatch):
+    """Switch the application to stateless HMAC challenges for one test."""
+    monkeypatch.setattr(challenges, 'mode', 'hmac')
+    monkeypatch.setattr(challenges, 'challenger', HmacChallenger(app.config['SECRET_KEY'], ttl=300))
+    yield challenges.challenger
+
+def test_hmac_challenge_round_trip():
+    """Test: an issued challenge passes the check, and its nonce is consumed exactly once"""
+    challenger = HmacChallenger('secret-key', store=MemoryChallengeStore())
+    message = challenger.issue(ADDRESS)
+
+    assert ADDRESS in message
+    nonce, error = challenger.check(ADDRESS, message)
+    assert nonce and error is None
+    assert challenger.check(ADDRESS, message) == (nonce, None)  # Checking consumes nothing
+    assert challenger.consume(nonce) is True
+    assert challenger.consume(nonce) is False
+
+def test_hmac_nonces_are_shared_between_workers():
+    """Test: a nonce consumed by one worker is rejected by another using the same store"""
+    store = MemoryChallengeStore()
+    worker_a = HmacChallenger('secret-key', store=store)
+    worker_b = HmacChallenger('secret-key', store=store)
+    nonce, _ = worker_a.check(ADDRESS, worker_a.issue(ADDRESS))
+
+    assert worker_a.consume(nonce) is True
+    assert worker_b.consume(nonce) is False
+
+def test_hmac_challenge_rejects_tampering():
+    """Test: changing any part of the message breaks the HMAC"""
+    challenger = HmacChallenger('secret-key')
+    message = challenger.issue(ADDRESS)
+
+    tampered = message.replace("Expires: ", "Expires: 9")
+    assert challenger.check(ADDRESS, tampered) == (None, "Invalid challenge message")
+    assert challenger.check(ADDRESS, "Sign this message to authenticate: x") == (None, "Invalid challenge message")
+    assert challenger.check(ADDRESS, None) == (None, "Invalid challenge message")
+
+def test_hmac_challenge_rejects_other_key_and_address():
+    """Test: a challenge is bound to the server key and to the address"""
+    message = HmacChallenger('secret-key').issue(ADDRESS)
+
+    assert HmacChallenger('other-key').check(ADDRESS, message)[0] is None
+    other_address = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+    assert HmacChallenger('secret-key').check(other_address, message) == \
+        (None, "Challenge was issued for another address")
+
+def test_hmac_challenge_expires():
+    """Test: an expired challenge is rejected even with a valid HMAC"""
+    challenger = HmacChallenger('secret-key', ttl=-1)
+    message = challenger.issue(ADDRESS)
+    assert challenger.check(ADDRESS, message) == (None, "Challenge has expired")
+
+def test_hmac_mode_login_flow(client, hmac_mode):
+    """Test: challenge and verify endpoints work without any challenge storage"""
+    address = utils.get_test_w3addres()
+
+    response = client.post('/api/auth/challenge', json={'address': address})
+    assert response.status_code == 200
+    message = response.get_json()['message']
+
+    signature = utils.sign_message_with_private_key(message)
+    response = client.post('/api/auth/verify', json={
+        'address': address,
+        'signature': f"0x{signature}",
+        'message': message
+    })
+    assert response.status_code == 200, response.get_json()
+    with client.session_transaction() as session:
+        assert session['authenticated'] is True
+
+    # The same signed challenge can not be used again
+    response = client.post('/api/auth/verify', json={
+        'address': address,
+        'signature': f"0x{signature}",
+        'message': message
+    })
+    assert response.status_code == 401
+
+def test_hmac_mode_requires_message(client, hmac_mode):
+    """Test: in HMAC mode, verify without the challenge message is rejected"""
+    address = utils.get_test_w3addres()
+    message = utils.generate_challenge_message(address)
+    signature = utils.sign_message_with_private_key(message)
+
+    response = client.post('/api/auth/verify', json={'address': address, 'signature': f"0x{signature}"})
+    assert response.status_code == 401
+
+def test_hmac_mode_bad_signature_does_not_burn_challenge(client, hmac_mode):
+    """Test: a wrong signature is rejected without consuming the challenge"""
+    address = utils.get_test_w3addres()
+    message = client.post('/api/auth/challenge', json={'address': address}).get_json()['message']
+    other_message = client.post('/api/auth/challenge', json={'address': address}).get_json()['message']
+
+    # Signed over another message: recovers a different address
+    response = client.post('/api/auth/verify', json={
+        'address': address,
+        'signature': f"0x{utils.sign_message_with_private_key(other_message)}",
+        'message': message
+    })
+    assert response.status_code == 401
+
+    response = client.post('/api/auth/verify', json={
+        'address': address,
+        'signature': f"0x{utils.sign_message_with_private_key(message)}",
+        'message': message
+    })
+    assert response.status_code == 200, response.get_json()
@@ -0,0 +1,136 @@
+# tests/test_circuit_breaker.py
+import pytest
+from app import metrics, challenge_store
+from app import circuit_breaker as cb
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.challenge_store import BreakerChallengeStore, MemoryChallengeStore, ChallengeStoreUnavailableError
+
+ADDRESS = "0x742d35Cc6634C0532925a3b8D4C7d26990d0f7f6"
+CHALLENGE = {'challenge': 'abc', 'message': 'Sign this message', 'expires_at': '2025-01-01T00:00:00'}
+
+
+class FailingStore(challenge_store.ChallengeStore):
+    """Challenge store that fails like an unreachable Redis and counts calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def put(self, address, challenge_data, ttl):
+        self.calls += 1
+        raise ConnectionError("Timeout connecting to server")
+
+    def consume(self, address):
+        self.calls += 1
+        raise ConnectionError("Timeout connecting to server")
+
+    def claim(self, key, ttl):
+        self.calls += 1
+        raise ConnectionError("Timeout connecting to server")
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Start every test with empty counters and gauges."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for the breaker."""
+    now = [1000.0]
+    monkeypatch.setattr(cb.time, 'monotonic', lambda: now[0])
+    return now
+
+def fail():
+    raise ConnectionError("boom")
+
+def test_breaker_opens_after_threshold_failures(clock):
+    """Test: consecutive failures open the breaker, then calls fail fast"""
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=10)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+    assert breaker.state == cb.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'not called')
+    counters = metrics.snapshot()['counters']
+    assert counters['test_breaker_opened'] == 1
+    assert counters['test_breaker_rejected'] == 1
+
+def test_breaker_success_resets_failure_count(clock):
+    """Test: failures must be consecutive to open the breaker"""
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=10)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    assert breaker.state == cb.CLOSED
+
+def test_breaker_half_open_trial_closes_or_reopens(clock):
+    """Test: after reset_timeout one trial call decides the next state"""
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=10)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    clock[0] += 10
+    assert breaker.state == cb.HALF_OPEN
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == cb.OPEN
+
+    clock[0] += 10
+    assert breaker.allow() is True
+    # Only one trial at a time
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == cb.CLOSED
+
+def test_breaker_state_is_exported_as_gauge(clock):
+    """Test: the breaker state is visible in the metrics snapshot"""
+    breaker = CircuitBreaker('redis', failure_threshold=1, reset_timeout=10)
+    assert metrics.snapshot()['gauges']['redis_breaker_state'] == 0
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert metrics.snapshot()['gauges']['redis_breaker_state'] == 2
+
+    clock[0] += 10
+    breaker.call(lambda: None)
+    assert metrics.snapshot()['gauges']['redis_breaker_state'] == 0
+
+def test_breaker_store_falls_back_to_local_store(clock):
+    """Test: challenges are kept in the fallback store while the primary fails"""
+    primary = FailingStore()
+    store = BreakerChallengeStore(primary, CircuitBreaker('challenge_store', failure_threshold=2), MemoryChallengeStore())
+
+    store.put(ADDRESS, CHALLENGE, ttl=60)
+    assert store.consume(ADDRESS) == CHALLENGE
+    assert store.consume(ADDRESS) == {}
+    # The breaker opened after two failures, Redis is no longer touched
+    assert primary.calls == 2
+    assert metrics.snapshot()['counters']['challenge_store_fallback'] == 3
+
+def test_breaker_store_without_fallback_fails_fast(clock):
+    """Test: without a fallback the store raises a retryable error"""
+    primary = FailingStore()
+    store = BreakerChallengeStore(primary, CircuitBreaker('challenge_store', failure_threshold=1))
+
+    with pytest.raises(ChallengeStoreUnavailableError):
+        store.put(ADDRESS, CHALLENGE, ttl=60)
+    with pytest.raises(ChallengeStoreUnavailableError):
+        store.consume(ADDRESS)
+    assert primary.calls == 1
+
+def test_challenge_endpoint_returns_503_when_store_is_down(client, monkeypatch):
+    """Test: an unavailable challenge store answers 503 instead of hanging"""
+    store = BreakerChallengeStore(FailingStore(), CircuitBreaker('challenge_store', failure_threshold=1))
+    monkeypatch.setattr(challenge_store, 'store', store)
+
+    response = client.post('/api/auth/challenge', json={'address': ADDRESS})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
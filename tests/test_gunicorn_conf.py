@@ -0,0 +1,81 @@
+# tests/test_gunicorn_conf.py
+import importlib.util
+import os
+import sys
+import time
+import types
+import pytest
+from app import utils, metrics, metrics_export
+from app.models import db
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+def load_conf(monkeypatch, **env):
+    """Load gunicorn.conf.py as gunicorn does, with GUNICORN_* variables set."""
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    spec = importlib.util.spec_from_file_location('w3tasq_gunicorn_conf', CONF_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_sizing_is_derived_from_cpus(monkeypatch):
+    """Test: each worker class gets its own default sizing"""
+    conf = load_conf(monkeypatch)
+
+    assert conf.derive_sizing('sync', 2) == (5, 1)
+    assert conf.derive_sizing('gthread', 2) == (3, 4)
+    assert conf.derive_sizing('gevent', 2) == (2, 1)
+
+def test_environment_overrides_config(monkeypatch):
+    """Test: GUNICORN_* variables win over the app configuration"""
+    conf = load_conf(monkeypatch, GUNICORN_WORKER_CLASS='sync', GUNICORN_WORKERS='7', GUNICORN_MAX_REQUESTS='50')
+
+    assert conf.worker_class == 'sync'
+    assert conf.workers == 7
+    assert conf.threads == 1
+    assert conf.max_requests == 50
+    assert conf.max_requests_jitter > 0
+    assert conf.preload_app is True
+
+def test_gevent_is_not_preloaded(monkeypatch):
+    """Test: gevent workers load the app after monkey patching"""
+    conf = load_conf(monkeypatch, GUNICORN_WORKER_CLASS='gevent')
+
+    assert conf.preload_app is False
+    assert conf.worker_connections > 0
+
+def test_invalid_worker_class_is_rejected(monkeypatch):
+    """Test: a typo in the worker class fails at startup"""
+    with pytest.raises(ValueError):
+        load_conf(monkeypatch, GUNICORN_WORKER_CLASS='eventlet')
+
+def test_post_fork_resets_connection_pools(monkeypatch, app):
+    """Test: a forked worker drops the master's database and Redis pools"""
+    conf = load_conf(monkeypatch)
+    monkeypatch.setitem(sys.modules, 'app.main', types.SimpleNamespace(app=app))
+    reset_calls = []
+    monkeypatch.setattr(utils, 'reset_redis_pool', lambda: reset_calls.append('redis'))
+    # Spy only: really disposing would drop the in-memory test database
+    with app.app_context():
+        monkeypatch.setattr(db.engine, 'dispose', lambda close=True: reset_calls.append(('db', close)))
+
+    conf.post_fork(server=None, worker=None)
+
+    assert reset_calls == [('db', False), 'redis']
+
+def test_post_fork_resets_inherited_metrics(monkeypatch, app):
+    """Test: a forked worker reports neither the master's startup metrics nor its uptime"""
+    conf = load_conf(monkeypatch)
+    monkeypatch.setitem(sys.modules, 'app.main', types.SimpleNamespace(app=app))
+    monkeypatch.setattr(utils, 'reset_redis_pool', lambda: None)
+    with app.app_context():
+        monkeypatch.setattr(db.engine, 'dispose', lambda close=True: None)
+    metrics.inc('sql_queries', 12)  # Recorded by the master while loading the app
+    monkeypatch.setattr(metrics_export, '_started_at', time.time() - 3600)
+
+    conf.post_fork(server=None, worker=None)
+
+    assert 'sql_queries' not in metrics.snapshot()['counters']
+    assert metrics_export.process_gauges()['process_uptime_seconds'] < 60
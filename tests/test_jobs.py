@@ -0,0 +1,188 @@
+# tests/test_jobs.py
+from datetime import datetime, timedelta
+import pytest
+from app import metrics, db_utils, jobs
+from app.jobs import Job, JobScheduler, LeaderLock, SQLiteLeaderLock
+from app.models import db, Task
+
+
+class DenyingLock(LeaderLock):
+    """Lock held by another process."""
+
+    def acquire(self, name, ttl):
+        return False
+
+
+class GrantingLock(LeaderLock):
+    def __init__(self):
+        self.calls = []
+
+    def acquire(self, name, ttl):
+        self.calls.append((name, ttl))
+        return True
+
+
+@pytest.fixture
+def make_tasks(_db, user1):
+    """Create tasks for user1 directly in the database, removed after the test."""
+    created = []
+
+    def make(count, **fields):
+        tasks = [Task(user_id=user1.id, title=f'Job task {i}', **fields) for i in range(count)]
+        _db.session.add_all(tasks)
+        _db.session.commit()
+        created.extend(task.id for task in tasks)
+        return [task.id for task in tasks]
+
+    yield make
+    Task.query.filter(Task.id.in_(created)).delete(synchronize_session=False)
+    _db.session.commit()
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def _statuses(_db, ids):
+    _db.session.expire_all()
+    return sorted(task.status for task in Task.query.filter(Task.id.in_(ids)))
+
+def test_archive_completed_tasks_in_chunks(_db, make_tasks):
+    """Test: old completed tasks are archived across several chunks, recent and active ones are not"""
+    old = datetime.utcnow() - timedelta(days=30)
+    old_completed = make_tasks(7, status=1)
+    recent_completed = make_tasks(2, status=1)
+    old_active = make_tasks(2, status=0)
+    # updated_at is set on every update, so backdate it with a bulk UPDATE
+    Task.query.filter(Task.id.in_(old_completed + old_active)).update({'updated_at': old}, synchronize_session=False)
+    _db.session.commit()
+
+    assert db_utils.archive_completed_tasks(7, chunk_size=3) == 7
+
+    assert _statuses(_db, old_completed) == [2] * 7
+    assert _statuses(_db, recent_completed) == [1, 1]
+    assert _statuses(_db, old_active) == [0, 0]
+    # A second sweep has nothing left to do
+    assert db_utils.archive_completed_tasks(7, chunk_size=3) == 0
+
+def test_mark_overdue_tasks(_db, make_tasks):
+    """Test: only active tasks past their deadline are flagged, once"""
+    past = datetime.utcnow() - timedelta(hours=1)
+    future = datetime.utcnow() + timedelta(days=1)
+    late = make_tasks(3, deadline=past)
+    on_time = make_tasks(1, deadline=future)
+    done = make_tasks(1, deadline=past, status=1)
+    make_tasks(1)  # No deadline
+
+    assert db_utils.mark_overdue_tasks(chunk_size=2) == 3
+    assert db_utils.mark_overdue_tasks(chunk_size=2) == 0
+
+    _db.session.expire_all()
+    assert all(_db.session.get(Task, task_id).overdue for task_id in late)
+    assert not _db.session.get(Task, on_time[0]).overdue
+    assert not _db.session.get(Task, done[0]).overdue
+
+def test_ensure_schema_tolerates_concurrent_migration(app, _db, monkeypatch):
+    """Test: a worker that sees tasks.overdue missing after another one added it starts normally"""
+    real_inspect = db_utils.inspect
+
+    class StaleInspector:
+        """Column list read before the other worker's ALTER TABLE."""
+
+        def __init__(self, engine):
+            self.inspector = real_inspect(engine)
+
+        def get_columns(self, table):
+            return [column for column in self.inspector.get_columns(table) if column['name'] != 'overdue']
+
+        def __getattr__(self, name):
+            return getattr(self.inspector, name)
+
+    monkeypatch.setattr(db_utils, 'inspect', StaleInspector)
+
+    db_utils.ensure_schema()
+
+    assert 'overdue' in {column['name'] for column in real_inspect(db.engine).get_columns('tasks')}
+
+def test_sqlite_leader_lock_is_exclusive_until_expiry(tmp_path, monkeypatch):
+    """Test: a second holder is refused while the lock is live and admitted after it expires"""
+    path = str(tmp_path / 'locks' / 'jobs.db')
+    first, second = SQLiteLeaderLock(path), SQLiteLeaderLock(path)
+    now = [1000.0]
+    monkeypatch.setattr(jobs.time, 'time', lambda: now[0])
+
+    assert first.acquire('archive_completed', 60) is True
+    assert second.acquire('archive_completed', 60) is False
+    # Locks are per job
+    assert second.acquire('mark_overdue', 60) is True
+
+    now[0] += 61
+    assert second.acquire('archive_completed', 60) is True
+    assert first.acquire('archive_completed', 60) is False
+
+def test_scheduler_skips_jobs_locked_elsewhere(app):
+    """Test: a job whose lock is held by another process does not run here"""
+    calls = []
+    scheduler = JobScheduler(app, DenyingLock(), [Job('noop', lambda app: calls.append(1) or 0, 60)])
+
+    scheduler.run_pending()
+
+    assert calls == []
+    assert scheduler.report() == {}
+
+def test_scheduler_runs_due_jobs_once_per_interval(app):
+    """Test: due jobs run under the lock, record rows and duration, and wait for their next interval"""
+    lock = GrantingLock()
+    scheduler = JobScheduler(app, lock, [Job('sweep', lambda app: 4, 60)])
+
+    scheduler.run_pending()
+    scheduler.run_pending()
+
+    assert lock.calls == [('sweep', 60)]
+    assert scheduler.report()['sweep']['rows'] == 4
+    snapshot = metrics.snapshot()
+    assert snapshot['counters']['job_sweep_rows'] == 4
+    assert snapshot['timers']['job_sweep']['count'] == 1
+
+def test_failing_job_does_not_stop_scheduler(app):
+    """Test: an exception in a job is logged and the next job still runs"""
+    def broken(app):
+        raise RuntimeError("database is locked")
+
+    scheduler = JobScheduler(app, GrantingLock(), [Job('broken', broken, 60), Job('ok', lambda app: 1, 60)])
+
+    scheduler.run_pending()
+
+    assert 'broken' not in scheduler.report()
+    assert scheduler.report()['ok']['rows'] == 1
+
+def test_run_jobs_cli_once(app, _db, make_tasks):
+    """Test: `flask run-jobs --once` runs every job and prints its row count"""
+    make_tasks(2, deadline=datetime.utcnow() - timedelta(minutes=5))
+
+    result = app.test_cli_runner().invoke(args=['run-jobs', '--once'])
+
+    assert result.exit_code == 0, result.output
+    assert 'archive_completed: ' in result.output
+    assert 'mark_overdue: 2 rows' in result.output
+
+def test_create_task_with_deadline(authenticated_client_for_user1, _db):
+    """Test: POST /api/tasks accepts an ISO 8601 deadline and stores it in UTC"""
+    response = authenticated_client_for_user1.post('/api/tasks', json={
+        'title': 'With deadline', 'deadline': '2030-01-02T12:00:00+02:00'
+    })
+
+    assert response.status_code == 201
+    task = response.get_json()['task']
+    assert task['deadline'] == '2030-01-02T10:00:00'
+    assert task['overdue'] is False
+    _db.session.delete(_db.session.get(Task, task['id']))
+    _db.session.commit()
+
+def test_create_task_with_invalid_deadline(authenticated_client_for_user1):
+    """Test: an unparsable deadline is rejected"""
+    response = authenticated_client_for_user1.post('/api/tasks', json={'title': 'Bad', 'deadline': 'tomorrow'})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Deadline must be an ISO 8601 date and time'
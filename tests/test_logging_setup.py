@@ -0,0 +1,133 @@
+# tests/test_logging_setup.py
+import json
+import logging
+import os
+from logging.handlers import QueueHandler
+import pytest
+from flask import Flask
+from app import logging_setup
+
+
+@pytest.fixture
+def configure_logging(app, tmp_path):
+    """Log the 'w3tasq' tree to a temporary file with extra settings, restore the test app's logging afterwards."""
+    def configure(**settings):
+        log_app = Flask('logging_test')
+        log_app.config.update(
+            LOG_LEVEL='INFO', LOG_FORMAT='%(name)s %(levelname)s %(message)s', LOG_TO_FILE=True,
+            LOG_FILE=str(tmp_path / 'w3tasq.log'), LOG_QUEUE=True,
+        )
+        log_app.config.update(settings)
+        logging_setup.init_logging(log_app)
+        return log_app.config['LOG_FILE']
+    yield configure
+    logging_setup.init_logging(app)
+
+@pytest.fixture
+def file_logging(configure_logging):
+    return configure_logging()
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+def test_records_are_written_by_the_listener(file_logging):
+    """Test: the logger only enqueues; the listener writes the records to the file"""
+    logger = logging.getLogger('w3tasq.test')
+    handlers = logging.getLogger('w3tasq').handlers
+    assert len(handlers) == 1 and isinstance(handlers[0], QueueHandler)
+
+    logger.info("Task %s updated by %s", 42, '0xabc')
+    logging_setup.stop_logging()  # Drains the queue
+
+    assert 'w3tasq.test INFO Task 42 updated by 0xabc' in _read(file_logging)
+
+def test_suppressed_levels_do_not_format_arguments(file_logging):
+    """Test: arguments of a filtered-out call are never turned into strings"""
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatted a suppressed record")
+
+    logging.getLogger('w3tasq.test').debug("Details: %s", Expensive())
+    logging_setup.stop_logging()
+
+    assert 'Details' not in _read(file_logging)
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork()")
+def test_forked_child_gets_its_own_listener(file_logging):
+    """Test: records logged in a forked worker are written (preload_app)"""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            logging.getLogger('w3tasq.test').warning("from child %s", os.getpid())
+            logging_setup.stop_logging()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert f'from child {pid}' in _read(file_logging)
+
+def _json_lines(path):
+    return [json.loads(line) for line in _read(path).splitlines()]
+
+def test_json_format_includes_request_id_and_extra_fields(app, configure_logging):
+    """Test: LOG_JSON writes one object per record with the request id and structured extras"""
+    path = configure_logging(LOG_JSON=True)
+    with app.test_request_context('/api/tasks', headers={'X-Request-ID': 'req-1'}):
+        logging_setup._start_request()
+        logging.getLogger('w3tasq.access').info("GET %s", '/api/tasks', extra={'event': 'access', 'status': 200})
+        logging_setup._end_request()
+    logging_setup.stop_logging()
+
+    entry, = _json_lines(path)
+    assert entry['level'] == 'INFO' and entry['logger'] == 'w3tasq.access'
+    assert entry['message'] == 'GET /api/tasks'
+    assert entry['request_id'] == 'req-1'
+    assert entry['event'] == 'access' and entry['status'] == 200
+    assert entry['ts'].endswith('+00:00')
+
+def test_request_id_header(client):
+    """Test: a valid X-Request-ID is echoed back, an invalid one replaced by a generated id"""
+    response = client.get('/api/tasks', headers={'X-Request-ID': 'abc-123'})
+    assert response.headers['X-Request-ID'] == 'abc-123'
+
+    response = client.get('/api/tasks', headers={'X-Request-ID': 'bad id <script>'})
+    generated = response.headers['X-Request-ID']
+    assert len(generated) == 16 and ' ' not in generated
+    assert client.get('/api/tasks').headers['X-Request-ID'] != generated
+
+def test_sampling_keeps_warnings(configure_logging):
+    """Test: a sample rate of 0 drops informational records of the event, never warnings"""
+    path = configure_logging(LOG_SAMPLE_RATES={'noisy': 0.0})
+    logger = logging.getLogger('w3tasq.test')
+    logger.info("noisy info", extra={'event': 'noisy'})
+    logger.warning("noisy warning", extra={'event': 'noisy'})
+    logger.info("other info", extra={'event': 'other'})
+    logging_setup.stop_logging()
+
+    content = _read(path)
+    assert 'noisy info' not in content
+    assert 'noisy warning' in content and 'other info' in content
+
+def test_sampling_is_decided_per_request(app):
+    """Test: every record of one request gets the same decision, about `rate` of requests are kept"""
+    sampling = logging_setup.SamplingFilter({'noisy': 0.3})
+
+    def record():
+        return logging.LogRecord('w3tasq.test', logging.INFO, __file__, 0, "line", None, None)
+
+    kept_requests = 0
+    for i in range(1000):
+        with app.test_request_context('/', headers={'X-Request-ID': f'request-{i}'}):
+            logging_setup._start_request()
+            records = [record() for _ in range(3)]
+            decisions = set()
+            for rec in records:
+                rec.event = 'noisy'
+                decisions.add(sampling.filter(rec))
+            logging_setup._end_request()
+        assert len(decisions) == 1
+        if decisions.pop():
+            kept_requests += 1
+            assert all(rec.sample_rate == 0.3 for rec in records)
+    assert 200 < kept_requests < 400
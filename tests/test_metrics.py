@@ -0,0 +1,52 @@
+# tests/test_metrics.py
+import pytest
+from app import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Start every test with empty counters and timers."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_counters_accumulate():
+    """Test: inc() adds up values per counter name"""
+    metrics.inc('challenges_generated')
+    metrics.inc('challenges_generated', 2)
+
+    assert metrics.snapshot()['counters']['challenges_generated'] == 3
+
+def test_timed_records_count_total_and_max():
+    """Test: timed() records one observation per block"""
+    with metrics.timed('redis_store_challenge'):
+        pass
+    metrics.observe('redis_store_challenge', 0.5)
+
+    timer = metrics.snapshot()['timers']['redis_store_challenge']
+    assert timer['count'] == 2
+    assert timer['max'] == 0.5
+    assert timer['total'] >= 0.5
+    assert timer['avg'] == pytest.approx(timer['total'] / 2)
+
+def test_timed_counts_errors_and_reraises():
+    """Test: a failing block is timed, counted as an error and re-raised"""
+    with pytest.raises(ConnectionError):
+        with metrics.timed('redis_consume_challenge'):
+            raise ConnectionError("redis is down")
+
+    snapshot = metrics.snapshot()
+    assert snapshot['timers']['redis_consume_challenge']['count'] == 1
+    assert snapshot['counters']['redis_consume_challenge_errors'] == 1
+
+def test_histograms_are_kept_per_label_set():
+    """Test: observe_histogram() buckets observations per name and labels"""
+    metrics.observe_histogram('http_request_duration', 0.004, {'route': '/a'})
+    metrics.observe_histogram('http_request_duration', 0.2, {'route': '/a'})
+    metrics.observe_histogram('http_request_duration', 0.2, {'route': '/b'})
+
+    histograms = {h['labels']['route']: h for h in metrics.snapshot()['histograms']}
+    assert histograms['/a']['count'] == 2
+    assert histograms['/a']['buckets'][0] == 1
+    assert histograms['/a']['buckets'][metrics.BUCKETS.index(0.25)] == 1
+    assert histograms['/b']['count'] == 1
@@ -0,0 +1,119 @@
+# tests/test_metrics_export.py
+import json
+import os
+import pytest
+from app import metrics, metrics_export
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def _snapshot(pid, counters=None, gauges=None, histograms=None):
+    return {'pid': pid, 'counters': counters or {}, 'gauges': gauges or {}, 'timers': {},
+            'histograms': histograms or []}
+
+def _write(directory, snapshot):
+    with open(os.path.join(directory, f"{snapshot['pid']}.json"), 'w') as f:
+        json.dump(snapshot, f)
+
+def test_metrics_endpoint_exposes_route_histograms(authenticated_client_for_user1, task1):
+    """Test: /metrics has a latency histogram per route, method and status"""
+    client = authenticated_client_for_user1
+    client.get('/api/tasks')
+    client.get('/api/tasks')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    body = response.get_data(as_text=True)
+    assert '# TYPE w3tasq_http_request_duration_seconds histogram' in body
+    assert ('w3tasq_http_request_duration_seconds_count'
+            '{method="GET",route="/api/tasks",status="200"} 2') in body
+    assert 'w3tasq_http_request_phase_seconds_count{phase="db",route="/api/tasks"} 2' in body
+    assert 'w3tasq_sql_queries_total' in body
+    assert f'w3tasq_process_resident_memory_bytes{{pid="{os.getpid()}"}}' in body
+
+def test_metrics_endpoint_is_local_only_without_token(client):
+    """Test: without METRICS_TOKEN only localhost may read /metrics"""
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.7'}).status_code == 403
+
+def test_metrics_endpoint_with_token(client, app, monkeypatch):
+    """Test: with METRICS_TOKEN the bearer token is required, from any address"""
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-secret')
+    remote = {'REMOTE_ADDR': '10.0.0.7'}
+
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}, environ_base=remote).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}, environ_base=remote)
+    assert response.status_code == 200
+
+def test_metrics_endpoint_rejects_non_ascii_token(client, app, monkeypatch):
+    """Test: a non-ASCII bearer token is refused, not a server error"""
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-secret')
+
+    assert client.get('/metrics', headers={'Authorization': 'Bearer café'}).status_code == 403
+
+def test_metrics_endpoint_requires_token_when_configured(client, app, monkeypatch):
+    """Test: with METRICS_REQUIRE_TOKEN and no token, not even localhost may read /metrics"""
+    monkeypatch.setitem(app.config, 'METRICS_REQUIRE_TOKEN', True)
+
+    assert client.get('/metrics').status_code == 403
+
+def test_histogram_buckets_are_cumulative():
+    """Test: rendered buckets count every observation at or below their bound"""
+    for seconds in (0.001, 0.02, 0.02, 3.0, 60.0):
+        metrics.observe_histogram('op', seconds, {'kind': 'a'})
+
+    body = metrics_export.render(metrics_export.merge([metrics_export.process_snapshot()]))
+
+    assert 'w3tasq_op_seconds_bucket{kind="a",le="0.005"} 1' in body
+    assert 'w3tasq_op_seconds_bucket{kind="a",le="0.025"} 3' in body
+    assert 'w3tasq_op_seconds_bucket{kind="a",le="5.0"} 4' in body
+    assert 'w3tasq_op_seconds_bucket{kind="a",le="+Inf"} 5' in body
+    assert 'w3tasq_op_seconds_count{kind="a"} 5' in body
+
+def test_workers_are_aggregated(tmp_path, monkeypatch):
+    """Test: counters and histograms are summed over workers, gauges kept per worker"""
+    directory = str(tmp_path)
+    histogram = {'name': 'op', 'labels': {'route': '/x'}, 'buckets': [1] + [0] * 10, 'count': 1, 'sum': 0.001}
+    _write(directory, _snapshot(1001, {'rate_limited': 2}, {'process_threads': 4}, [histogram]))
+    _write(directory, _snapshot(1002, {'rate_limited': 3}, {'process_threads': 6}, [histogram]))
+    monkeypatch.setattr(metrics_export, 'metrics_dir', directory)
+    metrics.inc('rate_limited')
+
+    merged = metrics_export.collect()
+
+    assert merged['counters']['rate_limited'] == 6
+    assert merged['histograms'][('op', (('route', '/x'),))]['count'] == 2
+    assert merged['gauges'][('process_threads', 1001)] == 4
+    assert merged['gauges'][('process_threads', 1002)] == 6
+    # This process wrote its own snapshot before reading the directory
+    assert os.path.exists(os.path.join(directory, f"{os.getpid()}.json"))
+
+def test_dead_worker_counters_are_kept(tmp_path):
+    """Test: a reaped worker's counters move to the archive and its gauges disappear"""
+    directory = str(tmp_path)
+    _write(directory, _snapshot(1001, {'rate_limited': 2}, {'process_threads': 4}))
+    _write(directory, _snapshot(1002, {'rate_limited': 3}, {'process_threads': 6}))
+
+    metrics_export.mark_process_dead(1001, directory)
+    metrics_export.mark_process_dead(1001, directory)  # Reaped twice: no double count
+
+    merged = metrics_export.merge(metrics_export._read_all(directory))
+    assert merged['counters']['rate_limited'] == 5
+    assert ('process_threads', 1001) not in merged['gauges']
+    assert not os.path.exists(os.path.join(directory, '1001.json'))
+
+def test_reset_dir_removes_previous_run(tmp_path):
+    """Test: the master starts from an empty directory"""
+    directory = str(tmp_path)
+    _write(directory, _snapshot(1001, {'rate_limited': 2}))
+
+    metrics_export.reset_dir(directory)
+
+    assert metrics_export.merge(metrics_export._read_all(directory))['counters'] == {}
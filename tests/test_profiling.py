@@ -0,0 +1,71 @@
+# tests/test_profiling.py
+import os
+import pytest
+from flask import Flask
+from app import profiling
+
+
+@pytest.fixture
+def profile_dir(app, tmp_path, monkeypatch):
+    directory = tmp_path / 'profiles'
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', str(directory))
+    return directory
+
+def test_profile_header_writes_report(authenticated_client_for_user1, task1, profile_dir):
+    """Test: X-Profile with the token writes a call tree and top functions, named in X-Profile-Id"""
+    response = authenticated_client_for_user1.get(
+        '/api/tasks', headers={'X-Profile': 'test-profile-token', 'X-Request-ID': 'slow-user-1'})
+
+    assert response.status_code == 200
+    profile_id = response.headers['X-Profile-Id']
+    assert profile_id.endswith('-slow-user-1')
+    report = (profile_dir / f'{profile_id}.txt').read_text()
+    assert report.startswith('GET /api/tasks -> 200 in ')
+    assert '== Call tree ==' in report and '== Top functions by own time ==' in report
+    assert 'get_user_tasks (app.py:' in report
+    assert (profile_dir / f'{profile_id}.prof').exists()
+
+def test_wrong_token_is_not_profiled(client, profile_dir):
+    """Test: without the right token nothing is profiled"""
+    response = client.get('/api/tasks', headers={'X-Profile': 'guess'})
+
+    assert 'X-Profile-Id' not in response.headers
+    assert not profile_dir.exists()
+
+def test_non_ascii_token_is_not_profiled(client, profile_dir):
+    """Test: a non-ASCII X-Profile value is just a wrong token, not a server error"""
+    response = client.get('/api/tasks', headers={'X-Profile': 'café'})
+
+    assert response.status_code == 401
+    assert 'X-Profile-Id' not in response.headers
+
+def test_stored_profiles_are_capped(client, app, profile_dir, monkeypatch):
+    """Test: only the newest PROFILE_MAX_FILES profiles are kept"""
+    monkeypatch.setitem(app.config, 'PROFILE_MAX_FILES', 2)
+    ids = [client.get('/login', headers={'X-Profile': 'test-profile-token', 'X-Request-ID': f'r{i}'})
+           .headers['X-Profile-Id'] for i in range(4)]
+
+    assert sorted(os.listdir(profile_dir)) == sorted(f'{profile_id}{ext}' for profile_id in ids[2:]
+                                                     for ext in ('.prof', '.txt'))
+
+def test_prune_keeps_newest_by_write_time(tmp_path):
+    """Test: profiles written in the same second are pruned by write time, not by request id"""
+    for age, stem in enumerate(['20260101-120000-zzz', '20260101-120000-mmm', '20260101-120000-aaa']):
+        for extension in ('.txt', '.prof'):
+            path = tmp_path / f'{stem}{extension}'
+            path.write_text('')
+            os.utime(path, ns=(10**18 - age, 10**18 - age))
+
+    profiling.prune(str(tmp_path), keep=2)
+
+    assert sorted(os.listdir(tmp_path)) == ['20260101-120000-mmm.prof', '20260101-120000-mmm.txt',
+                                            '20260101-120000-zzz.prof', '20260101-120000-zzz.txt']
+
+def test_disabled_profiling_installs_no_hooks():
+    """Test: without token and sample rate, init_profiling is a no-op"""
+    app = Flask('profiling_test')
+    app.config.update(PROFILE_TOKEN=None, PROFILE_SAMPLE_RATE=0.0)
+
+    profiling.init_profiling(app)
+
+    assert not app.before_request_funcs and not app.after_request_funcs and not app.teardown_request_funcs
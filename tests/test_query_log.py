@@ -0,0 +1,66 @@
+# tests/test_query_log.py
+import logging
+import pytest
+from sqlalchemy import text
+from app import metrics, query_log
+from app.models import Task
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+@pytest.mark.parametrize('parameters, executemany, expected', [
+    ((1, '0xabc', None), False, '(int, str[5], NoneType)'),
+    ({'user_id': 3, 'title': 'hello'}, False, '{user_id: int, title: str[5]}'),
+    ([(1, 'a'), (2, 'bb')], True, '2 x (int, str[1])'),
+    ((), False, '()'),
+])
+def test_parameter_shapes_hide_values(parameters, executemany, expected):
+    """Test: parameters are described by type and length only"""
+    assert query_log.parameter_shapes(parameters, executemany) == expected
+
+def test_record_queries_counts_statements(_db, user1):
+    """Test: the recorder sees every statement of the block"""
+    user_id = user1.id
+    metrics.reset()
+    with query_log.record_queries() as recorder:
+        Task.query.filter_by(user_id=user_id).all()
+        Task.query.filter_by(user_id=user_id).all()
+
+    assert recorder.count == 2
+    assert list(recorder.counts().values()) == [2]
+    assert metrics.snapshot()['counters']['sql_queries'] == 2
+
+def test_slow_query_is_logged_with_shapes(_db, monkeypatch, caplog):
+    """Test: statements over the threshold are logged without parameter values"""
+    monkeypatch.setattr(query_log, '_slow_query_seconds', 0)
+    caplog.set_level(logging.WARNING, logger='w3tasq.sql')
+
+    _db.session.execute(text("SELECT :address AS address"), {'address': '0xdeadbeef'}).all()
+
+    messages = [record.getMessage() for record in caplog.records if record.name == 'w3tasq.sql']
+    assert len(messages) == 1
+    assert 'SELECT ? AS address' in messages[0]
+    assert '(str[10])' in messages[0]
+    assert '0xdeadbeef' not in messages[0]
+    assert metrics.snapshot()['counters']['sql_slow_queries'] == 1
+
+def test_repeated_statement_in_request_is_reported(app, _db, user1, monkeypatch, caplog):
+    """Test: the same statement executed N times in a request is flagged as a possible N+1"""
+    monkeypatch.setitem(app.config, 'SQL_NPLUSONE_THRESHOLD', 3)
+    caplog.set_level(logging.WARNING, logger='w3tasq.sql')
+    user_id = user1.id
+
+    with app.test_request_context('/api/tasks'):
+        app.preprocess_request()
+        for _ in range(3):
+            _db.session.get(Task, 0)
+            Task.query.filter_by(user_id=user_id).first()
+        app.process_response(app.response_class())
+
+    messages = [record.getMessage() for record in caplog.records if record.name == 'w3tasq.sql']
+    assert any(message.startswith('Possible N+1 on /api/tasks: 3 executions of SELECT') for message in messages)
+    assert metrics.snapshot()['counters']['sql_nplusone'] >= 1
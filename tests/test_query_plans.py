@@ -0,0 +1,111 @@
+# tests/test_query_plans.py
+"""
+Query plans of the hot db_utils queries.
+
+Each test records the SQL a function emits (query_log.record_queries) on a
+seeded database and runs EXPLAIN QUERY PLAN on every statement. A full
+table scan (`SCAN <table>`) or a sort in a temporary B-tree fails the test:
+both grow with the table, so the query would get slower with every task.
+"""
+
+import re
+import pytest
+from app import db_utils, query_log
+from app.models import db, User, Task
+
+# Plan steps that read or sort more rows than the query returns
+BAD_STEP = re.compile(r'^SCAN (?!CONSTANT ROW)|USE TEMP B-TREE')
+
+
+def query_plans(recorder):
+    """[(statement, [plan step details])] of the recorded SELECT/UPDATE/DELETE statements."""
+    plans = []
+    connection = db.session.connection()
+    for statement, parameters in zip((statement for statement, _ in recorder.statements), recorder.parameters):
+        if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            continue
+        if isinstance(parameters, list):
+            parameters = parameters[0]  # executemany: one row is enough for the plan
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plans.append((statement, [row[3] for row in rows]))
+    return plans
+
+
+def assert_uses_indexes(call):
+    """Run call() and fail if any statement it emitted scans a table or sorts in a temp B-tree; returns the plans."""
+    with query_log.record_queries() as recorder:
+        call()
+    plans = query_plans(recorder)
+    assert plans, "no statements recorded"
+    bad = [f"{' '.join(statement.split())}\n    {'; '.join(steps)}"
+           for statement, steps in plans if any(BAD_STEP.search(step) for step in steps)]
+    assert not bad, "Queries not served by an index:\n" + '\n'.join(bad)
+    return plans
+
+
+@pytest.fixture
+def populated(seeded):
+    """Seeded tasks; returns (heaviest user id, a task id of that user)."""
+    user_ids = seeded(30, 3000, seed=3)
+    user_id = user_ids[0]
+    task_id = Task.query.filter_by(user_id=user_id, status=0).order_by(Task.id).first().id
+    db.session.remove()
+    return user_id, task_id
+
+def test_checker_flags_table_scans(populated):
+    """Test: the check itself fails on a query without a usable index"""
+    with pytest.raises(AssertionError, match='SCAN tasks'):
+        assert_uses_indexes(lambda: Task.query.filter_by(title='missing').all())
+
+def test_task_pages(populated):
+    """Test: first and later pages of get_user_tasks_cursor are read from an index, unsorted"""
+    user_id, _ = populated
+    _, cursor, _ = db_utils.get_user_tasks_cursor(user_id, None, 12)
+    db.session.remove()
+
+    assert_uses_indexes(lambda: db_utils.get_user_tasks_cursor(user_id, None, 12))
+    assert_uses_indexes(lambda: db_utils.get_user_tasks_cursor(user_id, cursor, 12))
+
+def test_login_user_lookup(populated):
+    """Test: get_or_create_user finds the wallet through an index"""
+    user_id, _ = populated
+    address = db.session.get(User, user_id).wallet_address
+    db.session.remove()
+
+    assert_uses_indexes(lambda: db_utils.get_or_create_user(address))
+
+def test_task_ownership_and_status_updates(populated):
+    """Test: ownership check, single and batch status updates use primary key lookups"""
+    user_id, task_id = populated
+
+    assert_uses_indexes(lambda: db_utils.is_user_authorized_for_task(user_id, task_id))
+    task = db.session.get(Task, task_id)
+    assert_uses_indexes(lambda: db_utils.update_task_status_internal(task, 1))
+    assert_uses_indexes(lambda: db_utils.update_tasks_status_batch(user_id, [{'id': task_id, 'status': 0}]))
+
+def test_background_sweeps(populated):
+    """Test: every chunk of the archive and overdue sweeps finds its rows through its own index"""
+    archive = assert_uses_indexes(lambda: db_utils.archive_completed_tasks(older_than_days=0, chunk_size=50))
+    overdue = assert_uses_indexes(lambda: db_utils.mark_overdue_tasks(chunk_size=50))
+
+    # A search on status alone would still read every active or completed task
+    assert all('ix_tasks_status_updated_at (status=? AND updated_at<?)' in ' '.join(steps) for _, steps in archive)
+    assert all('ix_tasks_overdue_deadline (status=?' in ' '.join(steps) for _, steps in overdue)
+    assert len(archive) > 1 and len(overdue) > 1  # Several chunks ran
+
+def test_missing_index_is_built_by_cli_not_startup(app, _db):
+    """Test: startup only reports a missing index; `flask create-indexes` builds it once"""
+    index = next(index for index in Task.__table__.indexes if index.name == 'ix_tasks_user_status_priority_id')
+    index.drop(db.engine)
+    try:
+        db_utils.ensure_schema()
+        assert index in db_utils.missing_indexes()
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['create-indexes'])
+        assert result.exit_code == 0, result.output
+        assert 'ix_tasks_user_status_priority_id' in result.output
+        assert db_utils.missing_indexes() == []
+        assert 'All indexes exist' in runner.invoke(args=['create-indexes']).output
+    finally:
+        index.create(db.engine, checkfirst=True)
@@ -0,0 +1,94 @@
+# tests/test_rate_limit.py
+import pytest
+from flask import Flask, request
+from app import metrics, rate_limit, utils
+from app.rate_limit import RateLimiter, MemoryRateLimitBackend
+
+ADDRESS = "0x742d35Cc6634C0532925a3b8D4C7d26990d0f7f6"
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """Install an in-memory limiter with small limits on the auth endpoints."""
+    limiter = RateLimiter(MemoryRateLimitBackend(), {
+        'get_challenge': {'ip': (5, 60), 'wallet': (2, 60)},
+        'verify_signature': {'ip': (1, 60)},
+    })
+    monkeypatch.setattr(rate_limit, 'limiter', limiter)
+    yield limiter
+
+def test_sliding_window_allows_limit_then_rejects():
+    """Test: the window admits `limit` hits, then tells how long to wait"""
+    backend = MemoryRateLimitBackend()
+    rules = [('key', 2, 10)]
+
+    assert backend.hit(rules, now=100.0) == 0
+    assert backend.hit(rules, now=101.0) == 0
+    assert backend.hit(rules, now=102.0) == pytest.approx(8.0)
+    # The first hit leaves the window at t=110
+    assert backend.hit(rules, now=110.5) == 0
+
+def test_rejected_hits_are_not_counted():
+    """Test: a throttled request does not use up any rule"""
+    backend = MemoryRateLimitBackend()
+    assert backend.hit([('ip', 1, 10)], now=0.0) == 0
+    # 'wallet' has room but 'ip' does not: nothing is recorded for 'wallet'
+    assert backend.hit([('ip', 1, 10), ('wallet', 1, 10)], now=1.0) > 0
+    assert backend.hit([('wallet', 1, 10)], now=2.0) == 0
+
+def test_limiter_fails_open_on_backend_error():
+    """Test: a failing backend lets requests through and counts the error"""
+    class FailingBackend(rate_limit.RateLimitBackend):
+        def hit(self, rules, now):
+            raise ConnectionError("Timeout reading from socket")
+
+    metrics.reset()
+    limiter = RateLimiter(FailingBackend(), {'get_challenge': {'ip': (1, 60)}})
+
+    assert limiter.check('get_challenge', ip='127.0.0.1') == 0
+    assert metrics.snapshot()['counters']['rate_limit_errors'] == 1
+
+def test_challenge_is_throttled_per_wallet(client, limiter):
+    """Test: the wallet limit applies on top of the IP limit"""
+    for _ in range(2):
+        assert client.post('/api/auth/challenge', json={'address': ADDRESS}).status_code == 200
+
+    response = client.post('/api/auth/challenge', json={'address': ADDRESS.lower()})
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    # Another wallet from the same IP still gets through
+    other = utils.get_test_w3addres()
+    assert client.post('/api/auth/challenge', json={'address': other}).status_code == 200
+
+def test_throttled_request_skips_the_handler(client, limiter, monkeypatch):
+    """Test: no signature recovery runs for a throttled verify request"""
+    calls = []
+    monkeypatch.setattr(utils, 'verify_signature', lambda *args: calls.append(args) or (False, 'Invalid signature'))
+    payload = {'address': ADDRESS, 'signature': '0x00'}
+
+    assert client.post('/api/auth/verify', json=payload).status_code == 401
+    assert client.post('/api/auth/verify', json=payload).status_code == 429
+    assert len(calls) == 1
+
+def test_unlisted_endpoints_are_not_limited(authenticated_client_for_user1, limiter):
+    """Test: endpoints without rules are never throttled"""
+    for _ in range(10):
+        assert authenticated_client_for_user1.get('/api/tasks').status_code == 200
+
+@pytest.mark.parametrize('forwarded_for', [None, '', '203.0.113.7', '198.51.100.1, 203.0.113.7', 'a,b,c'])
+@pytest.mark.parametrize('hops', [1, 2])
+def test_client_ip_matches_proxy_fix(forwarded_for, hops):
+    """Test: client_ip (ASGI) picks the same address as ProxyFix (WSGI)"""
+    flask_app = Flask(__name__)
+    flask_app.config['PROXY_FIX_X_FOR'] = hops
+    rate_limit.init_proxy_fix(flask_app)
+    flask_app.add_url_rule('/ip', 'ip', lambda: request.remote_addr)
+    headers = {'X-Forwarded-For': forwarded_for} if forwarded_for is not None else {}
+
+    seen = flask_app.test_client().get('/ip', headers=headers, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert seen.get_data(as_text=True) == rate_limit.client_ip('10.0.0.2', forwarded_for, hops)
+
+def test_client_ip_without_trusted_hops_uses_peer():
+    """Test: with PROXY_FIX_X_FOR = 0 a client-sent X-Forwarded-For is ignored"""
+    assert rate_limit.client_ip('10.0.0.2', '203.0.113.7', 0) == '10.0.0.2'
@@ -0,0 +1,44 @@
+# tests/test_seeding.py
+from collections import Counter
+from app.models import User, Task, TaskStatus
+
+
+def _rows(user_ids):
+    tasks = Task.query.filter(Task.user_id.in_(user_ids)).order_by(Task.id).all()
+    first = min(user_ids)
+    return [(task.user_id - first, task.title, task.description, task.priority, task.status,
+             task.deadline, task.created_at) for task in tasks]
+
+def test_same_seed_gives_same_rows(seeded, _db):
+    """Test: seeding is deterministic for a given seed and differs for another"""
+    first = _rows(seeded(20, 300, seed=7, chunk_size=64))
+    second = _rows(seeded(20, 300, seed=7, chunk_size=64))
+    other = _rows(seeded(20, 300, seed=8, chunk_size=64))
+
+    assert len(first) == 300
+    assert first == second
+    assert first != other
+
+def test_distributions(seeded, _db):
+    """Test: tasks per user are skewed towards low ranks; weights and counters are honoured"""
+    user_ids = seeded(50, 2000, skew=1.2, priority_weights=(1, 0, 0), status_weights=(1, 1, 0))
+
+    tasks = Task.query.filter(Task.user_id.in_(user_ids)).all()
+    per_user = Counter(task.user_id for task in tasks)
+    assert per_user[user_ids[0]] > 10 * per_user[user_ids[-1]]
+    assert {task.priority for task in tasks} == {1}
+    assert {task.status for task in tasks} == {TaskStatus.ACTIVE, TaskStatus.COMPLETED}
+    completed = Counter(task.user_id for task in tasks if task.status == TaskStatus.COMPLETED)
+    for user in User.query.filter(User.id.in_(user_ids)):
+        assert user.completed_tasks == completed[user.id]
+    assert all(task.to_dict()['created_at'] for task in tasks[:5])
+
+def test_seed_cli_refuses_non_empty_database(app, _db, task1):
+    """Test: `flask seed` only adds to a database with tasks when --append is given"""
+    users = User.query.count()
+
+    result = app.test_cli_runner().invoke(args=['seed', '--users', '2', '--tasks', '10'])
+
+    assert result.exit_code != 0
+    assert '--append' in result.output
+    assert User.query.count() == users
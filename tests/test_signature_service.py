@@ -0,0 +1,79 @@
+# tests/test_signature_service.py
+import threading
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from app import signature_service
+from app.signature_service import SignatureVerifier
+
+
+def _sign(message):
+    """Sign `message` with a fresh account, return (address, signature hex)."""
+    account = Account.create()
+    signed = Account.sign_message(encode_defunct(text=message), private_key=account.key)
+    return account.address, signed.signature.hex()
+
+def test_recover_address_returns_signer():
+    """Test: recover_address finds the account that signed the message"""
+    address, signature = _sign("Sign this message to authenticate: abc")
+    assert signature_service.recover_address("Sign this message to authenticate: abc", signature) == address
+
+@pytest.mark.parametrize('mode', ['inline', 'thread', 'process'])
+def test_verifier_recovers_in_every_mode(mode):
+    """Test: inline, thread and process modes give the same result"""
+    verifier = SignatureVerifier(mode=mode, workers=1, max_queue=2, timeout=10)
+    try:
+        address, signature = _sign("hello w3tasq")
+        assert verifier.recover("hello w3tasq", signature) == address
+    finally:
+        verifier.shutdown()
+
+def test_verifier_rejects_invalid_mode():
+    """Test: unknown modes are refused at construction"""
+    with pytest.raises(ValueError):
+        SignatureVerifier(mode='gpu')
+
+def test_verifier_rejects_when_queue_is_full():
+    """Test: with every worker and queue slot taken, new work fails fast"""
+    verifier = SignatureVerifier(mode='thread', workers=1, max_queue=0, timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=verifier.call, args=(blocker,))
+    worker.start()
+    try:
+        assert started.wait(5)
+        with pytest.raises(signature_service.VerificationBusyError):
+            verifier.call(lambda: None)
+    finally:
+        release.set()
+        worker.join()
+        verifier.shutdown()
+
+def test_verifier_times_out_slow_work():
+    """Test: pooled work that exceeds the timeout raises VerificationTimeoutError"""
+    verifier = SignatureVerifier(mode='thread', workers=1, max_queue=0, timeout=0.05)
+    release = threading.Event()
+    try:
+        with pytest.raises(signature_service.VerificationTimeoutError):
+            verifier.call(release.wait, 5)
+    finally:
+        release.set()
+        verifier.shutdown()
+
+def test_verifier_stats_report_throughput():
+    """Test: stats() counts recoveries and reports latency"""
+    verifier = SignatureVerifier(mode='inline')
+    before = verifier.stats()['recovered']
+    address, signature = _sign("stats")
+    verifier.recover("stats", signature)
+
+    stats = verifier.stats()
+    assert stats['mode'] == 'inline'
+    assert stats['recovered'] == before + 1
+    assert stats['per_second'] > 0
+    assert stats['max_latency'] > 0
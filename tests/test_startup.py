@@ -0,0 +1,47 @@
+# tests/test_startup.py
+"""
+Startup budget tests.
+Every gunicorn worker and every test run pays for module imports, so the
+web3 stack must stay off the import path and startup must stay in budget.
+"""
+
+import subprocess
+import sys
+from benchmarks import bench_startup
+
+
+def test_import_does_not_load_web3_stack():
+    """Test: importing the application does not import web3 or eth_account"""
+    result = bench_startup.measure_import()
+    assert result['heavy_loaded'] == [], f"Loaded at import time: {result['heavy_loaded']}"
+
+def test_import_time_is_within_budget():
+    """Test: `import app.app` in a fresh interpreter stays within the budget"""
+    result = bench_startup.measure_import()
+    assert result['seconds'] <= bench_startup.IMPORT_BUDGET_SECONDS, \
+        f"Import took {result['seconds']:.3f}s, budget {bench_startup.IMPORT_BUDGET_SECONDS}s"
+
+def test_cold_start_is_within_budget():
+    """Test: create_app() plus a first request stays within the budget"""
+    result = bench_startup.measure_cold_start('testing')
+    assert result['status'] == 200
+    assert result['heavy_loaded'] == []
+    assert result['seconds'] <= bench_startup.COLD_START_BUDGET_SECONDS, \
+        f"Cold start took {result['seconds']:.3f}s, budget {bench_startup.COLD_START_BUDGET_SECONDS}s"
+
+def test_config_import_does_not_resolve_values():
+    """Test: importing app.config does not look up secrets or paths yet"""
+    code = (
+        "import logging; logging.basicConfig(level=logging.DEBUG);"
+        "import app.config"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=bench_startup.SOURCE_DIR,
+                            capture_output=True, text=True, check=True)
+    assert 'Retrieving secret key' not in result.stderr
+    assert 'Retrieving database path' not in result.stderr
+
+def test_config_values_are_resolved_once():
+    """Test: a lazy config value is computed on first access and then cached"""
+    from app.config import ProductionConfig
+    first = ProductionConfig.SECRET_KEY
+    assert ProductionConfig.SECRET_KEY is first
@@ -0,0 +1,187 @@
+# tests/test_task_streaming.py
+"""
+Large task pages are streamed (GET /api/tasks with limit >= TASKS_STREAM_THRESHOLD).
+
+The streamed body must be the same JSON as the buffered one, and the memory
+allocated while serving it must not grow with the page size: tracemalloc's
+peak is measured per request while the client reads the body chunk by chunk.
+No database connection (and so no SQLite read transaction) may stay open
+between chunks, and the request hooks must cover the whole body.
+"""
+
+import gc
+import json
+import tracemalloc
+import pytest
+from sqlalchemy import event
+from app import db_utils, metrics
+from app.models import db, User
+
+PAGE_SIZES = (100, 400, 1600)
+PEAK_BUDGET = 2 * 1024 * 1024  # Bytes; a buffered 1600-task page takes ~7.5 MB
+
+
+@pytest.fixture
+def heavy_client(app, client, seeded, monkeypatch):
+    """Client logged in as a user with 3000 active tasks; pages of up to 2000 tasks allowed."""
+    user_id = seeded(1, 3000, seed=5, status_weights=(1, 0, 0))[0]
+    address = db.session.get(User, user_id).wallet_address
+    db.session.remove()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['user_address'] = address
+        sess['authenticated'] = True
+    monkeypatch.setitem(app.config, 'TASKS_PER_PAGE_MAX', 2000)
+    monkeypatch.setitem(app.config, 'TASKS_STREAM_THRESHOLD', 100)
+    return client
+
+
+def peak_allocation(client, url):
+    """Peak bytes allocated while serving url, reading the body without keeping it; returns (peak, body size)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        response = client.get(url, buffered=False)
+        size = 0
+        for chunk in response.response:
+            size += len(chunk)
+        response.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, size
+
+
+def get_page(client, url):
+    """(decoded body, Content-Length header) of a task page; the response is closed after reading."""
+    with client.get(url) as response:
+        assert response.status_code == 200
+        return json.loads(response.get_data()), response.headers.get('Content-Length')
+
+
+def test_streamed_page_matches_buffered(app, heavy_client, monkeypatch):
+    """Test: streamed pages carry the same tasks and pagination as buffered ones"""
+    streamed, length = get_page(heavy_client, '/api/tasks?limit=150')
+    assert length is None  # Written in chunks, size unknown up front
+    streamed_next, _ = get_page(heavy_client, f"/api/tasks?limit=150&cursor={streamed['pagination']['next_cursor']}")
+
+    monkeypatch.setitem(app.config, 'TASKS_STREAM_THRESHOLD', None)
+    buffered, length = get_page(heavy_client, '/api/tasks?limit=150')
+    assert length is not None
+    buffered_next, _ = get_page(heavy_client, f"/api/tasks?limit=150&cursor={buffered['pagination']['next_cursor']}")
+
+    assert streamed == buffered
+    assert streamed_next == buffered_next
+    assert len(streamed['tasks']) == 150
+    assert streamed['pagination']['has_more'] is True
+
+
+def test_streamed_page_end(heavy_client):
+    """Test: the last page reports no more tasks"""
+    first, _ = get_page(heavy_client, '/api/tasks?limit=2000')
+    last, _ = get_page(heavy_client, f"/api/tasks?limit=2000&cursor={first['pagination']['next_cursor']}")
+
+    assert len(first['tasks']) == 2000
+    assert len(last['tasks']) == 1000
+    assert last['pagination']['has_more'] is False
+
+
+def test_streamed_page_memory_is_bounded(heavy_client):
+    """Test: peak allocation per request stays within budget and flat as pages grow"""
+    get_page(heavy_client, '/api/tasks?limit=100')  # Warm up imports and caches
+    peaks = {}
+    for size in PAGE_SIZES:
+        peak, body = peak_allocation(heavy_client, f'/api/tasks?limit={size}')
+        assert body > size * 100  # The whole page was read
+        peaks[size] = peak
+
+    assert max(peaks.values()) < PEAK_BUDGET, peaks
+    # 16x the tasks, well under 2x the memory
+    assert peaks[PAGE_SIZES[-1]] < 2 * peaks[PAGE_SIZES[0]], peaks
+
+
+def request_count(route):
+    """Observations of the request duration histogram for GET `route`."""
+    return sum(histogram['count'] for histogram in metrics.snapshot()['histograms']
+               if histogram['name'] == 'http_request_duration' and histogram['labels'].get('route') == route)
+
+
+def test_no_connection_is_held_between_chunks(heavy_client):
+    """Test: every batch returns its connection before it is sent, so a slow client blocks no writer"""
+    checked_out = [0]
+
+    def checkout(*args):
+        checked_out[0] += 1
+
+    def checkin(*args):
+        checked_out[0] -= 1
+
+    event.listen(db.engine, 'checkout', checkout)
+    event.listen(db.engine, 'checkin', checkin)
+    try:
+        with heavy_client.get('/api/tasks?limit=500') as response:
+            db.session.remove()  # The first batch ran in the test's app context; a server tears it down here
+            assert checked_out[0] == 0
+            chunks = iter(response.response)
+            for _ in range(4):
+                assert next(chunks)
+                assert checked_out[0] == 0
+    finally:
+        event.remove(db.engine, 'checkout', checkout)
+        event.remove(db.engine, 'checkin', checkin)
+
+
+def test_error_in_later_batch_aborts_response(heavy_client, monkeypatch):
+    """Test: a failing batch after the first is raised to the server, not ended as valid-looking output"""
+    fetch = db_utils.get_user_tasks_cursor
+    calls = []
+
+    def failing_fetch(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise RuntimeError("database is locked")
+        return fetch(*args)
+
+    monkeypatch.setattr(db_utils, 'get_user_tasks_cursor', failing_fetch)
+    with heavy_client.get('/api/tasks?limit=500') as response:
+        chunks = iter(response.response)
+        assert response.status_code == 200
+        assert next(chunks).startswith(b'{"tasks":[')
+        with pytest.raises(RuntimeError):
+            next(chunks)
+
+
+def test_error_in_first_batch_is_a_500(heavy_client, monkeypatch):
+    """Test: the first batch is fetched before the response starts"""
+    def failing_fetch(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(db_utils, 'get_user_tasks_cursor', failing_fetch)
+    response = heavy_client.get('/api/tasks?limit=500')
+
+    assert response.status_code == 500
+    assert response.json['error'] == 'Internal server error'
+
+
+def test_request_hooks_finish_after_the_body(heavy_client, app, tmp_path, monkeypatch):
+    """Test: metrics and profiles of a streamed page are recorded once the body has been sent"""
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    # Unlike `client`, this one pops the request context before the body is
+    # read, as a WSGI server does
+    server_client = app.test_client()
+    server_client.set_cookie('session', heavy_client.get_cookie('session').value)
+    before = request_count('/api/tasks')
+
+    response = server_client.get('/api/tasks?limit=500', headers={'X-Profile': 'test-profile-token'})
+    profile_id = response.headers['X-Profile-Id']
+    for _ in response.response:
+        pass
+    assert request_count('/api/tasks') == before
+    assert not (tmp_path / 'profiles').exists()
+    response.close()
+
+    assert request_count('/api/tasks') == before + 1
+    report = (tmp_path / 'profiles' / f'{profile_id}.txt').read_text()
+    assert 'GET /api/tasks?limit=500 -> 200' in report
+    assert 'fetch_detached' in report  # Batches generated after the view returned are profiled
@@ -0,0 +1,92 @@
+# tests/test_timing.py
+import logging
+import redis
+import pytest
+from app import timing, utils
+from app.timing import RequestTimings, TimedRedisConnection
+
+
+def _server_timing(response):
+    """Server-Timing header as {name: duration_ms}."""
+    entries = {}
+    for entry in response.headers['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        entries[name] = float(dict(param.split('=', 1) for param in params)['dur'])
+    return entries
+
+def test_task_list_has_server_timing(authenticated_client_for_user1, task1):
+    """Test: GET /api/tasks reports db, serialize and total durations"""
+    response = authenticated_client_for_user1.get('/api/tasks')
+
+    assert response.status_code == 200
+    entries = _server_timing(response)
+    assert {'db', 'serialize', 'total'} <= set(entries)
+    assert 'signature' not in entries
+    assert entries['total'] >= entries['db']
+
+def test_access_log_has_timing_fields(authenticated_client_for_user1, task1, caplog):
+    """Test: the access log line carries the breakdown as structured fields"""
+    caplog.set_level(logging.INFO, logger='w3tasq.access')
+
+    authenticated_client_for_user1.get('/api/tasks')
+
+    records = [record for record in caplog.records if record.name == 'w3tasq.access']
+    assert len(records) == 1
+    record = records[0]
+    assert record.path == '/api/tasks' and record.status == 200
+    assert record.timing['db_calls'] >= 1
+    assert set(record.timing) >= {'total_ms', 'db_ms', 'redis_ms', 'signature_ms', 'serialize_ms'}
+    assert 'db_ms=' in record.getMessage()
+
+def test_signature_phase_on_login(client, _db):
+    """Test: signature recovery shows up in the verify response"""
+    address = utils.get_test_w3addres()
+    message = client.post('/api/auth/challenge', json={'address': address}).get_json()['message']
+    response = client.post('/api/auth/verify', json={
+        'address': address, 'signature': f"0x{utils.sign_message_with_private_key(message)}"
+    })
+
+    assert response.status_code == 200
+    assert _server_timing(response)['signature'] > 0
+    from app.models import User
+    _db.session.delete(User.query.filter_by(wallet_address=address).first())
+    _db.session.commit()
+
+def test_no_header_when_disabled_for_production(authenticated_client_for_user1, app, monkeypatch, caplog):
+    """Test: without SERVER_TIMING_HEADER the breakdown only goes to the access log"""
+    monkeypatch.setitem(app.config, 'SERVER_TIMING_HEADER', False)
+    caplog.set_level(logging.INFO, logger='w3tasq.access')
+
+    response = authenticated_client_for_user1.get('/api/tasks')
+
+    assert 'Server-Timing' not in response.headers
+    assert any(record.name == 'w3tasq.access' for record in caplog.records)
+
+def test_phase_outside_request_is_a_no_op():
+    """Test: phases outside a request record nothing"""
+    assert timing.current() is None
+    with timing.phase('db'):
+        pass
+    assert timing.current() is None
+
+def test_redis_round_trip_is_one_call(monkeypatch):
+    """Test: a command's send and reply are timed as one redis call"""
+    monkeypatch.setattr(redis.Connection, 'send_packed_command', lambda self, command, check_health=True: None)
+    monkeypatch.setattr(redis.Connection, 'read_response', lambda self, *args, **kwargs: 'PONG')
+    timings = RequestTimings()
+    token = timing._current.set(timings)
+    try:
+        connection = TimedRedisConnection()
+        connection.send_packed_command(b'PING')
+        assert connection.read_response() == 'PONG'
+    finally:
+        timing._current.reset(token)
+
+    assert timings.counts['redis'] == 1
+    assert timings.durations['redis'] > 0
+
+@pytest.mark.parametrize('enabled, expected', [(True, TimedRedisConnection), (False, redis.Connection)])
+def test_redis_connection_class(app, monkeypatch, enabled, expected):
+    """Test: the Redis pool only gets the timed connection class when timing is enabled"""
+    monkeypatch.setitem(app.config, 'REQUEST_TIMING_ENABLED', enabled)
+    assert timing.redis_connection_class(app) is expected